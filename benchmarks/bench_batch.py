@@ -0,0 +1,84 @@
+"""
+Пакетные запросы против отдельных: состояние и выстрелы для `--games` партий.
+
+Сервер работает в процессе (ASGI-транспорт httpx, без сети), поэтому
+замеряются разбор запроса, проверка pydantic и сериализация ответа - то,
+что пакетный запрос делает один раз вместо одного раза на партию. Партии
+создаются заранее: два игрока, случайные расстановки. Выстрелы в каждом
+раунде идут по новым клеткам за того, чей сейчас ход.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_batch --games 200 --rounds 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("SEA_BATTLE_PERSIST", "0")
+
+import httpx  # noqa: E402
+
+from common.fleet import COLS, ROWS, random_fleet  # noqa: E402
+from server import server  # noqa: E402
+
+
+async def setup(client, games, rng):
+    ids = []
+    for _ in range(games):
+        response = await client.post("/create_game/", json={"player1_name": "batch"})
+        game_id = response.json()["game_id"]
+        await client.post("/join_game/", json={"game_id": game_id, "player2_name": "batch"})
+        for player in ("player1", "player2"):
+            await client.post("/place_ship/", json={"ships": random_fleet(rng), "game_id": game_id, "player": player})
+        ids.append(game_id)
+    return ids
+
+
+def next_shots(ids, targets):
+    return [{"game_id": game_id, "pos": targets[game_id].pop(), "player": server.games.get(game_id).current_turn}
+            for game_id in ids if not server.games.get(game_id).is_finished()]
+
+
+async def run(client, ids, rounds, rng, batch):
+    """Раунды «состояние всех партий, затем по выстрелу в каждой». Возвращает время и число операций."""
+    targets = {game_id: rng.sample([(row, col) for row in range(ROWS) for col in range(COLS)], ROWS * COLS)
+               for game_id in ids}
+    operations = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        shots = next_shots(ids, targets)
+        if batch:
+            await client.post("/batch/get_game_info/", json={"games": [{"game_id": game_id} for game_id in ids]})
+            await client.post("/batch/shoot/", json={"shots": shots})
+        else:
+            for game_id in ids:
+                await client.get(f"/get_game_info/{game_id}")
+            for shot in shots:
+                await client.post("/shoot/", json=shot)
+        operations += len(ids) + len(shots)
+    return time.perf_counter() - start, operations
+
+
+async def main_async(args):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for batch in (False, True):
+            rng = random.Random(args.seed)
+            ids = await setup(client, args.games, rng)
+            elapsed, operations = await run(client, ids, args.rounds, rng, batch)
+            print(f"{'batch' if batch else 'single':>6}: {operations / elapsed:8.0f} operations/s, "
+                  f"{elapsed / operations * 1e6:6.1f} us per operation")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Микро-бенчмарк выстрелов по полю: прежняя реализация на списках против битовых масок.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_board
+"""
+import os
+import random
+import time
+
+os.environ.setdefault("SEA_BATTLE_PERSIST", "0")
+
+from benchmarks.legacy import LegacyBoard, LegacyShip  # noqa: E402
+from server.server import Board, Ship, ROWS, COLS  # noqa: E402
+
+FLEET = [
+    (4, 0, (0, 0)), (3, 1, (2, 0)), (3, 0, (9, 0)), (2, 1, (0, 9)), (2, 0, (4, 4)),
+    (2, 1, (6, 7)), (1, 0, (2, 5)), (1, 0, (6, 2)), (1, 0, (9, 9)), (1, 0, (4, 9)),
+]
+
+
+def fleet_positions(size, orientation, start):
+    return [(start[0] + i if orientation == 1 else start[0],
+             start[1] + i if orientation == 0 else start[1]) for i in range(size)]
+
+
+def make_board(board_cls, ship_cls):
+    board = board_cls()
+    for size, orientation, start in FLEET:
+        board.place_ship(ship_cls(size=size, orientation=orientation,
+                                  positions=fleet_positions(size, orientation, start)))
+    return board
+
+
+def run(board_cls, ship_cls, games):
+    """Отстреливает все клетки поля в случайном порядке и возвращает выстрелов в секунду."""
+    rng = random.Random(0)
+    cells = [(r, c) for r in range(ROWS) for c in range(COLS)]
+    orders = []
+    for _ in range(games):
+        order = cells[:]
+        rng.shuffle(order)
+        # Повторный выстрел тоже входит в горячий путь
+        order.append(order[0])
+        orders.append(order)
+    boards = [make_board(board_cls, ship_cls) for _ in range(games)]
+
+    start = time.perf_counter()
+    for board, order in zip(boards, orders):
+        shoot = board.shoot
+        for pos in order:
+            shoot(pos)
+    elapsed = time.perf_counter() - start
+    return games * (len(cells) + 1) / elapsed
+
+
+def main():
+    games = 2000
+    legacy = run(LegacyBoard, LegacyShip, games)
+    current = run(Board, Ship, games)
+    print(f"legacy  : {legacy:12,.0f} shots/s")
+    print(f"bitboard: {current:12,.0f} shots/s")
+    print(f"speedup : {current / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Бот по плотности вероятности: время хода, число выстрелов до победы и память на партию.
+
+Бот играет против случайных расстановок common.fleet.random_placements
+прямо на движке сервера, без HTTP.
+Запуск из корня проекта:
+    python -m benchmarks.bench_bot --games 1000
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from common.fleet import random_placements, ship_cells
+from server.bot import Bot
+from server.engine import Board, Ship
+
+
+def make_board(rng):
+    board = Board()
+    for size, orientation, row, col in random_placements(rng):
+        board.place_ship(Ship(size=size, orientation=orientation, positions=ship_cells(size, orientation, row, col)))
+    return board
+
+
+def play(board, bot):
+    """Бот стреляет до потопления всего флота; возвращает число выстрелов и время ходов."""
+    shots = 0
+    elapsed = 0.0
+    sunk = 0
+    while sunk < len(board.ships):
+        start = time.perf_counter()
+        pos = bot.choose()
+        result = board.shoot(pos)
+        bot.observe(pos, result, board.ship_at(*pos).positions if result == "sunk" else ())
+        elapsed += time.perf_counter() - start
+        shots += 1
+        sunk += result == "sunk"
+    return shots, elapsed
+
+
+def bytes_per_bot(count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    bots = [Bot() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del bots
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    shots = []
+    elapsed = 0.0
+    for game in range(args.games):
+        game_shots, game_elapsed = play(make_board(rng), Bot(random.Random(args.seed + game)))
+        shots.append(game_shots)
+        elapsed += game_elapsed
+    print(f"shots to win: mean {statistics.mean(shots):.1f}, median {statistics.median(shots)}, "
+          f"min {min(shots)}, max {max(shots)}")
+    print(f"time per move: {elapsed / sum(shots) * 1e6:.1f} us")
+    print(f"memory per bot: {bytes_per_bot(1000):,.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Простаивающий клиент: загрузка процессора и запросы к серверу.
+
+Клиент запускается в отдельном процессе без окна (SDL_VIDEODRIVER=dummy) и
+`--seconds` секунд стоит на выбранном экране без действий пользователя.
+Вместо сервера игры работает заглушка, которая считает запросы. Время
+процессора клиента читается из /proc/<pid>/stat (Linux) в начале и в конце
+замера, запуск pygame не учитывается.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_client_idle --screen lobby --seconds 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLIENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "client")
+
+CHILD = """
+import sys
+import pygame
+import menu
+pygame.init()
+screen = pygame.display.set_mode((900, 600))
+if sys.argv[1] == "lobby":
+    menu.game_rooms_menu(screen)
+else:
+    menu.main_menu(screen, menu.game_rooms_menu, menu.settings_menu)
+"""
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        body = json.dumps({"games": [1, 2, 3], "total": 3, "offset": 0}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def cpu_seconds(pid):
+    """Время процессора процесса (пользователь + система), секунды."""
+    with open(f"/proc/{pid}/stat") as file:
+        fields = file.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--screen", choices=("menu", "lobby"), default="lobby")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    server.handle_error = lambda request, client_address: None  # Обрыв соединения при остановке клиента
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1",
+               SEA_BATTLE_SERVER_URL=url)
+    child = subprocess.Popen([sys.executable, "-c", CHILD, args.screen], cwd=CLIENT_DIR, env=env,
+                             stderr=subprocess.DEVNULL)
+    # Запуск pygame и первый кадр не учитываются
+    time.sleep(2.0)
+    requests_before, cpu_before = CountingHandler.requests, cpu_seconds(child.pid)
+    time.sleep(args.seconds)
+    count, cpu = CountingHandler.requests - requests_before, cpu_seconds(child.pid) - cpu_before
+    # SIGTERM pygame превращает в событие QUIT, на которое меню не завершается
+    child.kill()
+    child.wait()
+    server.shutdown()
+    print(f"{args.screen}: {cpu / args.seconds:.1%} of a core, {count / args.seconds:.1f} requests/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Скорость записи выстрелов: прежнее соединение на каждый запрос с JSON в
+TEXT-столбце sessions против пула соединений в режиме WAL и таблицы shots.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_database
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+os.environ["SEA_BATTLE_DB"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from server import database  # noqa: E402
+
+SHOTS = "[[0, 0], [1, 1], [2, 2], [3, 3], [4, 4]]"
+
+
+def legacy_write(path, game_id):
+    """Прежний путь: новое соединение в журнале по умолчанию на каждый запрос."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("UPDATE sessions SET player1_shots = ? WHERE game_id = ?", (SHOTS, game_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def make_legacy_db(count):
+    path = os.path.join(tempfile.mkdtemp(), "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (game_id TEXT PRIMARY KEY, player1_name TEXT, player2_name TEXT, "
+                 "player1_ships TEXT, player2_ships TEXT, player1_shots TEXT, player2_shots TEXT)")
+    conn.executemany("INSERT INTO sessions (game_id) VALUES (?)", [(str(i),) for i in range(count)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def measure(label, count, write):
+    start = time.perf_counter()
+    write()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:>12,.0f} writes/s")
+
+
+def main():
+    count = 2000
+    legacy_path = make_legacy_db(count)
+    for i in range(count):
+        database.add_session(str(i), f"p{i}")
+
+    measure("legacy connect per call", count, lambda: [legacy_write(legacy_path, str(i)) for i in range(count)])
+    measure("pooled WAL, add_shot", count,
+            lambda: [database.add_shot(str(i), "player1", 0, 0, 0, "miss") for i in range(count)])
+    measure("pooled WAL, save_changes", count,
+            lambda: database.save_changes(shots=[(str(i), "player1", 1, 1, 1, "miss") for i in range(count)]))
+    database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
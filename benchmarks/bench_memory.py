@@ -0,0 +1,58 @@
+"""
+Замер памяти на одну партию: прежние pydantic-модели против объектов со __slots__.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_memory
+"""
+import os
+import gc
+import tracemalloc
+
+os.environ.setdefault("SEA_BATTLE_PERSIST", "0")
+
+from benchmarks.bench_board import FLEET, fleet_positions  # noqa: E402
+from benchmarks.legacy import LegacyGame, LegacyShip  # noqa: E402
+from server.server import Game, Ship  # noqa: E402
+
+
+def bytes_per_game(make_game, count):
+    """Создаёт `count` партий и возвращает прирост памяти в байтах на одну партию."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [make_game(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return (after - before) / count
+
+
+def idle(game_cls):
+    return lambda i: game_cls(player1_name=f"player{i}")
+
+
+def with_fleets(game_cls, ship_cls):
+    def make(i):
+        game = game_cls(player1_name=f"player{i}", player2_name=f"rival{i}")
+        for board in (game.player1_board, game.player2_board):
+            for size, orientation, start in FLEET:
+                board.place_ship(ship_cls(size=size, orientation=orientation,
+                                          positions=fleet_positions(size, orientation, start)))
+        return game
+    return make
+
+
+def main():
+    count = 20000
+    rows = [
+        ("idle", bytes_per_game(idle(LegacyGame), count), bytes_per_game(idle(Game), count)),
+        ("fleets placed", bytes_per_game(with_fleets(LegacyGame, LegacyShip), count),
+         bytes_per_game(with_fleets(Game, Ship), count)),
+    ]
+    print(f"{'state':<14}{'pydantic':>12}{'slots':>12}{'ratio':>8}")
+    for name, legacy, current in rows:
+        print(f"{name:<14}{legacy:>12,.0f}{current:>12,.0f}{legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
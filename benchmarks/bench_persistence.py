@@ -0,0 +1,77 @@
+"""
+Задержка /shoot/ без сохранения, с синхронной записью каждой партии и с отложенной записью.
+
+Сервер запускается в процессе через TestClient, база создаётся во временном каталоге.
+Запуск из корня проекта:
+    python -m benchmarks.bench_persistence
+"""
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["SEA_BATTLE_DB"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from server import server  # noqa: E402
+from server.storage import WriteBehindStore  # noqa: E402
+
+FLEET = [
+    {"size": 4, "orientation": 0, "start_pos": [0, 0]}, {"size": 3, "orientation": 1, "start_pos": [2, 0]},
+    {"size": 3, "orientation": 0, "start_pos": [9, 0]}, {"size": 2, "orientation": 1, "start_pos": [0, 9]},
+    {"size": 2, "orientation": 0, "start_pos": [4, 4]}, {"size": 2, "orientation": 1, "start_pos": [6, 7]},
+    {"size": 1, "orientation": 0, "start_pos": [2, 5]}, {"size": 1, "orientation": 0, "start_pos": [6, 2]},
+    {"size": 1, "orientation": 0, "start_pos": [9, 9]}, {"size": 1, "orientation": 0, "start_pos": [4, 9]},
+]
+
+
+class WriteThroughStore(WriteBehindStore):
+    """Для сравнения: сохраняет партию сразу при каждом изменении."""
+
+    def mark_dirty(self, game_id):
+        super().mark_dirty(game_id)
+        self.flush()
+
+
+def make_store(mode):
+    get_game = server.games.get
+    if mode == "off":
+        return None
+    if mode == "write-through":
+        return WriteThroughStore(get_game)
+    return WriteBehindStore(get_game, 50)
+
+
+def run(mode, games, shots_per_game):
+    server.games.clear()
+    server.store = make_store(mode)
+    latencies = []
+    with TestClient(server.app) as client:
+        game_ids = []
+        for i in range(games):
+            game_id = client.post("/create_game/", json={"player1_name": f"p{i}"}).json()["game_id"]
+            client.post("/join_game/", json={"game_id": game_id, "player2_name": f"q{i}"})
+            for player in ("player1", "player2"):
+                client.post("/place_ship/", json={"ships": FLEET, "game_id": game_id, "player": player})
+            game_ids.append(game_id)
+        for shot in range(shots_per_game):
+            pos = (shot // 10, shot % 10)
+            for game_id in game_ids:
+                game = server.games.get(game_id)
+                start = time.perf_counter()
+                client.post("/shoot/", json={"game_id": game_id, "pos": pos, "player": game.current_turn})
+                latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{mode:<14} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+def main():
+    for mode in ("off", "write-through", "write-behind"):
+        run(mode, games=20, shots_per_game=30)
+
+
+if __name__ == "__main__":
+    main()
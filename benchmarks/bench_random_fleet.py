@@ -0,0 +1,80 @@
+"""
+Скорость генератора случайных расстановок и проверка равномерности.
+
+Скорость - расстановок в секунду для common.fleet.random_placements (положения
+кораблей) и random_fleet (готовый запрос /place_ship/). Проверка равномерности:
+поле симметрично относительно поворотов и отражений, поэтому частота занятости
+клеток, переходящих друг в друга при этих преобразованиях, должна совпадать.
+Для каждой такой группы клеток считается хи-квадрат; кроме того, каждое
+положение каждого корабля должно хоть раз встретиться.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_random_fleet --fleets 200000
+"""
+import argparse
+import math
+import random
+import time
+from collections import Counter
+
+from common.fleet import COLS, PLACEMENTS, ROWS, check_fleet, random_fleet, random_placements, ship_cells
+
+
+def speed(name, generate, count, rng):
+    start = time.perf_counter()
+    for _ in range(count):
+        generate(rng)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<20} {count / elapsed:>10,.0f} fleets/s")
+
+
+def symmetric_cells(row, col):
+    """Клетки, в которые переходит клетка при поворотах и отражениях поля."""
+    last = ROWS - 1
+    cells = set()
+    for r, c in ((row, col), (col, row)):
+        cells.update({(r, c), (last - r, c), (r, last - c), (last - r, last - c)})
+    return frozenset(cells)
+
+
+def uniformity(count, rng):
+    occupied = Counter()
+    seen = set()
+    for _ in range(count):
+        for key in random_placements(rng):
+            seen.add(key)
+            occupied.update(ship_cells(*key))
+    orbits = {symmetric_cells(row, col) for row in range(ROWS) for col in range(COLS)}
+    chi2 = 0.0
+    dof = 0
+    for orbit in orbits:
+        expected = sum(occupied[cell] for cell in orbit) / len(orbit)
+        chi2 += sum((occupied[cell] - expected) ** 2 / expected for cell in orbit)
+        dof += len(orbit) - 1
+    # Порог примерно соответствует уровню значимости 0.001 для распределения хи-квадрат
+    threshold = dof + 3.1 * math.sqrt(2 * dof)
+    missing = len(PLACEMENTS) - len(seen)
+    print(f"cell occupancy chi2 = {chi2:.1f} for {dof} degrees of freedom (threshold {threshold:.1f})")
+    print(f"placements never drawn: {missing}")
+    corner, centre = occupied[(0, 0)] / count, occupied[(4, 4)] / count
+    print(f"P(ship in corner) = {corner:.3f}, P(ship in centre) = {centre:.3f}")
+    assert chi2 < threshold, "частоты симметричных клеток различаются"
+    assert missing == 0, "часть положений кораблей не встречается"
+    print("OK: occupancy is symmetric and every placement is reachable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleets", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    for _ in range(1000):
+        check_fleet(random_fleet(rng))
+    speed("random_placements", random_placements, args.fleets, rng)
+    speed("random_fleet", random_fleet, args.fleets, rng)
+    uniformity(args.fleets, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Выстрелов в секунду с хранением партий в Redis при 1, 4 и 8 рабочих процессах uvicorn.
+
+Нужен запущенный Redis. Выбранная база Redis очищается перед каждым прогоном,
+поэтому по умолчанию используется отдельная база 15.
+Запуск из корня проекта:
+    python -m benchmarks.bench_redis_workers --redis-url redis://127.0.0.1:6379/15
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import redis
+
+FLEET = [
+    {"size": 4, "orientation": 0, "start_pos": [0, 0]}, {"size": 3, "orientation": 1, "start_pos": [2, 0]},
+    {"size": 3, "orientation": 0, "start_pos": [9, 0]}, {"size": 2, "orientation": 1, "start_pos": [0, 9]},
+    {"size": 2, "orientation": 0, "start_pos": [4, 4]}, {"size": 2, "orientation": 1, "start_pos": [6, 7]},
+    {"size": 1, "orientation": 0, "start_pos": [2, 5]}, {"size": 1, "orientation": 0, "start_pos": [6, 2]},
+    {"size": 1, "orientation": 0, "start_pos": [9, 9]}, {"size": 1, "orientation": 0, "start_pos": [4, 9]},
+]
+CELLS = [(row, col) for row in range(10) for col in range(10)]
+
+
+def start_server(workers, port, redis_url):
+    env = dict(os.environ, SEA_BATTLE_BACKEND="redis", SEA_BATTLE_REDIS_URL=redis_url, SEA_BATTLE_PERSIST="0")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.server:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"], env=env)
+
+
+async def wait_ready(client):
+    for _ in range(100):
+        try:
+            await client.get("/get_games/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def play(client, deadline, counter):
+    """Играет партии подряд до истечения времени; считает принятые выстрелы."""
+    while time.perf_counter() < deadline:
+        game_id = (await client.post("/create_game/", json={"player1_name": "bench"})).json()["game_id"]
+        await client.post("/join_game/", json={"game_id": game_id, "player2_name": "bench"})
+        for player in ("player1", "player2"):
+            await client.post("/place_ship/", json={"ships": FLEET, "game_id": game_id, "player": player})
+        turn, shots = "player1", {"player1": 0, "player2": 0}
+        while shots[turn] < len(CELLS) and time.perf_counter() < deadline:
+            response = await client.post("/shoot/", json={"game_id": game_id, "pos": CELLS[shots[turn]],
+                                                          "player": turn})
+            shots[turn] += 1
+            counter[0] += 1
+            if response.json().get("result") == "miss":
+                turn = "player2" if turn == "player1" else "player1"
+
+
+async def run(workers, args):
+    redis.Redis.from_url(args.redis_url).flushdb()
+    server = start_server(workers, args.port, args.redis_url)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits) as client:
+            await wait_ready(client)
+            counter = [0]
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*[play(client, deadline, counter) for _ in range(args.concurrency)])
+            elapsed = time.perf_counter() - start
+        print(f"workers={workers:<2} {counter[0] / elapsed:>10,.0f} shots/s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:6379/15")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+    for workers in args.workers:
+        asyncio.run(run(workers, args))
+
+
+if __name__ == "__main__":
+    main()
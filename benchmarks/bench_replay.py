@@ -0,0 +1,75 @@
+"""
+Реплеи: размер записи и скорость проверки (цель - 100 000 реплеев в минуту).
+
+Партии ботов играются на движке (server.simulate), записываются через
+ReplayWriter во временный каталог и проверяются server.replay.run_verify.
+Затем один выстрел в копии сегмента портится, чтобы убедиться, что
+проверка находит расхождение.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_replay --games 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import wire
+from server import replay
+from server.simulate import STRATEGIES, new_game, play_game
+
+
+def generate(directory, games, seed, segment_bytes):
+    rng = random.Random(seed)
+    writer = replay.ReplayWriter(directory, segment_bytes)
+    batch = []
+    size = 0
+    for game_id in range(games):
+        game = new_game(rng)
+        play_game(game, {"player1": STRATEGIES["density"](rng), "player2": STRATEGIES["random"](rng)})
+        record = replay.encode(game_id, game)
+        size += len(record)
+        batch.append(record)
+        if len(batch) == 1000:
+            writer.write(batch)
+            batch = []
+    writer.write(batch)
+    writer.close()
+    return size
+
+
+def corrupt_copy(directory):
+    """Копия первого сегмента, где у первого выстрела первой партии изменён результат."""
+    source = replay.segments(directory)[0]
+    with open(source, "rb") as file:
+        data = bytearray(file.read())
+    _, _, _, ships1, ships2, _ = replay.HEADER.unpack_from(data, len(replay.FILE_MAGIC))
+    shot = len(replay.FILE_MAGIC) + replay.HEADER.size + (ships1 + ships2) * 2
+    data[shot + 1] = (data[shot + 1] + 1) % len(wire.RESULTS)
+    path = os.path.join(directory, "corrupt" + replay.SEGMENT_SUFFIX)
+    with open(path, "wb") as file:
+        file.write(data)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--segment-mb", type=float, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        size = generate(directory, args.games, args.seed, int(args.segment_mb * 1024 * 1024))
+        print(f"generated {args.games:,} replays in {time.perf_counter() - start:.1f}s, "
+              f"{size / args.games:.0f} bytes per replay")
+        if replay.run_verify(directory, args.workers):
+            raise SystemExit("engine disagrees with freshly written replays")
+        failures = replay.verify_segment(corrupt_copy(directory))["failures"]
+        print(f"corrupted segment: {failures[0][3] if failures else 'NOT DETECTED'}")
+
+
+if __name__ == "__main__":
+    main()
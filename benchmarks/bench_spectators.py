@@ -0,0 +1,157 @@
+"""
+Нагрузочный тест зрителей: одна партия, `--spectators` соединений /spectate/, один процесс сервера.
+
+Сервер запускается отдельным процессом uvicorn. Зрители - сырые
+соединения asyncio в процессе теста, которые читают поток и отмечают, когда
+до них дошла каждая версия партии. Два игрока играют партию до конца,
+делая выстрел раз в `--interval` секунд. Для каждого события считается
+время от отправки выстрела до получения события последним зрителем;
+в конце выводятся p50/p99/max этого времени, число зрителей, получивших все
+события, и время процессора сервера (из /proc/<pid>/stat, Linux).
+
+Тест и сервер делят процессор машины, поэтому задержки включают и разбор
+потоков зрителями в процессе теста.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_spectators --spectators 10000
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_client_idle import cpu_seconds
+from common.fleet import COLS, ROWS, random_fleet
+
+VERSION = re.compile(rb'"version": (\d+)')
+
+
+class Arrivals:
+    """Сколько зрителей получили каждую версию партии и когда её получил последний."""
+
+    def __init__(self):
+        self.count = {}
+        self.last = {}
+
+    def seen(self, versions):
+        now = time.perf_counter()
+        for version in versions:
+            self.count[version] = self.count.get(version, 0) + 1
+            self.last[version] = now
+
+
+async def spectator(port, game_id, arrivals, connected, semaphore):
+    async with semaphore:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET /spectate/{game_id} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+    connected.append(writer)
+    buffer = b""
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            return
+        # Событие могло разорваться между кусками: разбираются только события, дошедшие целиком
+        buffer += data
+        end = buffer.rfind(b"\n\n") + 2
+        arrivals.seen([int(version) for version in VERSION.findall(buffer, 0, end)])
+        buffer = buffer[end:]
+
+
+async def play(client, game_id, interval, rng):
+    """Партия двух игроков; возвращает время отправки каждого выстрела по версии партии."""
+    sent = {}
+    targets = {player: rng.sample([(row, col) for row in range(ROWS) for col in range(COLS)], ROWS * COLS)
+               for player in ("player1", "player2")}
+    turn = "player1"
+    while True:
+        info = (await client.get(f"/get_game_info/{game_id}")).json()
+        if info["winner"]:
+            return sent
+        start = time.perf_counter()
+        result = (await client.post("/shoot/", json={"game_id": game_id, "pos": targets[turn].pop(),
+                                                      "player": turn})).json()["result"]
+        sent[info["version"] + 1] = start
+        if result == "miss":
+            turn = "player2" if turn == "player1" else "player1"
+        await asyncio.sleep(interval)
+
+
+def percentile(values, share):
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+async def main_async(args, port, server_pid):
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        game_id = (await client.post("/create_game/", json={"player1_name": "left"})).json()["game_id"]
+        await client.post("/join_game/", json={"game_id": game_id, "player2_name": "right"})
+        rng = random.Random(args.seed)
+        for player in ("player1", "player2"):
+            await client.post("/place_ship/", json={"ships": random_fleet(rng), "game_id": game_id, "player": player})
+
+        arrivals = Arrivals()
+        connected = []
+        semaphore = asyncio.Semaphore(500)
+        start = time.perf_counter()
+        readers = [asyncio.create_task(spectator(port, game_id, arrivals, connected, semaphore))
+                   for _ in range(args.spectators)]
+        while len(connected) < args.spectators:
+            await asyncio.sleep(0.1)
+        print(f"{len(connected):,} spectators connected in {time.perf_counter() - start:.1f}s")
+
+        cpu_before = cpu_seconds(server_pid)
+        start = time.perf_counter()
+        sent = await play(client, game_id, args.interval, rng)
+        await asyncio.sleep(1.0)
+        elapsed, cpu = time.perf_counter() - start, cpu_seconds(server_pid) - cpu_before
+        metrics = (await client.get("/metrics")).text
+
+    for task in readers:
+        task.cancel()
+    for writer in connected:
+        writer.close()
+    latencies = sorted(arrivals.last[version] - sent[version] for version in sent if version in arrivals.last)
+    complete = sum(1 for version in sent if arrivals.count.get(version) == args.spectators)
+    dropped = re.search(r"^sea_battle_dropped_spectators_total (\S+)", metrics, re.M).group(1)
+    print(f"{len(sent)} shots, {complete} delivered to every spectator, {float(dropped):.0f} spectators dropped")
+    print(f"fan-out to the last spectator: p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    print(f"server CPU {cpu:.2f}s over {elapsed:.1f}s "
+          f"({cpu / len(sent) * 1000:.1f} ms per event for {args.spectators:,} spectators)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spectators", type=int, default=10000)
+    parser.add_argument("--interval", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    env = dict(os.environ, SEA_BATTLE_PERSIST="0", SEA_BATTLE_BACKEND="memory")
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "server.server:app", "--port", str(args.port),
+                               "--log-level", "warning", "--backlog", "4096"], env=env)
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                httpx.get(f"http://127.0.0.1:{args.port}/stats/")
+                break
+            except httpx.TransportError:
+                time.sleep(0.2)
+        asyncio.run(main_async(args, args.port, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
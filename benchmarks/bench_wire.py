@@ -0,0 +1,82 @@
+"""
+Размер и время кодирования ответов сервера: JSON против компактного формата common/wire.py.
+
+Сообщения берутся из партий ботов, сыгранных на движке (server.simulate):
+состояние с полным журналом ходов (первый запрос клиента), состояние с одним
+новым ходом (обычный опрос) и результат выстрела. JSON кодируется так же, как
+FastAPI отвечает словарём (jsonable_encoder и json.dumps), и разбирается
+json.loads, как в клиенте.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_wire
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("SEA_BATTLE_PERSIST", "0")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from common import wire  # noqa: E402
+from server.simulate import STRATEGIES, new_game, play_game  # noqa: E402
+
+
+def game_info(game, after_seq):
+    return {
+        "player1_name": "player1",
+        "player2_name": "player2",
+        "current_turn": game.current_turn,
+        "moves": game.moves_after(after_seq),
+        "last_seq": game.moves - 1,
+        "winner": game.winner,
+        "version": game.version,
+    }
+
+
+def json_encode(message):
+    return json.dumps(jsonable_encoder(message), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def per_message(function, messages, repeat):
+    """Среднее время вызова `function` на одном сообщении, микросекунды."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            function(message)
+    return (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    games = []
+    for _ in range(args.games):
+        game = new_game(rng)
+        play_game(game, {"player1": STRATEGIES["density"](rng), "player2": STRATEGIES["random"](rng)})
+        games.append(game)
+    kinds = {
+        "full info": ([game_info(game, -1) for game in games], wire.encode_info),
+        "delta info": ([game_info(game, game.moves - 2) for game in games], wire.encode_info),
+        "shot": ([{"result": rng.choice(("miss", "hit", "sunk"))} for _ in games],
+                 lambda message: wire.encode_shot(message["result"])),
+    }
+
+    print(f"{'message':<12}{'format':>8}{'bytes':>8}{'encode, us':>12}{'decode, us':>12}")
+    for kind, (messages, encode) in kinds.items():
+        for name, encoder, decoder in (("json", json_encode, json.loads), ("wire", encode, wire.decode)):
+            encoded = [encoder(message) for message in messages]
+            size = sum(map(len, encoded)) / len(encoded)
+            print(f"{kind:<12}{name:>8}{size:>8.0f}{per_message(encoder, messages, args.repeat):>12.1f}"
+                  f"{per_message(decoder, encoded, args.repeat):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
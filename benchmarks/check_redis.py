@@ -0,0 +1,105 @@
+"""
+Проверка хранилища Redis (server/redis_backend.py) на fakeredis в процессе.
+
+Lua-скрипты выполняются fakeredis через lupa, поэтому проверяются те же
+скрипты, что и на настоящем Redis: создание партии, присоединение,
+расстановка флотов, партия до победителя, пакетные выстрелы и запросы
+состояния, а также лобби - TTL партии не должен попадать на общий ключ
+лобби, а партии, удалённые по TTL, должны из него исчезать.
+
+Запуск из корня проекта:
+    python -m benchmarks.check_redis
+"""
+import asyncio
+import random
+
+import fakeredis
+
+from common.fleet import check_fleet, random_fleet, ship_cells
+from server.redis_backend import RedisGameStore
+
+
+def check(condition: bool, message: str):
+    if not condition:
+        raise SystemExit(message)
+
+
+def fleet_cells(seed: int):
+    """Флот игрока: для расстановки (клетки кораблей) и для выстрелов (все клетки подряд)."""
+    ships = [ship_cells(*ship) for ship in check_fleet(random_fleet(random.Random(seed)))]
+    return ships, [cell for cells in ships for cell in cells]
+
+
+async def start_game(store: RedisGameStore, seed: int):
+    """Партия с двумя игроками и расставленными флотами; возвращает ID и клетки кораблей player2."""
+    game_id = await store.create_game("left")
+    check(await store.join_game(game_id, "right") == "ok", "join failed")
+    check(await store.join_game(game_id, "third") == "full", "a third player joined")
+    targets = None
+    for player, player_seed in (("player1", seed), ("player2", seed + 1)):
+        ships, cells = fleet_cells(player_seed)
+        check(await store.place_ships(game_id, player, ships) == "ok", f"{player} could not place ships")
+        check(await store.place_ships(game_id, player, ships) == "already_placed", "ships placed twice")
+        if player == "player2":
+            targets = cells
+    return game_id, targets
+
+
+async def check_game(store: RedisGameStore):
+    """Партия до победы player1: каждый выстрел по кораблю - попадание, последний - победа."""
+    game_id, targets = await start_game(store, 1)
+    for index, pos in enumerate(targets):
+        result, turn, _, winner = await store.shoot(game_id, "player1", pos)
+        check(result in ("hit", "sunk") and turn == "player1", f"shot {pos}: {result}, turn {turn}")
+        check((winner is not None) == (index == len(targets) - 1), f"winner {winner} after shot {index}")
+    check((await store.shoot(game_id, "player1", targets[0]))[0] == "game_over", "shot after the end")
+    state = await store.get_state(game_id)
+    moves, last_seq = await store.moves(game_id)
+    check(state["winner"] == "player1" and last_seq == len(targets) - 1 and len(moves) == len(targets),
+          f"unexpected final state {state}, {last_seq + 1} moves")
+    print(f"full game: {len(targets)} shots, winner {state['winner']}, version {state['version']}")
+
+
+async def check_batches(store: RedisGameStore):
+    """shoot_many по двум партиям по порядку и game_infos с after_seq и несуществующей партией."""
+    first, first_targets = await start_game(store, 3)
+    second, second_targets = await start_game(store, 5)
+    shots = [(first, "player1", first_targets[0]), (second, "player1", second_targets[0]),
+             (first, "player1", first_targets[0]), (second, "player2", second_targets[1]),
+             (10 ** 9, "player1", (0, 0))]
+    results = [result for result, _, _, _ in await store.shoot_many(shots)]
+    check(results[:3] == [results[0], results[1], "already_shot"] and results[0] in ("hit", "sunk"),
+          f"unexpected batch results {results}")
+    check(results[3:] == ["not_your_turn", "not_found"], f"unexpected batch errors {results[3:]}")
+    infos = await store.game_infos([(first, -1), (second, 0), (10 ** 9, -1)])
+    check(len(infos[0]["moves"]) == 1 and infos[1]["moves"] == [] and infos[1]["last_seq"] == 0
+          and infos[2] is None, f"unexpected batch infos {infos}")
+    print(f"batches: shots {results}, infos for games {first}, {second} and a missing one")
+
+
+async def check_lobby(client):
+    """Присоединение не ставит TTL на лобби; партии, удалённые по TTL, уходят из лобби."""
+    store = RedisGameStore(client, ttl=1, prefix="lobby_check")
+    joined, waiting, expiring = [await store.create_game(name) for name in ("a", "b", "c")]
+    await store.join_game(joined, "x")
+    check(await client.ttl(store.lobby_key) == -1, "join set a TTL on the shared lobby key")
+    check(await store.lobby(0, 10) == ([waiting, expiring], 2), "joined game is still in the lobby")
+    # Партия waiting остаётся живой, expiring удаляется по TTL
+    await client.persist(store.keys(waiting)[0])
+    await asyncio.sleep(1.5)
+    page = await store.lobby(0, 10)
+    check(page == ([waiting], 1), f"expired game was not removed from the lobby: {page}")
+    check(await client.ttl(store.lobby_key) == -1, "lobby key expired")
+    print(f"lobby: no TTL after join, expired game removed, page {page}")
+
+
+async def main():
+    client = fakeredis.FakeAsyncRedis()
+    store = RedisGameStore(client)
+    await check_game(store)
+    await check_batches(store)
+    await check_lobby(client)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Проверка запуска сервера на базах старого формата.
+
+Сервер запускается (lifespan приложения) в отдельном процессе на копии
+базы: game_sessions.db из репозитория и базе первой схемы, где корабли и
+выстрелы лежат в TEXT-столбцах sessions, а часть сессий хранится под UUID.
+Запуск считается успешным, если он не упал, сессии с UUID пропущены, а
+числовая незавершённая партия загружена с кораблями и выстрелами.
+
+Затем в базу текущей схемы добавляются оконченная партия, партия без
+изменений дольше SEA_BATTLE_IDLE_TTL и живая партия: загрузиться должна
+только живая, а следующий ID - учесть все три.
+
+Запуск из корня проекта:
+    python -m benchmarks.check_startup
+"""
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+CHILD = """
+import asyncio
+import json
+from server import server
+
+async def main():
+    async with server.lifespan(server.app):
+        game = server.games.get(7)
+        print(json.dumps({"games": [i for i in range(20) if server.games.get(i)],
+                          "next_game_id": server.store.next_game_id,
+                          "ships": len(game.player1_board.ships) if game else 0, "moves": game.moves if game else 0}))
+
+asyncio.run(main())
+"""
+
+
+def legacy_database(path):
+    """База первой схемы: две сессии под UUID и незавершённая партия 7 с кораблём и выстрелами."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (game_id TEXT PRIMARY KEY, player1_name TEXT, player2_name TEXT, "
+                 "player1_ships TEXT, player2_ships TEXT, player1_shots TEXT, player2_shots TEXT)")
+    for game_id in ("eaab68ef-9e9d-456e-9172-0c147ff96c61", "5099aded-c641-4da5-9be1-24d2cbe3f75a"):
+        conn.execute("INSERT INTO sessions VALUES (?, 'old', '', '', '', '', '')", (game_id,))
+    ship = json.dumps([{"size": 2, "orientation": 0, "start_pos": [0, 0]}])
+    conn.execute("INSERT INTO sessions VALUES ('7', 'left', 'right', ?, ?, ?, '')",
+                 (ship, ship, json.dumps([[0, 0], [5, 5]])))
+    conn.commit()
+    conn.close()
+
+
+def add_games(path):
+    """Оконченная партия 10, партия 11 без изменений двое суток и живая партия 12."""
+    now = time.time()
+    conn = sqlite3.connect(path)
+    for game_id, updated_at in (("10", now), ("11", now - 2 * 86400), ("12", now)):
+        conn.execute("INSERT INTO sessions (game_id, player1_name, player2_name, current_turn, bot, updated_at) "
+                     "VALUES (?, 'a', 'b', 'player1', 0, ?)", (game_id, updated_at))
+        conn.execute("INSERT INTO shots VALUES (?, 'player1', 0, 0, 0, 'miss')", (game_id,))
+    conn.execute("INSERT INTO results VALUES ('10', 'player1', 'a', 'b', 40, 60.0, ?)", (now,))
+    conn.commit()
+    conn.close()
+
+
+def start(database):
+    env = dict(os.environ, SEA_BATTLE_DB=database, SEA_BATTLE_PERSIST="1", SEA_BATTLE_BACKEND="memory",
+               SEA_BATTLE_REPLAY_DIR="",
+               SEA_BATTLE_IDLE_TTL="3600")
+    child = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True)
+    if child.returncode:
+        raise SystemExit(f"server failed to start on {database}:\n{child.stderr}")
+    return json.loads(child.stdout.splitlines()[-1])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        repository = os.path.join(directory, "repository.db")
+        shutil.copy(os.path.join(ROOT, "game_sessions.db"), repository)
+        print(f"repository database: {start(repository)}")
+
+        legacy = os.path.join(directory, "legacy.db")
+        legacy_database(legacy)
+        loaded = start(legacy)
+        print(f"legacy database: {loaded}")
+        if loaded != {"games": [7], "next_game_id": 8, "ships": 1, "moves": 2}:
+            raise SystemExit("legacy game 7 was not restored as expected")
+
+        add_games(legacy)
+        loaded = start(legacy)
+        print(f"with finished and idle games: {loaded}")
+        if loaded["games"] != [7, 12] or loaded["next_game_id"] != 13:
+            raise SystemExit("finished or idle games were loaded, or their IDs were reused")
+
+
+if __name__ == "__main__":
+    main()
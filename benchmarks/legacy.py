@@ -0,0 +1,56 @@
+"""Прежние pydantic-модели игры, сохранённые для сравнения в бенчмарках."""
+from typing import List, Tuple
+
+from pydantic import BaseModel
+
+ROWS, COLS = 10, 10
+
+
+class LegacyShip(BaseModel):
+    size: int
+    orientation: int
+    positions: List[Tuple[int, int]]
+    hits: List[Tuple[int, int]] = []
+
+    def is_sunk(self):
+        return len(self.hits) == self.size
+
+
+class LegacyBoard(BaseModel):
+    grid: List[List[int]] = [[0 for _ in range(COLS)] for _ in range(ROWS)]
+    ships: List[LegacyShip] = []
+    shots: List[Tuple[int, int]] = []
+
+    def place_ship(self, ship):
+        for pos in ship.positions:
+            self.grid[pos[0]][pos[1]] = 1
+        self.ships.append(ship)
+
+    def can_place(self, ship):
+        for pos in ship.positions:
+            if pos[0] >= ROWS or pos[1] >= COLS or self.grid[pos[0]][pos[1]] == 1:
+                return False
+        return True
+
+    def shoot(self, pos):
+        if pos in self.shots:
+            return "already_shot"
+        self.shots.append(pos)
+        for ship in self.ships:
+            if pos in ship.positions:
+                ship.hits.append(pos)
+                if ship.is_sunk():
+                    return "sunk"
+                return "hit"
+        return "miss"
+
+
+class LegacyGame(BaseModel):
+    player1_board: LegacyBoard = LegacyBoard()
+    player2_board: LegacyBoard = LegacyBoard()
+    player1_name: str = ""
+    player2_name: str = ""
+    current_turn: str = "player1"
+
+    def switch_turn(self):
+        self.current_turn = "player1" if self.current_turn == "player2" else "player2"
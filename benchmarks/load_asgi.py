@@ -0,0 +1,186 @@
+"""
+Нагрузочный тест сервера в процессе: ASGI-транспорт httpx, без сети.
+
+Каждый клиент-бот играет партии целиком: create_game -> join_game -> по
+place_ship за каждого игрока -> выстрелы по очереди до потопления всего
+флота; после смены хода соперник запрашивает /get_game_info/, как это
+делает клиент игры. Одновременно работает `--concurrency` клиентов.
+
+Для каждого маршрута считаются p50/p95/p99 задержки и запросов в секунду.
+Результат записывается в JSON (`--output`); с `--compare` прогон сравнивается
+с сохранённым ранее, и рост p95 больше чем на `--tolerance` считается регрессией.
+
+Запуск из корня проекта:
+    python -m benchmarks.load_asgi --concurrency 50 --games 500 --output load.json
+    python -m benchmarks.load_asgi --concurrency 50 --games 500 --compare load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+os.environ.setdefault("SEA_BATTLE_PERSIST", "0")
+
+import httpx  # noqa: E402
+
+from common.fleet import COLS, FLEET, ROWS, random_fleet  # noqa: E402
+from server import server  # noqa: E402
+
+SHIPS = sum(FLEET.values())
+
+
+class Recorder:
+    """Задержки запросов по маршрутам."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client, method, url, name, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+async def play(client, recorder, rng):
+    """Одна партия двух ботов от создания до потопления всего флота."""
+    response = await recorder.request(client, "POST", "/create_game/", "create_game", json={"player1_name": "load"})
+    game_id = response.json()["game_id"]
+    await recorder.request(client, "POST", "/join_game/", "join_game",
+                           json={"game_id": game_id, "player2_name": "load"})
+    for player in ("player1", "player2"):
+        await recorder.request(client, "POST", "/place_ship/", "place_ship",
+                               json={"ships": random_fleet(rng), "game_id": game_id, "player": player})
+    targets = {}
+    for player in ("player1", "player2"):
+        targets[player] = [(row, col) for row in range(ROWS) for col in range(COLS)]
+        rng.shuffle(targets[player])
+    sunk = {"player1": 0, "player2": 0}
+    turn = "player1"
+    while targets[turn]:
+        response = await recorder.request(client, "POST", "/shoot/", "shoot",
+                                          json={"game_id": game_id, "pos": targets[turn].pop(), "player": turn})
+        result = response.json().get("result")
+        if result == "sunk":
+            sunk[turn] += 1
+            if sunk[turn] == SHIPS:
+                return
+        elif result == "miss":
+            turn = "player2" if turn == "player1" else "player1"
+            await recorder.request(client, "GET", f"/get_game_info/{game_id}", "get_game_info")
+
+
+async def worker(client, recorder, rng, counter, games):
+    while counter[0] < games:
+        counter[0] += 1
+        await play(client, recorder, rng)
+
+
+def percentile(values, fraction):
+    """Значение, ниже которого лежит доля `fraction` отсортированных значений."""
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for name, values in sorted(recorder.latencies.items()):
+        values.sort()
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": recorder.errors[name],
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return endpoints
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(concurrency, games, seed):
+    server.games.clear()
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=server.app)
+    counter = [0]
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client, recorder, random.Random(seed + i), counter, games)
+                               for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    total = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "concurrency": concurrency,
+        "games": games,
+        "elapsed_s": elapsed,
+        "rps": total / elapsed,
+        "endpoints": summarize(recorder, elapsed),
+    }
+
+
+def print_results(results):
+    print(f"{results['games']} games, concurrency {results['concurrency']}: "
+          f"{results['rps']:,.0f} req/s in {results['elapsed_s']:.1f}s")
+    print(f"{'endpoint':<15}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, stats in results["endpoints"].items():
+        print(f"{name:<15}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10,.0f}"
+              f"{stats['p50_ms']:>9.3f}{stats['p95_ms']:>9.3f}{stats['p99_ms']:>9.3f}")
+
+
+def compare(results, baseline, tolerance):
+    """Печатает изменение p95 относительно прошлого прогона. Возвращает список регрессий."""
+    regressions = []
+    print(f"compared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name, stats in results["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        change = stats["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"  {name:<15} p95 {before['p95_ms']:.3f} -> {stats['p95_ms']:.3f} ms ({change:+.0%}){flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="записать результаты в JSON-файл")
+    parser.add_argument("--compare", help="JSON-файл прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p95, доля")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.concurrency, args.games, args.seed))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
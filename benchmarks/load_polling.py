@@ -0,0 +1,116 @@
+"""
+Нагрузочный тест ожидания хода: опрос /get_game_info/, длинный опрос и поток событий /events/.
+
+Каждый клиент ждёт хода соперника так же, как `game_phase`: в режиме polling
+он запрашивает состояние в цикле без пауз, в режиме longpoll передаёт
+`since_version` и получает ответ только при изменении партии, в режиме events
+держит одно SSE-соединение. Параллельно ведущий игрок делает выстрел раз
+в `--shot-interval` секунд. Скрипт считает HTTP-запросы на одну активную партию.
+
+Сервер должен быть запущен отдельно:
+    uvicorn server.server:app
+    python -m benchmarks.load_polling --games 20 --duration 10
+"""
+import argparse
+import threading
+import time
+
+import requests
+
+from common.fleet import ship_cells
+
+FLEET = [
+    {"size": 4, "orientation": 0, "start_pos": [0, 0]}, {"size": 3, "orientation": 1, "start_pos": [2, 0]},
+    {"size": 3, "orientation": 0, "start_pos": [9, 0]}, {"size": 2, "orientation": 1, "start_pos": [0, 9]},
+    {"size": 2, "orientation": 0, "start_pos": [4, 4]}, {"size": 2, "orientation": 1, "start_pos": [6, 7]},
+    {"size": 1, "orientation": 0, "start_pos": [2, 5]}, {"size": 1, "orientation": 0, "start_pos": [6, 2]},
+    {"size": 1, "orientation": 0, "start_pos": [9, 9]}, {"size": 1, "orientation": 0, "start_pos": [4, 9]},
+]
+
+
+def setup_game(session, url, index):
+    game_id = session.post(f"{url}/create_game/", json={"player1_name": f"host{index}"}).json()["game_id"]
+    session.post(f"{url}/join_game/", json={"game_id": game_id, "player2_name": f"guest{index}"})
+    for player in ("player1", "player2"):
+        session.post(f"{url}/place_ship/", json={"ships": FLEET, "game_id": game_id, "player": player})
+    return game_id
+
+
+def polling_client(url, game_id, stop, counter):
+    session = requests.Session()
+    requests_made = 0
+    while not stop.is_set():
+        session.get(f"{url}/get_game_info/{game_id}").json()
+        requests_made += 1
+    counter.append(requests_made)
+
+
+def longpoll_client(url, game_id, stop, counter):
+    session = requests.Session()
+    requests_made = 0
+    version = session.get(f"{url}/get_game_info/{game_id}").json()["version"]
+    while not stop.is_set():
+        response = session.get(f"{url}/get_game_info/{game_id}", params={"since_version": version, "timeout": 1})
+        requests_made += 1
+        if response.status_code != 304:
+            version = response.json()["version"]
+    counter.append(requests_made + 1)
+
+
+def events_client(url, game_id, stop, counter):
+    events_seen = 0
+    with requests.get(f"{url}/events/{game_id}", stream=True, timeout=(5, 1)) as response:
+        lines = response.iter_lines(decode_unicode=True)
+        while not stop.is_set():
+            try:
+                line = next(lines)
+            except (requests.exceptions.ConnectionError, StopIteration):
+                break
+            if line.startswith("data: "):
+                events_seen += 1
+    counter.append(1)
+
+
+def shooter(url, game_ids, stop, interval):
+    """Стреляет мимо по очереди в каждой партии, имитируя ходы соперника."""
+    session = requests.Session()
+    occupied = {cell for ship in FLEET for cell in ship_cells(ship["size"], ship["orientation"], *ship["start_pos"])}
+    cells = [(row, col) for row in range(10) for col in range(10) if (row, col) not in occupied]
+    turn = 0
+    while not stop.wait(interval) and turn < len(cells):
+        for game_id in game_ids:
+            session.post(f"{url}/shoot/", json={"game_id": game_id, "pos": cells[turn], "player": "player1"})
+        turn += 1
+
+
+def run(mode, url, games, duration, shot_interval):
+    session = requests.Session()
+    game_ids = [setup_game(session, url, i) for i in range(games)]
+    stop = threading.Event()
+    counter = []
+    target = {"polling": polling_client, "longpoll": longpoll_client, "events": events_client}[mode]
+    threads = [threading.Thread(target=target, args=(url, game_id, stop, counter)) for game_id in game_ids]
+    threads.append(threading.Thread(target=shooter, args=(url, game_ids, stop, shot_interval)))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    per_game = sum(counter) / games
+    print(f"{mode:<8} {per_game:>10.0f} requests/game  {per_game / duration:>10.1f} requests/game/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--shot-interval", type=float, default=1.0)
+    args = parser.parse_args()
+    for mode in ("polling", "longpoll", "events"):
+        run(mode, args.url, args.games, args.duration, args.shot_interval)
+
+
+if __name__ == "__main__":
+    main()
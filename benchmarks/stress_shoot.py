@@ -0,0 +1,96 @@
+"""
+Стресс-тест конкурентных выстрелов: тысячи одновременных запросов /shoot/ по многим партиям.
+
+Оба игрока каждой партии стреляют одновременно, в том числе по одним и тем же
+клеткам. После прогона проверяется, что ни одно изменение не потеряно:
+каждый принятый выстрел записан на поле ровно один раз, попадания совпадают
+с ответами сервера, а ID партий уникальны.
+
+Запуск из корня проекта:
+    python -m benchmarks.stress_shoot --games 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+
+os.environ.setdefault("SEA_BATTLE_PERSIST", "0")
+
+import httpx  # noqa: E402
+
+from server import server  # noqa: E402
+
+FLEET = [
+    {"size": 4, "orientation": 0, "start_pos": [0, 0]}, {"size": 3, "orientation": 1, "start_pos": [2, 0]},
+    {"size": 3, "orientation": 0, "start_pos": [9, 0]}, {"size": 2, "orientation": 1, "start_pos": [0, 9]},
+    {"size": 2, "orientation": 0, "start_pos": [4, 4]}, {"size": 2, "orientation": 1, "start_pos": [6, 7]},
+    {"size": 1, "orientation": 0, "start_pos": [2, 5]}, {"size": 1, "orientation": 0, "start_pos": [6, 2]},
+    {"size": 1, "orientation": 0, "start_pos": [9, 9]}, {"size": 1, "orientation": 0, "start_pos": [4, 9]},
+]
+
+
+async def setup(client, games):
+    created = await asyncio.gather(*[
+        client.post("/create_game/", json={"player1_name": f"p{i}"}) for i in range(games)])
+    game_ids = [response.json()["game_id"] for response in created]
+    assert len(set(game_ids)) == games, "ID партий повторяются"
+    await asyncio.gather(*[
+        client.post("/join_game/", json={"game_id": game_id, "player2_name": "rival"}) for game_id in game_ids])
+    await asyncio.gather(*[
+        client.post("/place_ship/", json={"ships": FLEET, "game_id": game_id, "player": player})
+        for game_id in game_ids for player in ("player1", "player2")])
+    return game_ids
+
+
+async def fire(client, game_id, player, pos, accepted):
+    response = await client.post("/shoot/", json={"game_id": game_id, "pos": pos, "player": player})
+    if response.status_code == 200:
+        accepted[(game_id, player)].append((tuple(pos), response.json()["result"]))
+
+
+def verify(game_ids, accepted):
+    for game_id in game_ids:
+        game = server.games.get(game_id)
+        for player, board in (("player1", game.player2_board), ("player2", game.player1_board)):
+            results = accepted.get((game_id, player), [])
+            fired = [pos for pos, result in results if result != "already_shot"]
+            assert len(fired) == len(set(fired)), f"партия {game_id}: выстрел принят дважды"
+            assert sorted(fired) == sorted(board.shots), f"партия {game_id}: потерян выстрел {player}"
+            hits = sum(result in ("hit", "sunk") for _, result in results)
+            assert hits == sum(len(ship.hits) for ship in board.ships), f"партия {game_id}: потеряно попадание"
+            sunk = sum(result == "sunk" for _, result in results)
+            assert sunk == sum(ship.is_sunk() for ship in board.ships), f"партия {game_id}: потерян потопленный"
+
+
+async def main(games, shots_per_player, seed):
+    rng = random.Random(seed)
+    server.games.clear()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        game_ids = await setup(client, games)
+        accepted = {}
+        for game_id in game_ids:
+            accepted[(game_id, "player1")] = []
+            accepted[(game_id, "player2")] = []
+        requests = [fire(client, game_id, player, [rng.randrange(10), rng.randrange(10)], accepted)
+                    for game_id in game_ids for player in ("player1", "player2") for _ in range(shots_per_player)]
+        rng.shuffle(requests)
+        start = time.perf_counter()
+        await asyncio.gather(*requests)
+        elapsed = time.perf_counter() - start
+    verify(game_ids, accepted)
+    statuses = Counter(result for results in accepted.values() for _, result in results)
+    print(f"{len(requests)} concurrent shots in {elapsed:.2f}s ({len(requests) / elapsed:,.0f} req/s)")
+    print(f"accepted: {dict(statuses)}; rejected as out of turn: {len(requests) - sum(statuses.values())}")
+    print("OK: no lost or duplicated updates")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--shots-per-player", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.games, args.shots_per_player, args.seed))
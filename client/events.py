@@ -0,0 +1,52 @@
+import json
+import queue
+import threading
+
+import requests
+
+
+class EventStream:
+    """Читает поток событий партии (SSE) в фоновом потоке.
+
+    Цикл отрисовки забирает накопленные события через `poll()` и не делает
+    запросов к серверу. При обрыве соединения поток переподключается.
+    """
+
+    def __init__(self, server_url, game_id, reconnect_delay=1.0):
+        self.url = f"{server_url}/events/{game_id}"
+        self.reconnect_delay = reconnect_delay
+        self._events = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def poll(self):
+        """Возвращает все события, пришедшие с прошлого вызова."""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        """Останавливает фоновый поток, не дожидаясь его.
+
+        Соединение закрывает сам фоновый поток, получив следующую строку
+        (не позже keepalive сервера): закрытие из цикла отрисовки ждало бы,
+        пока чтение в фоновом потоке не вернётся, и замораживало окно.
+        """
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with requests.get(self.url, stream=True, timeout=(5, None)) as response:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if self._stopped.is_set():
+                            return
+                        if line and line.startswith("data: "):
+                            self._events.put(json.loads(line[len("data: "):]))
+            except (requests.exceptions.RequestException, ValueError):
+                pass
+            self._stopped.wait(self.reconnect_delay)
@@ -1,6 +1,14 @@
+import os
 import pygame
 import sys
-import requests
+from events import EventStream
+from loop import FrameLoop
+from network import SERVER_URL, RequestQueue
+from render import BoardView, text, wrapped_text
+
+# Правила расстановки общие с сервером и лежат в пакете common в корне проекта
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import fleet  # noqa: E402
 
 # Константы и цвета
 ROWS, COLS = 10, 10
@@ -10,103 +18,31 @@ OFFSET = 0
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GRAY = (169, 169, 169)
+INVALID = (255, 160, 160)
+MESSAGE_FONT_SIZE = 18
+WAITING_MESSAGE = "Ожидание хода другого игрока."
 
-# URL сервера
-SERVER_URL = "http://127.0.0.1:8000"
+# Получать события партии потоком от сервера вместо постоянного опроса /get_game_info/
+USE_EVENTS = True
+# Время ожидания изменений при длинном опросе /get_game_info/, секунды
+LONG_POLL_TIMEOUT = 25
 
 
-# Псевдо функция для отправки кораблей на сервер
-def send_ships_to_server(ships, game_id, player):
-    response = requests.post(f"{SERVER_URL}/place_ship/", json={"ships": ships, "game_id": game_id, "player": player})
-    return response.json()
+def draw_labels(screen):
+    screen.blit(text('Player 1', 24), (MARGIN + 4 * CELL_SIZE, MARGIN - 40))
+    screen.blit(text('Player 2', 24), (MARGIN + 4 * CELL_SIZE + screen.get_width() // 2 + OFFSET // 2, MARGIN - 40))
 
 
-def draw_labels(screen):
-    font = pygame.font.SysFont('Arial', 24)
-    player_label = font.render('Player 1', True, BLACK)
-    computer_label = font.render('Player 2', True, BLACK)
-    screen.blit(player_label, (MARGIN + 4 * CELL_SIZE, MARGIN - 40))
-    screen.blit(computer_label, (MARGIN + 4 * CELL_SIZE + screen.get_width() // 2 + OFFSET // 2, MARGIN - 40))
-
-
-def draw_grid(screen, shots=None, offset_x=0):
-    if shots is None:
-        shots = {}
-    for row in range(ROWS):
-        for col in range(COLS):
-            cell_rect = pygame.Rect(MARGIN + col * CELL_SIZE + offset_x, MARGIN + row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(screen, GRAY, cell_rect, 1)
-            if (row, col) in shots:
-                if shots[(row, col)] == "hit":
-                    pygame.draw.rect(screen, (255, 0, 0), cell_rect)
-                elif shots[(row, col)] == "miss":
-                    pygame.draw.line(screen, BLACK, cell_rect.topleft, cell_rect.bottomright, 2)
-                    pygame.draw.line(screen, BLACK, cell_rect.topright, cell_rect.bottomleft, 2)
-
-
-def draw_ships(screen, ships, offset_x=0):
+def draw_ships(screen, ships, offset_x=0, color=GRAY):
     for ship in ships:
         for i in range(ship["size"]):
             pos = (ship["start_pos"][0] + i if ship["orientation"] == 1 else ship["start_pos"][0],
                    ship["start_pos"][1] + i if ship["orientation"] == 0 else ship["start_pos"][1])
-            pygame.draw.rect(screen, GRAY, (
+            pygame.draw.rect(screen, color, (
                 MARGIN + pos[1] * CELL_SIZE + offset_x, MARGIN + pos[0] * CELL_SIZE, CELL_SIZE, CELL_SIZE))
 
 
-def is_valid_placement(placed_ships, ship_size, orientation, start_pos):
-    row, col = start_pos
-
-    # Проверка, чтобы корабль оставался в пределах сетки
-    if orientation == 0:  # Горизонтальное размещение
-        if col + ship_size > COLS:
-            return False
-    else:  # Вертикальное размещение
-        if row + ship_size > ROWS:
-            return False
-
-    # Проверка на перекрытие и соседство с другими кораблями
-    for i in range(ship_size):
-        if orientation == 0:  # Горизонтальное размещение
-            r, c = row, col + i
-        else:  # Вертикальное размещение
-            r, c = row + i, col
-
-        # Проверка на перекрытие с другими кораблями
-        for placed_ship in placed_ships:
-            ps_row, ps_col = placed_ship["start_pos"]
-            ps_size = placed_ship["size"]
-            ps_orientation = placed_ship["orientation"]
-            for j in range(ps_size):
-                if ps_orientation == 0:
-                    pr, pc = ps_row, ps_col + j
-                else:
-                    pr, pc = ps_row + j, ps_col
-
-                if r == pr and c == pc:
-                    return False
-
-        # Проверка на соседство с другими кораблями
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < ROWS and 0 <= nc < COLS:
-                    for placed_ship in placed_ships:
-                        ps_row, ps_col = placed_ship["start_pos"]
-                        ps_size = placed_ship["size"]
-                        ps_orientation = placed_ship["orientation"]
-                        for j in range(ps_size):
-                            if ps_orientation == 0:
-                                pr, pc = ps_row, ps_col + j
-                            else:
-                                pr, pc = ps_row + j, ps_col
-
-                            if nr == pr and nc == pc:
-                                return False
-
-    return True
-
-
-def draw_messages(screen, messages, font, message_box):
+def draw_messages(screen, messages, message_box):
     pygame.draw.rect(screen, WHITE, message_box)
     pygame.draw.rect(screen, BLACK, message_box, 1)  # Добавим рамку для области сообщений
 
@@ -114,19 +50,8 @@ def draw_messages(screen, messages, font, message_box):
     line_spacing = 30
 
     for message in messages[-1:]:
-        words = message.split(' ')
-        lines = []
-        line = ""
-        for word in words:
-            if font.size(line + word)[0] < message_box.width - 10:
-                line += word + " "
-            else:
-                lines.append(line)
-                line = word + " "
-        lines.append(line)
-
-        for line in lines:
-            message_surf = font.render(line, True, BLACK)
+        # Строки сообщения разбиваются и рендерятся один раз, а не в каждом кадре
+        for message_surf in wrapped_text(message, MESSAGE_FONT_SIZE, message_box.width - 10):
             screen.blit(message_surf, (message_box.x + 5, y_offset))
             y_offset += line_spacing
 
@@ -143,34 +68,29 @@ def placement_phase(screen, game_id, player):
     dragging = False
     ship_pos = (0, 0)
     placed_ships = []
+    # Клетки расставленных кораблей и соседние с ними: сюда нельзя ставить следующий корабль
+    blocked = 0
     messages = ["Разместите корабли."]
 
     finish_button = pygame.Rect(screen.get_width() - 200, screen.get_height() - 50, 150, 40)
     finish_button_active = False
+    random_button = pygame.Rect(screen.get_width() - 200, screen.get_height() - 100, 150, 40)
 
     message_box = pygame.Rect((screen.get_width() - 150) // 2, MARGIN, 150, 200)
-    font = pygame.font.SysFont('Arial', 18)
+    empty_board = BoardView(ROWS, COLS, CELL_SIZE)
+
+    events = EventStream(SERVER_URL, game_id) if USE_EVENTS else None
+    opponent_joined = False
+    net = RequestQueue()
 
+    loop = FrameLoop()
     while run:
-        screen.fill(WHITE)
-        draw_labels(screen)
-        draw_grid(screen)
-        draw_grid(screen, offset_x=screen.get_width() // 2 + OFFSET)
-
-        for i, (size, label) in enumerate(set(ships_to_place)):
-            count = ships_to_place.count((size, label))
-            font = pygame.font.SysFont('Arial', 24)
-            count_label = font.render(str(count), True, BLACK)
-            screen.blit(count_label, (10, 100 + i * CELL_SIZE * 2))
-            for j in range(size):
-                pygame.draw.rect(screen, GRAY, (30 + j * CELL_SIZE, 100 + i * CELL_SIZE * 2, CELL_SIZE, CELL_SIZE))
-
-        pygame.draw.rect(screen, GRAY if not finish_button_active else BLACK, finish_button)
-        font = pygame.font.SysFont('Arial', 24)
-        finish_label = font.render("Закончить", True, WHITE)
-        screen.blit(finish_label, (finish_button.x + 10, finish_button.y + 10))
-
-        for event in pygame.event.get():
+        if events is not None:
+            for event in events.poll():
+                if event["type"] in ("state", "joined") and event.get("player2_name"):
+                    opponent_joined = True
+
+        for event in loop.events():
             if event.type == pygame.QUIT:
                 run = False
             if event.type == pygame.KEYDOWN:
@@ -178,34 +98,31 @@ def placement_phase(screen, game_id, player):
                     orientation = (orientation + 1) % 2
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = event.pos
-                if finish_button.collidepoint(event.pos) and finish_button_active:
-                    try:
-                        response = requests.get(f"{SERVER_URL}/get_game_info/{game_id}")
-                        game_info = response.json()
-                    except requests.exceptions.JSONDecodeError:
-                        messages.append("Ошибка: Неверный ответ от сервера.")
-                        game_info = None
-
-                    if game_info and not game_info.get("player2_name"):
+                if random_button.collidepoint(event.pos):
+                    placed_ships = fleet.random_fleet()
+                    blocked = 0
+                    for ship in placed_ships:
+                        blocked |= fleet.halo(ship["size"], ship["orientation"], ship["start_pos"])
+                    ships_to_place = []
+                    dragging = False
+                    finish_button_active = True
+                    messages.append("Корабли расставлены случайно.")
+                elif finish_button.collidepoint(event.pos) and finish_button_active:
+                    if net.busy("check") or net.busy("place"):
+                        pass
+                    elif events is None:
+                        # Без потока событий о подключении соперника узнаём запросом
+                        net.submit("check", "GET", f"/get_game_info/{game_id}")
+                    elif not opponent_joined:
                         messages.append("Второй игрок ещё не подключился.")
-                        print("Второй игрок ещё не подключился.")
                     else:
-                        try:
-                            response = send_ships_to_server(placed_ships, game_id, player)
-                        except requests.exceptions.JSONDecodeError:
-                            messages.append("Ошибка отправки данных на сервер.")
-                            print("Ошибка отправки данных на сервер.")
-                        else:
-                            if response['message'] == "Ship placed successfully.":
-                                run = False
-                                game_phase(screen, placed_ships, game_id, player)
-                            else:
-                                messages.append("Ошибка: " + response.get("error", "Неизвестная ошибка"))
+                        net.submit("place", "POST", "/place_ship/",
+                                   json={"ships": placed_ships, "game_id": game_id, "player": player})
                 else:
                     ship_index = (mouse_y - 100) // (2 * CELL_SIZE)
                     if 0 <= ship_index < len(ships_to_place):
                         dragging = True
-                        ship_pos = (mouse_x, mouse_y)
+                        ship_pos = ((mouse_y - MARGIN) // CELL_SIZE, (mouse_x - MARGIN) // CELL_SIZE)
                         current_ship_index = ship_index
                         current_ship_size = ships_to_place[current_ship_index][0]
             if event.type == pygame.MOUSEBUTTONUP:
@@ -214,9 +131,10 @@ def placement_phase(screen, game_id, player):
                     col = (mouse_x - MARGIN) // CELL_SIZE
                     row = (mouse_y - MARGIN) // CELL_SIZE
                     start_pos = (row, col)
-                    if is_valid_placement(placed_ships, current_ship_size, orientation, start_pos):
+                    if fleet.fits(blocked, current_ship_size, orientation, start_pos):
                         placed_ships.append(
                             {"size": current_ship_size, "orientation": orientation, "start_pos": start_pos})
+                        blocked |= fleet.halo(current_ship_size, orientation, start_pos)
                         ships_to_place.remove((current_ship_size, ships_to_place[current_ship_index][1]))
                         if not ships_to_place:
                             finish_button_active = True
@@ -230,13 +148,57 @@ def placement_phase(screen, game_id, player):
             if event.type == pygame.MOUSEMOTION and dragging:
                 ship_pos = (event.pos[1] - MARGIN) // CELL_SIZE, (event.pos[0] - MARGIN) // CELL_SIZE
 
-        if dragging:
-            draw_ships(screen, [
-                {"size": current_ship_size, "orientation": orientation, "start_pos": (ship_pos[0], ship_pos[1])}])
+        for reply in net.poll():
+            loop.invalidate()
+            if not reply.ok:
+                messages.append("Ошибка: " + reply.detail())
+            elif reply.tag == "check" and not reply.data.get("player2_name"):
+                messages.append("Второй игрок ещё не подключился.")
+            elif reply.tag == "check":
+                net.submit("place", "POST", "/place_ship/",
+                           json={"ships": placed_ships, "game_id": game_id, "player": player})
+            elif reply.tag == "place":
+                run = False
+                if events is not None:
+                    events.close()
+                game_phase(screen, placed_ships, game_id, player)
+
+        if run and loop.redraw():
+            screen.fill(WHITE)
+            draw_labels(screen)
+            empty_board.draw(screen, MARGIN, MARGIN)
+            empty_board.draw(screen, screen.get_width() // 2 + OFFSET + MARGIN, MARGIN)
+
+            for i, (size, label) in enumerate(set(ships_to_place)):
+                count = ships_to_place.count((size, label))
+                screen.blit(text(count, 24), (10, 100 + i * CELL_SIZE * 2))
+                for j in range(size):
+                    pygame.draw.rect(screen, GRAY, (30 + j * CELL_SIZE, 100 + i * CELL_SIZE * 2, CELL_SIZE, CELL_SIZE))
+
+            pygame.draw.rect(screen, GRAY if not finish_button_active else BLACK, finish_button)
+            screen.blit(text("Закончить", 24, WHITE), (finish_button.x + 10, finish_button.y + 10))
+            pygame.draw.rect(screen, BLACK, random_button)
+            screen.blit(text("Случайно", 24, WHITE), (random_button.x + 10, random_button.y + 10))
+
+            if dragging:
+                valid = fleet.fits(blocked, current_ship_size, orientation, ship_pos)
+                draw_ships(screen, [
+                    {"size": current_ship_size, "orientation": orientation, "start_pos": (ship_pos[0], ship_pos[1])}],
+                    color=GRAY if valid else INVALID)
+
+            draw_ships(screen, placed_ships)
+            draw_messages(screen, messages, message_box)
+            pygame.display.flip()
 
-        draw_ships(screen, placed_ships)
-        draw_messages(screen, messages, font, message_box)
-        pygame.display.flip()
+
+def apply_moves(moves, player, my_shots, enemy_shots, last_seq):
+    """Отмечает на полях ходы журнала партии с номерами больше `last_seq`. Возвращает номер последнего хода."""
+    for seq, shooter, row, col, result in moves:
+        if seq > last_seq:
+            shots = my_shots if shooter == player else enemy_shots
+            shots[(row, col)] = "miss" if result == "miss" else "hit"
+            last_seq = seq
+    return last_seq
 
 
 def game_phase(screen, placed_ships, game_id, player):
@@ -244,75 +206,122 @@ def game_phase(screen, placed_ships, game_id, player):
     offset_x = screen.get_width() // 2 + OFFSET
     messages = ["Игра началась. Стреляйте по полю противника."]
     message_box = pygame.Rect((screen.get_width() - 150) // 2, MARGIN, 150, 200)
-    font = pygame.font.SysFont('Arial', 18)
+    # Поля рисуются в свои поверхности: сетка и корабли один раз, выстрелы - по изменившимся клеткам
+    my_board = BoardView(ROWS, COLS, CELL_SIZE, [cell for ship in placed_ships for cell in fleet.ship_cells(
+        ship["size"], ship["orientation"], *ship["start_pos"])])
+    enemy_board = BoardView(ROWS, COLS, CELL_SIZE)
 
     my_shots = {}  # Выстрелы по полю противника
     enemy_shots = {}  # Выстрелы противника по вашему полю
 
+    events = EventStream(SERVER_URL, game_id) if USE_EVENTS else None
+    net = RequestQueue()
+    current_player = None
+    game_info = None
+    refresh = True  # Состояние нужно запросить сразу, не дожидаясь изменений
+    winner = None  # Становится известен, когда у одного из игроков потоплены все корабли
+    game_over_shown = False
+    last_seq = -1  # Номер последнего хода журнала партии, уже отмеченного на полях
+    pending_shot = None  # Клетка выстрела, ответа на который ещё нет
+
+    loop = FrameLoop()
     while run:
-        try:
-            response = requests.get(f"{SERVER_URL}/get_game_info/{game_id}")
-            game_info = response.json()
-        except requests.exceptions.JSONDecodeError:
-            messages.append("Ошибка: Неверный ответ от сервера.")
-            game_info = None
-
-        if not game_info:
+        for event in loop.events():
+            if event.type == pygame.QUIT:
+                run = False
+            if event.type == pygame.MOUSEBUTTONDOWN and winner is None and current_player == player:
+                mouse_x, mouse_y = event.pos
+                if offset_x + MARGIN <= mouse_x < offset_x + MARGIN + COLS * CELL_SIZE and \
+                        MARGIN <= mouse_y < MARGIN + ROWS * CELL_SIZE:
+                    col = (mouse_x - offset_x - MARGIN) // CELL_SIZE
+                    row = (mouse_y - MARGIN) // CELL_SIZE
+                    if (row, col) in my_shots:
+                        messages.append("Вы уже стреляли сюда.")
+                    elif pending_shot is None:
+                        # Выстрел отмечается сразу, результат приходит ответом сервера или событием
+                        pending_shot = (row, col)
+                        my_shots[pending_shot] = "pending"
+                        net.submit("shoot", "POST", "/shoot/",
+                                   json={"game_id": game_id, "pos": pending_shot, "player": current_player})
+
+        if events is not None:
+            received = events.poll()
+            if received:
+                loop.invalidate()
+            for event in received:
+                current_player = event.get("current_turn", current_player)
+                winner = event.get("winner") or winner
+                seq = event.get("seq", event.get("last_seq", -1))
+                if seq == last_seq + 1 and event["type"] == "shot":
+                    last_seq = apply_moves([(seq, event["player"], *event["pos"], event["result"])],
+                                           player, my_shots, enemy_shots, last_seq)
+                elif seq > last_seq and not net.busy("moves"):
+                    # События пропущены (переподключение): догрузить недостающие ходы
+                    net.submit("moves", "GET", f"/get_game_info/{game_id}", params={"after_seq": last_seq})
+        elif winner is None and (refresh or current_player != player) and not net.busy("info"):
+            # Длинный опрос: сервер отвечает, только когда состояние партии изменится
+            params = {"after_seq": last_seq}
+            if not refresh:
+                params.update(since_version=game_info["version"], timeout=LONG_POLL_TIMEOUT)
+            net.submit("info", "GET", f"/get_game_info/{game_id}", params=params, timeout=LONG_POLL_TIMEOUT + 5)
+
+        for reply in net.poll():
+            loop.invalidate()
+            if reply.tag == "shoot":
+                cell, pending_shot = pending_shot, None
+                refresh = True
+                result = reply.data.get("result") if reply.ok else None
+                if result is None:
+                    messages.append("Ошибка: " + reply.detail())
+                    if my_shots.get(cell) == "pending":
+                        del my_shots[cell]
+                    continue
+                if my_shots.get(cell) == "pending":
+                    my_shots[cell] = "miss" if result == "miss" else "hit"
+                if result == "hit":
+                    messages.append(f"Попадание! Ходит {current_player}.")
+                elif result == "miss":
+                    messages.append(f"Мимо! Ходит другой игрок.")
+                elif result == "sunk":
+                    messages.append(f"Корабль потоплен! Ходит {current_player}.")
+            elif not reply.ok:
+                messages.append("Ошибка: " + reply.detail())
+                if reply.tag == "info":
+                    refresh = True
+            elif reply.tag == "moves":
+                last_seq = apply_moves(reply.data.get("moves", ()), player, my_shots, enemy_shots, last_seq)
+            elif reply.tag == "info" and reply.data is not None:
+                # Пустой ответ (304) - состояние не менялось, опрос повторится в следующем кадре
+                game_info = reply.data
+                refresh = False
+                if 'current_turn' not in game_info:
+                    messages.append("Ошибка: Неверный формат данных от сервера.")
+                    refresh = True
+                    continue
+                current_player = game_info['current_turn']
+                winner = game_info.get('winner')
+                last_seq = apply_moves(game_info.get('moves', ()), player, my_shots, enemy_shots, last_seq)
+
+        if current_player is None:
+            # Начальное состояние партии ещё не получено
             continue
 
-        # Check if 'current_turn' exists in the response
-        if 'current_turn' not in game_info:
-            messages.append("Ошибка: Неверный формат данных от сервера.")
+        if winner is not None:
+            if not game_over_shown:
+                messages.append("Вы победили!" if winner == player else "Вы проиграли.")
+                game_over_shown = True
+        elif current_player != player and messages[-1] != WAITING_MESSAGE:
+            messages.append(WAITING_MESSAGE)
+
+        if loop.redraw():
+            screen.fill(WHITE)
+            draw_labels(screen)
+            enemy_board.update(my_shots)  # Выстрелы игрока на поле противника
+            enemy_board.draw(screen, offset_x + MARGIN, MARGIN)
+            my_board.update(enemy_shots)  # Выстрелы противника на поле игрока, поверх его кораблей
+            my_board.draw(screen, MARGIN, MARGIN)
+            draw_messages(screen, messages, message_box)
             pygame.display.flip()
-            continue
-
-        current_player = game_info['current_turn']
-
-        screen.fill(WHITE)
-        draw_labels(screen)
-        draw_grid(screen, my_shots, offset_x)  # Выстрелы игрока на поле противника
-        draw_grid(screen, enemy_shots)  # Выстрелы противника на поле игрока
 
-        # Рисуем корабли игрока на его поле, но не на поле противника
-        draw_ships(screen, placed_ships)
-
-        draw_messages(screen, messages, font, message_box)
-
-        if current_player != player:
-            messages.append("Ожидание хода другого игрока.")
-            enemy_shot = game_info.get('last_shot')
-            if enemy_shot:
-                enemy_shots[(enemy_shot[0], enemy_shot[1])] = "hit" if enemy_shot[2] == "hit" else "miss"
-        else:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    run = False
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_x, mouse_y = event.pos
-                    if offset_x + MARGIN <= mouse_x < offset_x + MARGIN + COLS * CELL_SIZE and \
-                            MARGIN <= mouse_y < MARGIN + ROWS * CELL_SIZE:
-                        col = (mouse_x - offset_x - MARGIN) // CELL_SIZE
-                        row = (mouse_y - MARGIN) // CELL_SIZE
-                        try:
-                            response = requests.post(f"{SERVER_URL}/shoot/",
-                                                     json={"game_id": game_id, "pos": (row, col),
-                                                           "player": current_player})
-                            result = response.json()
-                        except requests.exceptions.JSONDecodeError:
-                            messages.append("Ошибка: Неверный ответ от сервера.")
-                            result = None
-
-                        if result:
-                            if result.get("result") == "hit":
-                                my_shots[(row, col)] = "hit"
-                                messages.append(f"Попадание! Ходит {current_player}.")
-                            elif result.get("result") == "miss":
-                                my_shots[(row, col)] = "miss"
-                                messages.append(f"Мимо! Ходит другой игрок.")
-                            elif result.get("result") == "sunk":
-                                my_shots[(row, col)] = "hit"
-                                messages.append(f"Корабль потоплен! Ходит {current_player}.")
-                            elif result.get("result") == "already_shot":
-                                messages.append("Вы уже стреляли сюда. Ходит другой игрок.")
-
-        pygame.display.flip()
+    if events is not None:
+        events.close()
@@ -0,0 +1,59 @@
+"""
+Общий цикл экранов клиента: ограничение частоты кадров, перерисовка по событиям и таймеры.
+
+Экран крутит цикл вида
+
+    loop = FrameLoop()
+    while run:
+        for event in loop.events():
+            ...
+        if loop.redraw():
+            ...  # рисование
+            pygame.display.flip()
+
+`events()` ждёт следующего кадра (не чаще `fps` раз в секунду) и выполняет
+наступившие таймеры. Кадр перерисовывается, только если пришли события
+pygame или состояние изменилось (`invalidate()`), поэтому окно без
+действий пользователя почти не нагружает процессор.
+"""
+import os
+
+import pygame
+
+# Наибольшая частота кадров клиента
+FPS = int(os.environ.get("SEA_BATTLE_FPS", "30"))
+
+
+class FrameLoop:
+    def __init__(self, fps=FPS):
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self._dirty = True  # Первый кадр рисуется всегда
+        self._timers = []  # [интервал, время следующего вызова, функция]
+
+    def every(self, interval, callback, now=True):
+        """Вызывает `callback` раз в `interval` секунд из `events()`; с `now` - и в ближайшем кадре."""
+        start = pygame.time.get_ticks() / 1000
+        self._timers.append([interval, start if now else start + interval, callback])
+
+    def invalidate(self):
+        """Отмечает, что состояние изменилось и кадр нужно перерисовать."""
+        self._dirty = True
+
+    def events(self):
+        """Ждёт следующего кадра, выполняет наступившие таймеры и возвращает события pygame."""
+        self.clock.tick(self.fps)
+        now = pygame.time.get_ticks() / 1000
+        for timer in self._timers:
+            if now >= timer[1]:
+                timer[1] = now + timer[0]
+                timer[2]()
+        events = pygame.event.get()
+        if events:
+            self._dirty = True
+        return events
+
+    def redraw(self):
+        """True, если кадр нужно перерисовать; сбрасывает отметку."""
+        dirty, self._dirty = self._dirty, False
+        return dirty
@@ -1,25 +1,22 @@
 import pygame
 import sys
-import requests
 from utils import draw_button
 from game import placement_phase
+from loop import FrameLoop
+from network import RequestQueue
 
-SERVER_URL = "http://127.0.0.1:8000"
+# Период обновления списка комнат, секунды
+LOBBY_REFRESH_INTERVAL = 2.0
 
 
 def main_menu(screen, game_rooms_menu, settings_menu):
     run = True
+    play_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 150, 200, 50)
+    settings_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 50, 200, 50)
+    quit_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 + 50, 200, 50)
+    loop = FrameLoop()
     while run:
-        screen.fill((255, 255, 255))
-        play_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 150, 200, 50)
-        settings_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 50, 200, 50)
-        quit_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 + 50, 200, 50)
-
-        draw_button(screen, "Играть", play_button, (169, 169, 169))
-        draw_button(screen, "Настройки", settings_button, (169, 169, 169))
-        draw_button(screen, "Выйти", quit_button, (169, 169, 169))
-
-        for event in pygame.event.get():
+        for event in loop.events():
             if event.type == pygame.QUIT:
                 run = False
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -30,72 +27,91 @@ def main_menu(screen, game_rooms_menu, settings_menu):
                 if quit_button.collidepoint(event.pos):
                     run = False
 
-        pygame.display.flip()
+        if loop.redraw():
+            screen.fill((255, 255, 255))
+            draw_button(screen, "Играть", play_button, (169, 169, 169))
+            draw_button(screen, "Настройки", settings_button, (169, 169, 169))
+            draw_button(screen, "Выйти", quit_button, (169, 169, 169))
+            pygame.display.flip()
     pygame.quit()
     sys.exit()
 
 
 def game_rooms_menu(screen):
     run = True
+    games = []
+    font = pygame.font.SysFont('Arial', 24)
+    create_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() - 100, 200, 50)
+    bot_button = pygame.Rect(screen.get_width() // 2 + 120, screen.get_height() - 100, 200, 50)
+    back_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() - 200, 200, 50)
+    net = RequestQueue()
+    loop = FrameLoop()
+
+    def refresh():
+        # Список комнат запрашивается по таймеру, а не в каждом кадре
+        if not net.busy("games"):
+            net.submit("games", "GET", "/get_games/")
+
+    loop.every(LOBBY_REFRESH_INTERVAL, refresh)
     while run:
-        screen.fill((255, 255, 255))
-        response = requests.get(f"{SERVER_URL}/get_games/")
-        games = response.json().get("games", [])
-
-        font = pygame.font.SysFont('Arial', 24)
-        y_offset = 100
-        if games:
-            for game_id in games:
-                game_button = pygame.Rect(screen.get_width() // 2 - 100, y_offset, 200, 50)
-                draw_button(screen, game_id, game_button, (169, 169, 169))
-                y_offset += 70
-        else:
-            no_games_label = font.render('Нет доступных комнат', True, (0, 0, 0))
-            no_games_rect = no_games_label.get_rect(center=(screen.get_width() // 2, y_offset))
-            screen.blit(no_games_label, no_games_rect)
-
-        create_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() - 100, 200, 50)
-        draw_button(screen, "Создать комнату", create_button, (169, 169, 169))
-        back_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() - 200, 200, 50)
-        draw_button(screen, "Назад", back_button, (169, 169, 169))
-
-        for event in pygame.event.get():
+        for event in loop.events():
             if event.type == pygame.QUIT:
                 run = False
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if create_button.collidepoint(event.pos):
-                    create_game(screen)
+                    create_game(screen, net)
+                if bot_button.collidepoint(event.pos):
+                    create_game(screen, net, vs_bot=True)
                 if back_button.collidepoint(event.pos):
                     run = False
                 for i, game_id in enumerate(games):
                     if pygame.Rect(screen.get_width() // 2 - 100, 100 + i * 70, 200, 50).collidepoint(event.pos):
                         player2_name = input_player_name(screen, "Введите имя игрока 2:")
-                        join_game(screen, game_id, player2_name)
-
-        pygame.display.flip()
+                        join_game(net, game_id, player2_name)
+                        break
+
+        for reply in net.poll():
+            if not reply.ok:
+                print(reply.detail())
+            elif reply.tag == "games":
+                fresh = reply.data.get("games", [])
+                if fresh != games:
+                    games = fresh
+                    loop.invalidate()
+            else:
+                # Комната создана или игрок подключён: расстановка кораблей, затем партия
+                placement_phase(screen, reply.data["game_id"], reply.data["player"])
+                loop.invalidate()
+                refresh()
+
+        if loop.redraw():
+            screen.fill((255, 255, 255))
+            y_offset = 100
+            if games:
+                for game_id in games:
+                    game_button = pygame.Rect(screen.get_width() // 2 - 100, y_offset, 200, 50)
+                    draw_button(screen, game_id, game_button, (169, 169, 169))
+                    y_offset += 70
+            else:
+                no_games_label = font.render('Нет доступных комнат', True, (0, 0, 0))
+                no_games_rect = no_games_label.get_rect(center=(screen.get_width() // 2, y_offset))
+                screen.blit(no_games_label, no_games_rect)
+
+            draw_button(screen, "Создать комнату", create_button, (169, 169, 169))
+            draw_button(screen, "С компьютером", bot_button, (169, 169, 169))
+            draw_button(screen, "Назад", back_button, (169, 169, 169))
+            pygame.display.flip()
     main_menu(screen, game_rooms_menu, None)
 
 
-def create_game(screen):
+def create_game(screen, net, vs_bot=False):
+    """Создаёт комнату; с vs_bot за второго игрока играет сервер. Ответ придёт в очередь `net`."""
     player1_name = input_player_name(screen, "Введите имя игрока 1:")
-    response = requests.post(f"{SERVER_URL}/create_game/", json={"player1_name": player1_name})
-    data = response.json()
-    if response.status_code == 200:
-        game_id = data["game_id"]
-        player = data["player"]
-        placement_phase(screen, game_id, player)
-    else:
-        print(data["detail"])
-
-
-def join_game(screen, game_id, player2_name):
-    response = requests.post(f"{SERVER_URL}/join_game/", json={"game_id": game_id, "player2_name": player2_name})
-    data = response.json()
-    if response.status_code == 200:
-        player = data["player"]
-        placement_phase(screen, game_id, player)
-    else:
-        print(data["detail"])
+    net.submit("create", "POST", "/create_game/", json={"player1_name": player1_name, "vs_bot": vs_bot})
+
+
+def join_game(net, game_id, player2_name):
+    net.submit("join", "POST", "/join_game/", json={"game_id": game_id, "player2_name": player2_name})
 
 
 def input_player_name(screen, prompt):
@@ -109,8 +125,9 @@ def input_player_name(screen, prompt):
     text = ''
     done = False
 
+    loop = FrameLoop()
     while not done:
-        for event in pygame.event.get():
+        for event in loop.events():
             if event.type == pygame.QUIT:
                 done = True
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -128,17 +145,17 @@ def input_player_name(screen, prompt):
                     else:
                         text += event.unicode
 
-        screen.fill((255, 255, 255))
-        txt_surface = font.render(prompt, True, (0, 0, 0))
-        screen.blit(txt_surface,
-                    (screen.get_width() // 2 - txt_surface.get_width() // 2, screen.get_height() // 2 - 50))
-        txt_surface = font.render(text, True, color)
-        width = max(200, txt_surface.get_width() + 10)
-        input_box.w = width
-        screen.blit(txt_surface, (input_box.x + 5, input_box.y + 5))
-        pygame.draw.rect(screen, color, input_box, 2)
-
-        pygame.display.flip()
+        if loop.redraw():
+            screen.fill((255, 255, 255))
+            txt_surface = font.render(prompt, True, (0, 0, 0))
+            screen.blit(txt_surface,
+                        (screen.get_width() // 2 - txt_surface.get_width() // 2, screen.get_height() // 2 - 50))
+            txt_surface = font.render(text, True, color)
+            width = max(200, txt_surface.get_width() + 10)
+            input_box.w = width
+            screen.blit(txt_surface, (input_box.x + 5, input_box.y + 5))
+            pygame.draw.rect(screen, color, input_box, 2)
+            pygame.display.flip()
     return text
 
 
@@ -147,21 +164,21 @@ def settings_menu(screen):
     Функция отображает меню настроек игры.
     """
     run = True
+    font = pygame.font.SysFont('Arial', 50)
+    back_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 + 200, 200, 50)
+    loop = FrameLoop()
     while run:
-        screen.fill((255, 255, 255))
-        font = pygame.font.SysFont('Arial', 50)
-        label = font.render('Настройки', True, (0, 0, 0))
-        label_rect = label.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 200))
-        screen.blit(label, label_rect)
-
-        back_button = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 + 200, 200, 50)
-        draw_button(screen, "Назад", back_button, (169, 169, 169))
-
-        for event in pygame.event.get():
+        for event in loop.events():
             if event.type == pygame.QUIT:
                 run = False
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if back_button.collidepoint(event.pos):
                     run = False
 
-        pygame.display.flip()
+        if loop.redraw():
+            screen.fill((255, 255, 255))
+            label = font.render('Настройки', True, (0, 0, 0))
+            label_rect = label.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 200))
+            screen.blit(label, label_rect)
+            draw_button(screen, "Назад", back_button, (169, 169, 169))
+            pygame.display.flip()
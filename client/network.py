@@ -0,0 +1,131 @@
+"""
+Запросы к серверу в фоновых потоках.
+
+Цикл отрисовки не ждёт сети: экран ставит запрос в очередь (`submit`), а
+ответы забирает в каждом кадре (`poll`), как события EventStream. Все
+запросы идут через одну requests.Session с пулом соединений keep-alive,
+с таймаутом и повторами: GET повторяется при обрыве и ответах 502-504,
+POST - только если соединение не удалось установить, то есть запрос
+не дошёл до сервера.
+
+Клиент просит у сервера компактный двоичный формат ответов (common/wire.py)
+и разбирает ответ по его Content-Type: запросы, для которых формата нет,
+по-прежнему приходят в JSON, а в `Reply.data` всегда лежит словарь.
+"""
+import os
+import queue
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Формат ответов общий с сервером и лежит в пакете common в корне проекта
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import wire  # noqa: E402
+
+# URL сервера
+SERVER_URL = os.environ.get("SEA_BATTLE_SERVER_URL", "http://127.0.0.1:8000")
+# Время ожидания ответа на обычный запрос, секунды
+TIMEOUT = 5.0
+# Потоки для запросов: длинный опрос занимает поток надолго, выстрелы не должны его ждать
+THREADS = 4
+RETRIES = 2
+# Просить компактный двоичный формат ответов; SEA_BATTLE_WIRE=json - только JSON
+COMPACT = os.environ.get("SEA_BATTLE_WIRE", "compact") != "json"
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def session():
+    """Общая сессия с пулом соединений; создаётся при первом запросе."""
+    global _session, _executor
+    with _lock:
+        if _session is None:
+            retry = Retry(total=RETRIES, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=THREADS, max_retries=retry)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="network")
+        return _session
+
+
+class Reply:
+    """Ответ сервера на запрос `tag`: код и JSON или описание ошибки сети."""
+
+    __slots__ = ("tag", "status", "data", "error")
+
+    def __init__(self, tag, status=None, data=None, error=None):
+        self.tag = tag
+        self.status = status
+        self.data = data
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.status is not None and self.status < 400
+
+    def detail(self):
+        """Текст ошибки для сообщения игроку."""
+        if self.error is not None:
+            return self.error
+        if isinstance(self.data, dict):
+            return self.data.get("detail", "Неизвестная ошибка")
+        return f"HTTP {self.status}"
+
+
+class RequestQueue:
+    """Запросы одного экрана. Ответы других экранов в его очередь не попадают."""
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url or SERVER_URL
+        self._replies = queue.Queue()
+        self._pending = Counter()
+
+    def submit(self, tag, method, path, timeout=TIMEOUT, **kwargs):
+        """Отправляет запрос в фоне; ответ придёт из `poll()` с тем же `tag`."""
+        http = session()
+        self._pending[tag] += 1
+        _executor.submit(self._run, http, tag, method, self.base_url + path, timeout, kwargs)
+
+    def busy(self, tag):
+        """Есть ли запрос `tag`, ответ на который ещё не забран."""
+        return self._pending[tag] > 0
+
+    def poll(self):
+        """Возвращает все ответы, пришедшие с прошлого вызова."""
+        replies = []
+        while True:
+            try:
+                reply = self._replies.get_nowait()
+            except queue.Empty:
+                return replies
+            self._pending[reply.tag] -= 1
+            replies.append(reply)
+
+    def _run(self, http, tag, method, url, timeout, kwargs):
+        if COMPACT:
+            kwargs["headers"] = {"Accept": f"{wire.MEDIA_TYPE}, application/json", **kwargs.get("headers", {})}
+        try:
+            response = http.request(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            self._replies.put(Reply(tag, error="Сервер недоступен."))
+            return
+        data = None
+        if response.content:
+            try:
+                if response.headers.get("Content-Type", "").startswith(wire.MEDIA_TYPE):
+                    data = wire.decode(response.content)
+                else:
+                    data = response.json()
+            except ValueError:
+                self._replies.put(Reply(tag, response.status_code, error="Неверный ответ от сервера."))
+                return
+        self._replies.put(Reply(tag, response.status_code, data))
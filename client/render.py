@@ -0,0 +1,94 @@
+"""
+Кэш отрисовки клиента.
+
+Шрифты загружаются один раз, надписи рендерятся один раз для каждого
+сочетания текста, размера и цвета. Поле игрока рисуется в собственную
+поверхность: сетка и корабли - при создании, выстрелы - по одной клетке,
+когда клетка меняется. Кадр сводится к нескольким blit готовых поверхностей.
+"""
+from functools import lru_cache
+
+import pygame
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GRAY = (169, 169, 169)
+HIT = (255, 0, 0)
+
+
+@lru_cache(maxsize=None)
+def get_font(size, name='Arial'):
+    """Шрифт нужного размера; SysFont ищет файл шрифта в системе, поэтому вызывается один раз."""
+    return pygame.font.SysFont(name, size)
+
+
+@lru_cache(maxsize=1024)
+def text(value, size, color=BLACK):
+    """Отрендеренная надпись. Поверхность общая для всех вызовов: рисовать на ней нельзя."""
+    return get_font(size).render(str(value), True, color)
+
+
+@lru_cache(maxsize=256)
+def wrapped_text(message, size, width, color=BLACK):
+    """Надпись, разбитая по словам на строки не шире `width`, - список поверхностей строк."""
+    font = get_font(size)
+    lines = []
+    line = ""
+    for word in message.split(' '):
+        if font.size(line + word)[0] < width:
+            line += word + " "
+        else:
+            lines.append(line)
+            line = word + " "
+    lines.append(line)
+    return [text(line, size, color) for line in lines]
+
+
+class BoardView:
+    """Поле 10x10 в собственной поверхности с перерисовкой только изменившихся клеток."""
+
+    def __init__(self, rows, cols, cell_size, ship_cells=()):
+        self.rows = rows
+        self.cols = cols
+        self.cell_size = cell_size
+        self.surface = pygame.Surface((cols * cell_size, rows * cell_size))
+        self.surface.fill(WHITE)
+        for row in range(rows):
+            for col in range(cols):
+                pygame.draw.rect(self.surface, GRAY, self._rect(row, col), 1)
+        for row, col in ship_cells:
+            pygame.draw.rect(self.surface, GRAY, self._rect(row, col))
+        # Чистая сетка с кораблями: из неё восстанавливается клетка, с которой сняли отметку
+        self._base = self.surface.copy()
+        self._drawn = {}
+
+    def update(self, shots):
+        """Приводит отметки к `shots` ({(строка, столбец): "hit" | "miss" | "pending"}), рисуя только разницу."""
+        for cell, state in shots.items():
+            if self._drawn.get(cell) != state:
+                self._draw_cell(cell, state)
+        if len(self._drawn) > len(shots):
+            for cell in [cell for cell in self._drawn if cell not in shots]:
+                self._draw_cell(cell, None)
+
+    def draw(self, screen, x, y):
+        screen.blit(self.surface, (x, y))
+
+    def _rect(self, row, col):
+        return pygame.Rect(col * self.cell_size, row * self.cell_size, self.cell_size, self.cell_size)
+
+    def _draw_cell(self, cell, state):
+        rect = self._rect(*cell)
+        self.surface.blit(self._base, rect, rect)
+        if state == "hit":
+            pygame.draw.rect(self.surface, HIT, rect)
+        elif state == "miss":
+            pygame.draw.line(self.surface, BLACK, rect.topleft, rect.bottomright, 2)
+            pygame.draw.line(self.surface, BLACK, rect.topright, rect.bottomleft, 2)
+        elif state == "pending":
+            # Выстрел отправлен, результата ещё нет
+            pygame.draw.circle(self.surface, GRAY, rect.center, self.cell_size // 4)
+        if state is None:
+            del self._drawn[cell]
+        else:
+            self._drawn[cell] = state
@@ -0,0 +1,158 @@
+"""
+Правила расстановки флота, общие для сервера и клиента.
+
+Клетка поля - бит с номером row * COLS + col. Для каждого возможного
+положения корабля заранее посчитаны маска его клеток и маска ореола
+(клетки корабля вместе с соседними, включая диагональные), поэтому
+проверка корабля против уже расставленных - две операции над целыми.
+"""
+import random
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROWS, COLS = 10, 10
+
+# Состав флота: размер корабля -> количество
+FLEET = {4: 1, 3: 2, 2: 3, 1: 4}
+
+HORIZONTAL, VERTICAL = 0, 1
+
+
+class FleetError(ValueError):
+    """Расстановка нарушает правила; текст исключения - причина для ответа клиенту."""
+
+
+def ship_cells(size: int, orientation: int, row: int, col: int) -> List[Tuple[int, int]]:
+    """Клетки корабля по размеру, ориентации и начальной клетке."""
+    if orientation == HORIZONTAL:
+        return [(row, col + i) for i in range(size)]
+    return [(row + i, col) for i in range(size)]
+
+
+def _neighbour_mask(row: int, col: int) -> int:
+    mask = 0
+    for r in range(max(row - 1, 0), min(row + 2, ROWS)):
+        for c in range(max(col - 1, 0), min(col + 2, COLS)):
+            mask |= 1 << (r * COLS + c)
+    return mask
+
+
+# Маска клетки вместе с соседними для каждой клетки поля
+NEIGHBOURS = [_neighbour_mask(row, col) for row in range(ROWS) for col in range(COLS)]
+
+# (размер, ориентация, строка, столбец) -> (маска клеток, маска ореола) для всех положений в пределах поля
+PLACEMENTS: Dict[Tuple[int, int, int, int], Tuple[int, int]] = {}
+for _size in FLEET:
+    for _orientation in (HORIZONTAL, VERTICAL):
+        for _row in range(ROWS - (_size - 1 if _orientation == VERTICAL else 0)):
+            for _col in range(COLS - (_size - 1 if _orientation == HORIZONTAL else 0)):
+                _mask = _halo = 0
+                for _r, _c in ship_cells(_size, _orientation, _row, _col):
+                    _mask |= 1 << (_r * COLS + _c)
+                    _halo |= NEIGHBOURS[_r * COLS + _c]
+                PLACEMENTS[(_size, _orientation, _row, _col)] = (_mask, _halo)
+
+
+def placement(ship: dict) -> Tuple[int, int, int, int]:
+    """Ключ положения корабля из словаря {"size", "orientation", "start_pos"}."""
+    try:
+        row, col = ship["start_pos"]
+        return int(ship["size"]), int(ship["orientation"]), int(row), int(col)
+    except (KeyError, TypeError, ValueError):
+        raise FleetError("Malformed ship.") from None
+
+
+def fits(blocked: int, size: int, orientation: int, start_pos: Tuple[int, int]) -> bool:
+    """Помещается ли корабль на поле, не задевая ореолы кораблей из маски `blocked`."""
+    masks = PLACEMENTS.get((size, orientation, start_pos[0], start_pos[1]))
+    return masks is not None and not masks[0] & blocked
+
+
+def halo(size: int, orientation: int, start_pos: Tuple[int, int]) -> int:
+    """Маска ореола корабля; 0, если корабль не помещается на поле."""
+    masks = PLACEMENTS.get((size, orientation, start_pos[0], start_pos[1]))
+    return masks[1] if masks is not None else 0
+
+
+def check_fleet(ships: Iterable[dict],
+                composition: Optional[Dict[int, int]] = FLEET) -> List[Tuple[int, int, int, int]]:
+    """Проверяет расстановку за один проход: границы поля, пересечения, касания и состав флота.
+
+    Возвращает положения кораблей (размер, ориентация, строка, столбец) или бросает FleetError с причиной.
+    Если `composition` равен None, состав флота не проверяется.
+    """
+    occupied = blocked = 0
+    counts = Counter()
+    keys = []
+    for ship in ships:
+        key = placement(ship)
+        masks = PLACEMENTS.get(key)
+        if masks is None:
+            if key[1] not in (HORIZONTAL, VERTICAL):
+                raise FleetError("Malformed ship.")
+            if key[0] not in FLEET:
+                raise FleetError("Wrong fleet composition.")
+            raise FleetError("Ship out of bounds.")
+        mask, ship_halo = masks
+        if mask & occupied:
+            raise FleetError("Ships overlap.")
+        if mask & blocked:
+            raise FleetError("Ships touch.")
+        occupied |= mask
+        blocked |= ship_halo
+        counts[key[0]] += 1
+        keys.append(key)
+    if composition is not None and counts != Counter(composition):
+        raise FleetError("Wrong fleet composition.")
+    return keys
+
+
+# Размеры кораблей флота по убыванию: крупные корабли ставятся первыми, пока поле свободно
+SHIP_SIZES = [size for size in sorted(FLEET, reverse=True) for _ in range(FLEET[size])]
+
+# Для каждого корабля флота по порядку: ключи, маски клеток и маски ореолов всех его положений на поле
+_CANDIDATES = []
+for _size in SHIP_SIZES:
+    _keys = tuple(key for key in PLACEMENTS if key[0] == _size)
+    _CANDIDATES.append((_keys, tuple(PLACEMENTS[key][0] for key in _keys),
+                        tuple(PLACEMENTS[key][1] for key in _keys)))
+
+# Столько случайных положений пробуется, прежде чем перебрать все свободные
+RANDOM_ATTEMPTS = 16
+
+
+def random_placements(rng: Optional[random.Random] = None) -> List[Tuple[int, int, int, int]]:
+    """Случайная правильная расстановка флота: положения (размер, ориентация, строка, столбец).
+
+    Корабли ставятся по одному, каждый - в равновероятное из положений, не
+    задевающих уже поставленные. Положение сначала выбирается наугад среди
+    всех и отбрасывается при касании; если это не удаётся несколько раз
+    подряд, выбор идёт из явно отобранных свободных положений. Если для
+    очередного корабля места нет, расстановка начинается заново.
+    """
+    uniform = (rng or random).random
+    while True:
+        blocked = 0
+        chosen = []
+        for keys, masks, halos in _CANDIDATES:
+            count = len(keys)
+            index = int(uniform() * count)
+            attempts = RANDOM_ATTEMPTS
+            while masks[index] & blocked and attempts:
+                index = int(uniform() * count)
+                attempts -= 1
+            if masks[index] & blocked:
+                free = [i for i in range(count) if not masks[i] & blocked]
+                if not free:
+                    break
+                index = free[int(uniform() * len(free))]
+            blocked |= halos[index]
+            chosen.append(keys[index])
+        else:
+            return chosen
+
+
+def random_fleet(rng: Optional[random.Random] = None) -> List[dict]:
+    """Случайная правильная расстановка флота в формате запроса /place_ship/."""
+    return [{"size": size, "orientation": orientation, "start_pos": [row, col]}
+            for size, orientation, row, col in random_placements(rng)]
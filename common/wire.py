@@ -0,0 +1,125 @@
+"""
+Компактный двоичный формат ответов сервера, общий для сервера и клиента.
+
+Клиент, который понимает формат, указывает MEDIA_TYPE в заголовке Accept;
+остальные получают JSON как раньше. Сообщение начинается с байта вида,
+числа little-endian:
+
+    состояние партии (/get_game_info/):
+        u8 1 | u32 версия | u16 ходов в журнале | u8 чей ход | u8 победитель |
+        u16 длина имени player1 | u16 длина имени player2 | u16 ходов в ответе |
+        имена в UTF-8 | ходы по u16
+    результат выстрела (/shoot/):
+        u8 2 | u8 результат
+
+Игрок кодируется как 1 (player1), 2 (player2) или 0 (нет), имя длины
+NO_NAME - как null. Ход - число u16 (клетка | игрок << 7 | результат << 8,
+игрок 0 - player1, 1 - player2), тот же, что и в реплеях; ходы в ответе идут подряд
+и заканчиваются последним ходом журнала, поэтому их номера не передаются.
+Состояние с журналом из 100 ходов занимает около 240 байт против 2,5 КБ
+в JSON (benchmarks/bench_wire.py).
+"""
+import struct
+from typing import Optional, Tuple
+
+from common.fleet import COLS
+
+MEDIA_TYPE = "application/x-sea-battle"
+
+INFO, SHOT = 1, 2
+INFO_HEADER = struct.Struct("<BIHBBHHH")
+SHOT_MESSAGE = struct.Struct("<BB")
+NO_NAME = 0xFFFF
+MAX_NAME_BYTES = NO_NAME - 1  # Длина имени в UTF-8, которая ещё помещается в заголовок
+
+PLAYERS = ("player1", "player2")
+RESULTS = ("miss", "hit", "sunk", "already_shot")
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+
+class WireError(ValueError):
+    """Сообщение повреждено или имеет неизвестный вид."""
+
+
+def accepts(accept: Optional[str]) -> bool:
+    """Указан ли компактный формат среди типов заголовка Accept."""
+    if not accept:
+        return False
+    return any(media.split(";", 1)[0].strip() == MEDIA_TYPE for media in accept.split(","))
+
+
+def pack_move(player: str, row: int, col: int, result: str) -> int:
+    """Ход в виде u16: клетка | игрок << 7 | результат << 8. Клетка должна быть на поле."""
+    return row * COLS + col | (player == "player2") << 7 | RESULT_CODES[result] << 8
+
+
+def unpack_move(move: int) -> Tuple[str, int, int, str]:
+    """(игрок, строка, столбец, результат) из u16, упакованного pack_move."""
+    row, col = divmod(move & 0x7F, COLS)
+    return PLAYERS[move >> 7 & 1], row, col, RESULTS[move >> 8]
+
+
+def _player_code(player: Optional[str]) -> int:
+    return PLAYERS.index(player) + 1 if player else 0
+
+
+def _name(name: Optional[str]) -> bytes:
+    return b"" if name is None else name.encode()
+
+
+def encode_info(info: dict) -> bytes:
+    """Ответ /get_game_info/ (словарь с теми же полями, что и в JSON) в компактном виде.
+
+    WireError, если имя игрока длиннее MAX_NAME_BYTES: такой ответ отдаётся в JSON.
+    """
+    name1, name2 = _name(info["player1_name"]), _name(info["player2_name"])
+    if len(name1) > MAX_NAME_BYTES or len(name2) > MAX_NAME_BYTES:
+        raise WireError("Имя игрока не помещается в сообщение.")
+    moves = info["moves"]
+    header = INFO_HEADER.pack(INFO, info["version"], info["last_seq"] + 1, _player_code(info["current_turn"]),
+                              _player_code(info["winner"]), len(name1),
+                              NO_NAME if info["player2_name"] is None else len(name2), len(moves))
+    body = struct.pack(f"<{len(moves)}H", *[pack_move(*move[1:]) for move in moves])
+    return b"".join((header, name1, name2, body))
+
+
+def encode_shot(result: str) -> bytes:
+    """Ответ /shoot/ в компактном виде."""
+    return SHOT_MESSAGE.pack(SHOT, RESULT_CODES[result])
+
+
+def _decode_info(data: bytes) -> dict:
+    _, version, total, turn, winner, length1, length2, count = INFO_HEADER.unpack_from(data)
+    offset = INFO_HEADER.size
+    name1 = data[offset:offset + length1].decode()
+    offset += length1
+    name2 = None
+    if length2 != NO_NAME:
+        name2 = data[offset:offset + length2].decode()
+        offset += length2
+    if len(data) != offset + count * 2 or count > total:
+        raise WireError("Неверная длина сообщения.")
+    moves = []
+    for seq, move in enumerate(struct.unpack_from(f"<{count}H", data, offset), total - count):
+        moves.append([seq, *unpack_move(move)])
+    return {
+        "player1_name": name1,
+        "player2_name": name2,
+        "current_turn": PLAYERS[turn - 1] if turn else None,
+        "moves": moves,
+        "last_seq": total - 1,
+        "winner": PLAYERS[winner - 1] if winner else None,
+        "version": version,
+    }
+
+
+def decode(data: bytes) -> dict:
+    """Сообщение любого вида в виде словаря, совпадающего с JSON-ответом."""
+    try:
+        if data[:1] == bytes((INFO,)):
+            return _decode_info(data)
+        if data[:1] == bytes((SHOT,)) and len(data) == SHOT_MESSAGE.size:
+            return {"result": RESULTS[SHOT_MESSAGE.unpack(data)[1]]}
+    except (struct.error, IndexError, UnicodeDecodeError) as error:
+        raise WireError(str(error)) from error
+    raise WireError("Неизвестный вид сообщения.")
@@ -0,0 +1,170 @@
+"""
+Компьютерный соперник: выбирает выстрел по плотности вероятности кораблей.
+
+Для каждого размера корабля бот хранит, какие его положения на поле ещё
+возможны, и карту: сколько возможных положений накрывает каждую клетку.
+Выстрел мимо или клетка, про которую стало известно, что она пуста,
+вычёркивает только положения, проходящие через неё, и уменьшает карту по их
+клеткам, поэтому карта не пересчитывается заново после каждого хода.
+
+Пока есть раненый, но не потопленный корабль (режим добивания), клетки
+оцениваются только по положениям, проходящим через раненые клетки; иначе
+(режим поиска) стреляем в клетку с наибольшим весом по общей карте.
+"""
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from common.fleet import COLS, FLEET, NEIGHBOURS, PLACEMENTS, ROWS
+
+CELLS = ROWS * COLS
+
+# Имя второго игрока в одиночной игре
+BOT_NAME = "Bot"
+
+# Размер -> маски клеток и номера клеток всех положений корабля этого размера
+_MASKS: Dict[int, List[int]] = {size: [] for size in FLEET}
+_CELLS: Dict[int, List[Tuple[int, ...]]] = {size: [] for size in FLEET}
+for (_size, _orientation, _row, _col), (_mask, _halo) in PLACEMENTS.items():
+    _MASKS[_size].append(_mask)
+    _CELLS[_size].append(tuple(cell for cell in range(CELLS) if _mask >> cell & 1))
+
+# Размер -> для каждой клетки номера положений, которые её накрывают
+_COVERING: Dict[int, List[List[int]]] = {size: [[] for _ in range(CELLS)] for size in FLEET}
+for _size, _cells_list in _CELLS.items():
+    for _index, _cells in enumerate(_cells_list):
+        for _cell in _cells:
+            _COVERING[_size][_cell].append(_index)
+
+
+def _diagonal_mask(row: int, col: int) -> int:
+    mask = 0
+    for r, c in ((row - 1, col - 1), (row - 1, col + 1), (row + 1, col - 1), (row + 1, col + 1)):
+        if 0 <= r < ROWS and 0 <= c < COLS:
+            mask |= 1 << (r * COLS + c)
+    return mask
+
+
+# Диагональные соседи клетки: рядом с попаданием по диагонали кораблей быть не может
+_DIAGONALS = [_diagonal_mask(row, col) for row in range(ROWS) for col in range(COLS)]
+
+
+class Bot:
+    """Состояние бота в одной партии: что известно о поле соперника и карта весов клеток."""
+
+    __slots__ = ("remaining", "alive", "heat", "shot_mask", "empty_mask", "wounded", "rng")
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.remaining = dict(FLEET)  # Размер -> сколько таких кораблей ещё не потоплено
+        self.alive = {size: bytearray(b"\x01" * len(masks)) for size, masks in _MASKS.items()}
+        # Вес клетки: сумма по размерам (число возможных положений через клетку) x (число таких кораблей)
+        self.heat = [0] * CELLS
+        for size, cells_list in _CELLS.items():
+            for cells in cells_list:
+                for cell in cells:
+                    self.heat[cell] += FLEET[size]
+        self.shot_mask = 0
+        self.empty_mask = 0  # Клетки, где корабля точно нет
+        self.wounded = 0  # Попадания в ещё не потопленные корабли
+        self.rng = rng  # None - общий генератор модуля random
+
+    def choose(self) -> Tuple[int, int]:
+        """Клетка для следующего выстрела."""
+        if self.wounded:
+            weights = self._target_weights()
+        else:
+            weights = self.heat
+        best = -1
+        candidates = []
+        shot_mask = self.shot_mask
+        for cell in range(CELLS):
+            if shot_mask >> cell & 1:
+                continue
+            weight = weights[cell]
+            if weight > best:
+                best = weight
+                candidates = [cell]
+            elif weight == best:
+                candidates.append(cell)
+        cell = candidates[int((self.rng or random).random() * len(candidates))]
+        return cell // COLS, cell % COLS
+
+    def observe(self, pos: Tuple[int, int], result: str, sunk: Sequence[Tuple[int, int]] = ()):
+        """Учитывает результат выстрела; для "sunk" передаются клетки потопленного корабля."""
+        if result == "already_shot":
+            return
+        cell = pos[0] * COLS + pos[1]
+        self.shot_mask |= 1 << cell
+        if result == "miss":
+            self._mark_empty(1 << cell)
+        elif result == "hit":
+            self.wounded |= 1 << cell
+            self._mark_empty(_DIAGONALS[cell])
+        elif result == "sunk":
+            ship_mask = 0
+            halo = 0
+            for row, col in sunk:
+                ship_mask |= 1 << (row * COLS + col)
+                halo |= NEIGHBOURS[row * COLS + col]
+            self.wounded &= ~ship_mask
+            self._sink(len(sunk))
+            # Потопленный корабль и клетки вокруг него не могут принадлежать другим кораблям
+            self._mark_empty(halo)
+
+    def _mark_empty(self, mask: int):
+        """Вычёркивает положения кораблей, задевающие клетки из маски."""
+        mask &= ~self.empty_mask
+        if not mask:
+            return
+        self.empty_mask |= mask
+        heat = self.heat
+        while mask:
+            low = mask & -mask
+            cell = low.bit_length() - 1
+            mask ^= low
+            for size, covering in _COVERING.items():
+                alive = self.alive[size]
+                count = self.remaining[size]
+                cells_list = _CELLS[size]
+                for index in covering[cell]:
+                    if alive[index]:
+                        alive[index] = 0
+                        for covered in cells_list[index]:
+                            heat[covered] -= count
+
+    def _sink(self, size: int):
+        """Один корабль размера `size` потоплен: его положения весят на единицу меньше."""
+        if self.remaining.get(size, 0) <= 0:
+            return
+        self.remaining[size] -= 1
+        heat = self.heat
+        alive = self.alive[size]
+        for index, cells in enumerate(_CELLS[size]):
+            if alive[index]:
+                for cell in cells:
+                    heat[cell] -= 1
+
+    def _target_weights(self) -> List[int]:
+        """Веса клеток по положениям, проходящим через раненые клетки; положения
+        через несколько раненых клеток весят больше, чтобы добивать корабль вдоль линии."""
+        weights = [0] * CELLS
+        wounded = self.wounded
+        seen = set()
+        mask = wounded
+        while mask:
+            low = mask & -mask
+            cell = low.bit_length() - 1
+            mask ^= low
+            for size, covering in _COVERING.items():
+                count = self.remaining[size]
+                if not count:
+                    continue
+                alive = self.alive[size]
+                masks = _MASKS[size]
+                for index in covering[cell]:
+                    if not alive[index] or (size, index) in seen:
+                        continue
+                    seen.add((size, index))
+                    weight = count * (masks[index] & wounded).bit_count() ** 2
+                    for covered in _CELLS[size][index]:
+                        weights[covered] += weight
+        return weights
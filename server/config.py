@@ -0,0 +1,51 @@
+import os
+
+# Путь к файлу базы SQLite
+DB_PATH = os.environ.get("SEA_BATTLE_DB", "game_sessions.db")
+
+# Сохранять партии в базу в фоне (write-behind). "0" отключает сохранение.
+PERSIST_GAMES = os.environ.get("SEA_BATTLE_PERSIST", "1") != "0"
+
+# Каталог реплеев оконченных партий (server/replay.py); пустая строка отключает запись
+REPLAY_DIR = os.environ.get("SEA_BATTLE_REPLAY_DIR", "replays")
+
+# Период сброса изменённых партий в базу, миллисекунды
+FLUSH_INTERVAL_MS = int(os.environ.get("SEA_BATTLE_FLUSH_MS", "200"))
+
+# Партия без изменений дольше этого времени удаляется из памяти, секунды
+GAME_IDLE_TTL = float(os.environ.get("SEA_BATTLE_IDLE_TTL", "3600"))
+
+# Время хранения завершённой партии в памяти, секунды
+FINISHED_GAME_TTL = float(os.environ.get("SEA_BATTLE_FINISHED_TTL", "300"))
+
+# Наибольшее число партий в памяти; при превышении вытесняются давно не менявшиеся
+MAX_GAMES = int(os.environ.get("SEA_BATTLE_MAX_GAMES", "200000"))
+
+# Период проверки устаревших партий, секунды
+EVICT_INTERVAL = float(os.environ.get("SEA_BATTLE_EVICT_INTERVAL", "30"))
+
+# Максимальное время ожидания изменений в длинном опросе /get_game_info/, секунды
+LONG_POLL_TIMEOUT = 25.0
+
+# Размер страницы лобби /get_games/ по умолчанию и наибольший
+LOBBY_PAGE_SIZE = 50
+MAX_LOBBY_PAGE_SIZE = 200
+
+# Наибольшая длина имени игрока, символов
+MAX_NAME_LENGTH = 64
+
+# Наибольшее число элементов в пакетных запросах /batch/
+MAX_BATCH_SIZE = 500
+
+# Сколько байт событий может ждать отправки зрителю /spectate/; медленный зритель сверх этого отключается
+SPECTATOR_BUFFER_BYTES = int(os.environ.get("SEA_BATTLE_SPECTATOR_BUFFER", "16384"))
+
+# Где хранится состояние партий: "memory" - в памяти процесса, "redis" - в Redis,
+# что позволяет запускать несколько рабочих процессов и серверов
+STORAGE_BACKEND = os.environ.get("SEA_BATTLE_BACKEND", "memory")
+
+# Адрес Redis для STORAGE_BACKEND = "redis"
+REDIS_URL = os.environ.get("SEA_BATTLE_REDIS_URL", "redis://127.0.0.1:6379/0")
+
+# Маршруты /debug/profiler/ для включения выборочного профилировщика во время работы
+PROFILER_ENABLED = os.environ.get("SEA_BATTLE_PROFILER", "0") == "1"
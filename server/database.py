@@ -1,17 +1,132 @@
+import json
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 
+from common.fleet import ship_cells
+from server.config import DB_PATH
+
+# Размер кэша подготовленных запросов в каждом соединении
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+
+def _connect():
+    """Открывает соединение в режиме WAL: читатели не блокируют запись, fsync только на контрольных точках."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
 
 @contextmanager
 def get_db_connection():
-    conn = sqlite3.connect('game_sessions.db')
+    """
+    Выдаёт соединение текущего потока. Соединение открывается один раз и
+    переиспользуется, поэтому подготовленные запросы остаются в его кэше.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
+        with _connections_lock:
+            _connections.append(conn)
     try:
         yield conn
-    finally:
-        conn.close()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def close_connections():
+    """
+    Закрывает все открытые соединения.
+    """
+    with _connections_lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+    # Соединения других потоков закрыты; они откроют новые при следующем обращении
+    global _local
+    _local = threading.local()
+
+
+# Версия схемы хранится в PRAGMA user_version:
+# 0 - корабли и выстрелы в TEXT-столбцах sessions, 1 - отдельные таблицы ships и shots
+SCHEMA_VERSION = 1
+
+
+def _migrate_text_columns(c):
+    """
+    Переносит корабли и выстрелы из TEXT-столбцов sessions в таблицы ships и shots.
+    Результаты выстрелов восстанавливаются повтором на поле. Порядок ходов между
+    игроками в старом формате не хранился, поэтому сначала идут выстрелы первого игрока.
+    """
+    from server.engine import Board, Ship
 
+    sessions = c.execute(
+        "SELECT game_id, player1_ships, player2_ships, player1_shots, player2_shots FROM sessions").fetchall()
+    for game_id, player1_ships, player2_ships, player1_shots, player2_shots in sessions:
+        boards = {}
+        for player, text in (("player1", player1_ships), ("player2", player2_ships)):
+            board = boards[player] = Board()
+            for ship_index, ship in enumerate(_parse_json_list(text)):
+                if "positions" in ship:
+                    positions = [tuple(pos) for pos in ship["positions"]]
+                else:
+                    positions = ship_cells(ship["size"], ship["orientation"], *ship["start_pos"])
+                board.place_ship(Ship(size=ship["size"], orientation=ship["orientation"], positions=positions))
+                c.execute(INSERT_SHIP, (game_id, player, ship_index, ship["size"], ship["orientation"],
+                                        positions[0][0], positions[0][1]))
+        seq = 0
+        for player, text, target in (("player1", player1_shots, "player2"), ("player2", player2_shots, "player1")):
+            for row, col in _parse_json_list(text):
+                result = boards[target].shoot((row, col))
+                c.execute(INSERT_SHOT, (game_id, player, seq, row, col, result))
+                seq += 1
+    c.execute("UPDATE sessions SET player1_ships = '', player2_ships = '', player1_shots = '', player2_shots = ''")
 
-# Создание таблицы, если она не существует
+
+def _parse_json_list(text):
+    try:
+        value = json.loads(text) if text else []
+    except ValueError:
+        return []
+    return value if isinstance(value, list) else []
+
+
+INSERT_SHIP = '''
+    INSERT OR REPLACE INTO ships (game_id, player, ship_index, size, orientation, row, col)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_SHOT = '''
+    INSERT OR REPLACE INTO shots (game_id, player, seq, row, col, result) VALUES (?, ?, ?, ?, ?, ?)
+'''
+INSERT_RESULT = '''
+    INSERT OR REPLACE INTO results (game_id, winner, player1_name, player2_name, moves, duration, finished_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+SAVE_SESSION = '''
+    INSERT INTO sessions (game_id, player1_name, player2_name, current_turn, bot, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (game_id) DO UPDATE SET
+        player1_name = excluded.player1_name,
+        player2_name = excluded.player2_name,
+        current_turn = excluded.current_turn,
+        bot = excluded.bot,
+        updated_at = excluded.updated_at
+'''
+# Незавершённые партии, менявшиеся не раньше момента `?`: у оконченных есть строка в results
+ACTIVE_SESSIONS = '''
+    SELECT game_id FROM sessions
+    WHERE updated_at >= ? AND NOT EXISTS (SELECT 1 FROM results WHERE results.game_id = sessions.game_id)
+'''
+
+
+# Создание таблиц, если они не существуют
 with get_db_connection() as conn:
     c = conn.cursor()
     c.execute('''
@@ -25,6 +140,58 @@ with get_db_connection() as conn:
         player2_shots TEXT
     )
     ''')
+    # Столбцы добавлены позже: в старых базах их нужно создать
+    columns = [row[1] for row in c.execute("PRAGMA table_info(sessions)")]
+    if "current_turn" not in columns:
+        c.execute("ALTER TABLE sessions ADD COLUMN current_turn TEXT DEFAULT 'player1'")
+    if "bot" not in columns:
+        # 1 - за второго игрока играет сервер
+        c.execute("ALTER TABLE sessions ADD COLUMN bot INTEGER DEFAULT 0")
+    if "updated_at" not in columns:
+        # Время последнего сохранения партии. Старые партии считаются изменёнными сейчас:
+        # они загрузятся при ближайших запусках и будут отброшены, если так и останутся без ходов
+        c.execute("ALTER TABLE sessions ADD COLUMN updated_at REAL DEFAULT 0")
+        c.execute("UPDATE sessions SET updated_at = ?", (time.time(),))
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS ships (
+        game_id TEXT NOT NULL,
+        player TEXT NOT NULL,
+        ship_index INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        orientation INTEGER NOT NULL,
+        row INTEGER NOT NULL,
+        col INTEGER NOT NULL,
+        PRIMARY KEY (game_id, player, ship_index)
+    ) WITHOUT ROWID
+    ''')
+    # Выстрелы только дописываются; первичный ключ даёт историю партии просмотром диапазона индекса
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS shots (
+        game_id TEXT NOT NULL,
+        player TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        row INTEGER NOT NULL,
+        col INTEGER NOT NULL,
+        result TEXT NOT NULL,
+        PRIMARY KEY (game_id, seq)
+    ) WITHOUT ROWID
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS shots_by_player ON shots (game_id, player, seq)")
+    # Итог оконченной партии: одна короткая строка, которая переживает удаление партии из памяти
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS results (
+        game_id TEXT PRIMARY KEY,
+        winner TEXT NOT NULL,
+        player1_name TEXT,
+        player2_name TEXT,
+        moves INTEGER NOT NULL,
+        duration REAL NOT NULL,
+        finished_at REAL NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    if c.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        _migrate_text_columns(c)
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
 
 
@@ -34,11 +201,7 @@ def add_session(game_id, player1_name, player2_name=""):
     """
     with get_db_connection() as conn:
         c = conn.cursor()
-        c.execute('''
-            INSERT OR REPLACE INTO sessions (
-                game_id, player1_name, player2_name, player1_ships, player2_ships, player1_shots, player2_shots
-            ) VALUES (?, ?, ?, '', '', '', '')
-        ''', (game_id, player1_name, player2_name))
+        c.execute(SAVE_SESSION, (game_id, player1_name, player2_name, "player1", 0, time.time()))
         conn.commit()
 
 
@@ -52,28 +215,118 @@ def update_player2(game_id, player2_name):
         conn.commit()
 
 
-def update_ships(game_id, player, ships):
+def add_shot(game_id, player, seq, row, col, result):
     """
-    Обновляет информацию о кораблях игрока в базе данных.
+    Записывает один выстрел в историю партии.
     """
-    column = f"{player}_ships"
     with get_db_connection() as conn:
         c = conn.cursor()
-        c.execute(f"UPDATE sessions SET {column} = ? WHERE game_id = ?", (ships, game_id))
+        c.execute(INSERT_SHOT, (game_id, player, seq, row, col, result))
         conn.commit()
 
 
-def update_shots(game_id, player, shots):
+def get_shots(game_id, after_seq=-1):
+    """
+    Возвращает выстрелы партии с номером больше `after_seq` в порядке ходов.
+    Каждый выстрел - кортеж (player, seq, row, col, result).
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT player, seq, row, col, result FROM shots WHERE game_id = ? AND seq > ? ORDER BY seq",
+                  (game_id, after_seq))
+        return c.fetchall()
+
+
+def get_ships(game_id):
     """
-    Обновляет информацию о выстрелах игрока в базе данных.
+    Возвращает корабли партии: кортежи (player, ship_index, size, orientation, row, col).
     """
-    column = f"{player}_shots"
     with get_db_connection() as conn:
         c = conn.cursor()
-        c.execute(f"UPDATE sessions SET {column} = ? WHERE game_id = ?", (shots, game_id))
+        c.execute("SELECT player, ship_index, size, orientation, row, col FROM ships "
+                  "WHERE game_id = ? ORDER BY player, ship_index", (game_id,))
+        return c.fetchall()
+
+
+def save_changes(sessions=(), ships=(), shots=(), results=()):
+    """
+    Сохраняет изменения нескольких партий одной транзакцией.
+    sessions - кортежи (game_id, player1_name, player2_name, current_turn, bot, updated_at),
+    ships - кортежи (game_id, player, ship_index, size, orientation, row, col),
+    shots - кортежи (game_id, player, seq, row, col, result),
+    results - кортежи (game_id, winner, player1_name, player2_name, moves, duration, finished_at).
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.executemany(SAVE_SESSION, sessions)
+        c.executemany(INSERT_SHIP, ships)
+        c.executemany(INSERT_SHOT, shots)
+        c.executemany(INSERT_RESULT, results)
         conn.commit()
 
 
+def load_sessions(active_since=0.0):
+    """
+    Возвращает незавершённые игровые сессии, сохранённые не раньше `active_since`
+    (время Unix), вместе с кораблями и выстрелами. Оконченные партии (со строкой
+    в results) и давно не менявшиеся не читаются вовсе, поэтому время запуска
+    зависит от числа живых партий, а не от всей истории.
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        sessions = {}
+        for game_id, player1_name, player2_name, current_turn, bot in c.execute(
+                "SELECT game_id, player1_name, player2_name, current_turn, bot FROM sessions "
+                f"WHERE game_id IN ({ACTIVE_SESSIONS})", (active_since,)):
+            sessions[game_id] = {
+                "game_id": game_id,
+                "player1_name": player1_name,
+                "player2_name": player2_name,
+                "current_turn": current_turn,
+                "bot": bool(bot),
+                "ships": [],
+                "shots": []
+            }
+        for game_id, player, ship_index, size, orientation, row, col in c.execute(
+                "SELECT game_id, player, ship_index, size, orientation, row, col FROM ships "
+                f"WHERE game_id IN ({ACTIVE_SESSIONS}) ORDER BY game_id, player, ship_index", (active_since,)):
+            if game_id in sessions:
+                sessions[game_id]["ships"].append((player, size, orientation, row, col))
+        for game_id, player, seq, row, col, result in c.execute(
+                "SELECT game_id, player, seq, row, col, result FROM shots "
+                f"WHERE game_id IN ({ACTIVE_SESSIONS}) ORDER BY game_id, seq", (active_since,)):
+            if game_id in sessions:
+                sessions[game_id]["shots"].append((player, seq, row, col, result))
+        return list(sessions.values())
+
+
+def max_game_id():
+    """
+    Возвращает наибольший числовой ID партии в базе, включая оконченные и
+    не загружаемые при запуске, или -1, если партий нет.
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT MAX(CAST(game_id AS INTEGER)) FROM (SELECT game_id FROM sessions UNION ALL "
+                  "SELECT game_id FROM results) WHERE game_id != '' AND game_id NOT GLOB '*[^0-9]*'")
+        value = c.fetchone()[0]
+        return -1 if value is None else value
+
+
+def get_result(game_id):
+    """
+    Возвращает итог оконченной партии или None.
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT winner, player1_name, player2_name, moves, duration, finished_at FROM results "
+                  "WHERE game_id = ?", (game_id,))
+        row = c.fetchone()
+        if row:
+            return dict(zip(("winner", "player1_name", "player2_name", "moves", "duration", "finished_at"), row))
+        return None
+
+
 def get_sessions():
     """
     Возвращает список всех игровых сессий.
@@ -87,23 +340,27 @@ def get_sessions():
 
 def get_session(game_id):
     """
-    Возвращает данные игровой сессии по ее ID.
+    Возвращает данные игровой сессии по ее ID вместе с кораблями и выстрелами
+    в том же виде, что и load_sessions.
     """
     with get_db_connection() as conn:
         c = conn.cursor()
-        c.execute("SELECT * FROM sessions WHERE game_id = ?", (game_id,))
+        c.execute("SELECT player1_name, player2_name, current_turn, bot FROM sessions WHERE game_id = ?",
+                  (game_id,))
         session = c.fetchone()
-        if session:
-            return {
-                "game_id": session[0],
-                "player1_name": session[1],
-                "player2_name": session[2],
-                "player1_ships": session[3],
-                "player2_ships": session[4],
-                "player1_shots": session[5],
-                "player2_shots": session[6]
-            }
-        return None
+        if session is None:
+            return None
+        player1_name, player2_name, current_turn, bot = session
+        return {
+            "game_id": game_id,
+            "player1_name": player1_name,
+            "player2_name": player2_name,
+            "current_turn": current_turn,
+            "bot": bool(bot),
+            "ships": [(player, size, orientation, row, col)
+                      for player, _, size, orientation, row, col in get_ships(game_id)],
+            "shots": [(player, seq, row, col, result) for player, seq, row, col, result in get_shots(game_id)]
+        }
 
 
 def remove_session(game_id):
@@ -113,4 +370,7 @@ def remove_session(game_id):
     with get_db_connection() as conn:
         c = conn.cursor()
         c.execute("DELETE FROM sessions WHERE game_id = ?", (game_id,))
+        c.execute("DELETE FROM ships WHERE game_id = ?", (game_id,))
+        c.execute("DELETE FROM shots WHERE game_id = ?", (game_id,))
+        c.execute("DELETE FROM results WHERE game_id = ?", (game_id,))
         conn.commit()
@@ -0,0 +1,172 @@
+import time
+from typing import Iterable, List, Optional, Tuple
+
+ROWS, COLS = 10, 10
+CELLS = ROWS * COLS
+
+# Значение в карте клеток, означающее отсутствие корабля
+NO_SHIP = 0xFF
+
+
+def cell_index(row: int, col: int) -> int:
+    """Возвращает порядковый номер клетки поля или -1, если клетка вне поля."""
+    if 0 <= row < ROWS and 0 <= col < COLS:
+        return row * COLS + col
+    return -1
+
+
+def positions_mask(positions: Iterable[Tuple[int, int]]) -> int:
+    """Собирает битовую маску из списка позиций. Возвращает -1, если позиция вне поля."""
+    mask = 0
+    for row, col in positions:
+        index = cell_index(row, col)
+        if index < 0:
+            return -1
+        mask |= 1 << index
+    return mask
+
+
+class Ship:
+    """Корабль в памяти сервера: размер, ориентация, занятые клетки и попадания."""
+
+    __slots__ = ("size", "orientation", "positions", "hits")
+
+    def __init__(self, size: int, orientation: int, positions: List[Tuple[int, int]],
+                 hits: Optional[List[Tuple[int, int]]] = None):
+        self.size = size
+        self.orientation = orientation
+        self.positions = positions
+        self.hits = hits if hits is not None else []
+
+    def is_sunk(self):
+        """Проверяет, потоплен ли корабль на основе количества попаданий."""
+        return len(self.hits) == self.size
+
+
+class Board:
+    """Поле игрока. Корабли, выстрелы и попадания хранятся битовыми масками.
+
+    Карта `cells` сопоставляет каждой клетке номер корабля, поэтому выстрел,
+    проверка повторного выстрела и потопления выполняются за O(1).
+    Карта создаётся при размещении первого корабля, чтобы пустые поля
+    ожидающих игр почти не занимали памяти.
+    """
+
+    __slots__ = ("ships", "shots", "ship_mask", "shot_mask", "hit_mask", "cells", "afloat")
+
+    def __init__(self):
+        self.ships: List[Ship] = []
+        self.shots: List[Tuple[int, int]] = []
+        self.ship_mask = 0
+        self.shot_mask = 0
+        self.hit_mask = 0
+        self.cells: Optional[bytearray] = None
+        self.afloat = 0  # Сколько кораблей ещё не потоплено
+
+    @property
+    def grid(self) -> List[List[int]]:
+        """Сетка поля: 1 в клетках с кораблями, 0 в остальных."""
+        mask = self.ship_mask
+        return [[(mask >> (row * COLS + col)) & 1 for col in range(COLS)] for row in range(ROWS)]
+
+    def place_ship(self, ship: Ship):
+        """Размещает корабль на поле, отмечая его позиции."""
+        if self.cells is None:
+            self.cells = bytearray(b"\xff" * CELLS)
+        ship_index = len(self.ships)
+        for row, col in ship.positions:
+            index = row * COLS + col
+            self.cells[index] = ship_index
+            self.ship_mask |= 1 << index
+        self.ships.append(ship)
+        self.afloat += 1
+
+    def can_place(self, ship: Ship):
+        """Проверяет, можно ли разместить корабль на указанных позициях."""
+        mask = positions_mask(ship.positions)
+        return mask >= 0 and not mask & self.ship_mask
+
+    def shoot(self, pos: Tuple[int, int]):
+        """Выполняет выстрел по указанной позиции и определяет результат."""
+        index = cell_index(pos[0], pos[1])
+        if index < 0:
+            return "miss"
+        bit = 1 << index
+        if self.shot_mask & bit:
+            return "already_shot"
+        self.shot_mask |= bit
+        self.shots.append(pos)
+        if not self.ship_mask & bit:
+            return "miss"
+        self.hit_mask |= bit
+        ship = self.ships[self.cells[index]]
+        ship.hits.append(pos)
+        if ship.is_sunk():
+            self.afloat -= 1
+            return "sunk"
+        return "hit"
+
+    def all_sunk(self) -> bool:
+        """Все корабли поля потоплены. Поле без кораблей не считается побеждённым."""
+        return bool(self.ships) and not self.afloat
+
+    def ship_at(self, row: int, col: int) -> Optional[Ship]:
+        """Возвращает корабль в клетке или None, если корабля нет."""
+        index = cell_index(row, col)
+        if index < 0 or self.cells is None or self.cells[index] == NO_SHIP:
+            return None
+        return self.ships[self.cells[index]]
+
+
+class Game:
+    """Состояние одной партии в памяти сервера."""
+
+    __slots__ = ("player1_board", "player2_board", "player1_name", "player2_name", "current_turn", "version", "bot",
+                 "winner", "log", "created_at", "finished_at")
+
+    def __init__(self, player1_name: str = "", player2_name: str = ""):
+        self.player1_board = Board()
+        self.player2_board = Board()
+        self.player1_name = player1_name
+        self.player2_name = player2_name
+        self.current_turn = "player1"  # "player1" или "player2"
+        self.version = 0  # Растёт при каждом изменении состояния партии
+        self.bot = None  # Бот (server.bot.Bot), если за второго игрока играет сервер
+        self.winner: Optional[str] = None  # "player1" или "player2", когда партия окончена
+        # Журнал ходов только дописывается: (игрок, строка, столбец, результат), номер хода - индекс в списке
+        self.log: List[Tuple[str, int, int, str]] = []
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def shoot(self, player: str, pos: Tuple[int, int]) -> str:
+        """Выстрел игрока по полю соперника. При промахе ход переходит к сопернику,
+        потопление последнего корабля соперника завершает партию."""
+        board = self.player2_board if player == "player1" else self.player1_board
+        result = board.shoot(pos)
+        if result == "already_shot":
+            return result
+        self.log.append((player, pos[0], pos[1], result))
+        if result == "miss":
+            self.switch_turn()
+        elif result == "sunk" and board.all_sunk():
+            self.winner = player
+            self.finished_at = time.time()
+        return result
+
+    @property
+    def moves(self) -> int:
+        """Выстрелы обоих игроков, кроме повторных."""
+        return len(self.log)
+
+    def moves_after(self, after_seq: int) -> List[Tuple[int, str, int, int, str]]:
+        """Ходы с номерами больше `after_seq` в виде (номер, игрок, строка, столбец, результат)."""
+        start = max(after_seq + 1, 0)
+        return [(seq, *move) for seq, move in enumerate(self.log[start:], start)]
+
+    def is_finished(self):
+        """Партия окончена, если у одного из игроков потоплены все корабли."""
+        return self.winner is not None
+
+    def switch_turn(self):
+        """Меняет текущего игрока."""
+        self.current_turn = "player1" if self.current_turn == "player2" else "player2"
@@ -0,0 +1,200 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Интервал отправки пустого комментария, чтобы прокси не закрывали соединение
+KEEPALIVE_INTERVAL = 15.0
+KEEPALIVE = b": keepalive\n\n"
+
+
+class EventHub:
+    """Рассылает события партий подписчикам (SSE-соединениям).
+
+    Публиковать события можно из любого потока: если подписчик живёт в другом
+    цикле событий, событие передаётся через `call_soon_threadsafe`.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(list)
+
+    def subscribe(self, game_id: int) -> asyncio.Queue:
+        """Регистрирует подписчика на события партии и возвращает его очередь."""
+        queue = asyncio.Queue()
+        self._subscribers[game_id].append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, game_id: int, queue: asyncio.Queue):
+        """Удаляет подписчика. Пустые списки подписчиков удаляются."""
+        subscribers = self._subscribers.get(game_id)
+        if not subscribers:
+            return
+        subscribers[:] = [item for item in subscribers if item[1] is not queue]
+        if not subscribers:
+            del self._subscribers[game_id]
+
+    def publish(self, game_id: int, event: dict):
+        """Отправляет событие всем подписчикам партии."""
+        subscribers = self._subscribers.get(game_id)
+        if not subscribers:
+            return
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for loop, queue in subscribers:
+            if loop is current:
+                queue.put_nowait(event)
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    async def stream(self, game_id: int, snapshot: Callable[[], dict]):
+        """Генератор SSE: сначала текущее состояние партии, затем события по мере появления.
+
+        Снимок строится сразу после подписки, без ожидания между ними: событие,
+        опубликованное до начала потока, уже отражено в снимке, а после - придёт в очередь.
+        """
+        queue = self.subscribe(game_id)
+        try:
+            yield format_event(snapshot())
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(game_id, queue)
+
+
+class Spectator:
+    """Соединение зрителя: закодированные события, ещё не отданные в сокет."""
+
+    __slots__ = ("loop", "chunks", "size", "waiter", "dropped")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.waiter: Optional[asyncio.Future] = None
+        self.dropped = False
+
+
+class SpectatorHub:
+    """Рассылка событий партий зрителям (/spectate/).
+
+    Событие кодируется один раз, и один и тот же объект bytes добавляется в
+    буферы всех зрителей партии. Соединение зрителя отдаёт в сокет всё
+    накопленное одним куском. Если зритель не успевает читать и у него
+    скопилось больше `buffer_bytes` неотправленных байт, он отключается:
+    клиент переподключается и получает свежее состояние, а рассылка
+    остальным не ждёт его и не копит для него память.
+
+    Снимок состояния для новых зрителей тоже кодируется один раз на версию
+    партии. Keepalive рассылает один таймер на все соединения цикла событий,
+    а не таймер ожидания в каждом соединении. Публиковать можно из любого
+    потока, как и в EventHub.
+    """
+
+    def __init__(self, buffer_bytes: int):
+        self.buffer_bytes = buffer_bytes
+        self.dropped = 0
+        self._spectators: Dict[int, Set[Spectator]] = defaultdict(set)
+        self._snapshots: Dict[int, Tuple[int, bytes]] = {}
+        self._keepalive: Dict[asyncio.AbstractEventLoop, asyncio.TimerHandle] = {}
+
+    def __len__(self):
+        return sum(map(len, self._spectators.values()))
+
+    def watching(self, game_id: int) -> bool:
+        """Есть ли у партии зрители."""
+        return game_id in self._spectators
+
+    def snapshot(self, game_id: int, version: int, build: Callable[[], dict]) -> bytes:
+        """Закодированное состояние партии версии `version`; `build` вызывается, только если его нет в кэше."""
+        cached = self._snapshots.get(game_id)
+        if cached is None or cached[0] != version:
+            cached = self._snapshots[game_id] = (version, format_event(build()).encode())
+        return cached[1]
+
+    def publish(self, game_id: int, event: dict):
+        """Кодирует событие и добавляет его в буферы всех зрителей партии."""
+        spectators = self._spectators.get(game_id)
+        if not spectators:
+            return
+        data = format_event(event).encode()
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for spectator in spectators:
+            if spectator.loop is current:
+                self._deliver(spectator, data)
+            else:
+                spectator.loop.call_soon_threadsafe(self._deliver, spectator, data)
+
+    async def stream(self, game_id: int, snapshot: Callable[[], bytes]):
+        """Генератор SSE зрителя: снимок состояния, затем события, пока зритель успевает их читать.
+
+        Снимок запрашивается сразу после подписки, без ожидания между ними,
+        поэтому ни одно событие не теряется и не приходит дважды.
+        """
+        loop = asyncio.get_running_loop()
+        spectator = Spectator(loop)
+        self._spectators[game_id].add(spectator)
+        if loop not in self._keepalive:
+            self._keepalive[loop] = loop.call_later(KEEPALIVE_INTERVAL, self._send_keepalive, loop)
+        try:
+            yield snapshot()
+            while True:
+                if not spectator.chunks and not spectator.dropped:
+                    spectator.waiter = loop.create_future()
+                    await spectator.waiter
+                if spectator.dropped:
+                    return
+                data = spectator.chunks[0] if len(spectator.chunks) == 1 else b"".join(spectator.chunks)
+                spectator.chunks.clear()
+                spectator.size = 0
+                yield data
+        finally:
+            self._unsubscribe(game_id, spectator)
+
+    def _deliver(self, spectator: Spectator, data: bytes):
+        if spectator.dropped:
+            return
+        if spectator.size + len(data) > self.buffer_bytes:
+            spectator.dropped = True
+            spectator.chunks.clear()
+            self.dropped += 1
+        else:
+            spectator.chunks.append(data)
+            spectator.size += len(data)
+        if spectator.waiter is not None and not spectator.waiter.done():
+            spectator.waiter.set_result(None)
+
+    def _send_keepalive(self, loop: asyncio.AbstractEventLoop):
+        del self._keepalive[loop]
+        watched = False
+        for spectators in self._spectators.values():
+            for spectator in spectators:
+                if spectator.loop is loop:
+                    watched = True
+                    if not spectator.chunks:
+                        self._deliver(spectator, KEEPALIVE)
+        if watched:
+            self._keepalive[loop] = loop.call_later(KEEPALIVE_INTERVAL, self._send_keepalive, loop)
+
+    def _unsubscribe(self, game_id: int, spectator: Spectator):
+        spectators = self._spectators.get(game_id)
+        if spectators is None:
+            return
+        spectators.discard(spectator)
+        if not spectators:
+            del self._spectators[game_id]
+            self._snapshots.pop(game_id, None)
+
+
+def format_event(event: dict) -> str:
+    """Кодирует событие в формат text/event-stream."""
+    return f"data: {json.dumps(event)}\n\n"
@@ -0,0 +1,166 @@
+"""
+Счётчики и гистограммы сервера в текстовом формате Prometheus.
+
+Метрики создаются один раз при импорте: на горячем пути только
+увеличиваются заранее созданные числа, без выделения памяти на запрос.
+Гистограмма хранит счётчики по фиксированным корзинам, накопленные суммы
+считаются только при выдаче /metrics.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+# Границы корзин задержки запросов, секунды
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """Монотонно растущий счётчик."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class ReadCounter:
+    """Счётчик, который ведёт другой объект: значение читается функцией `read` в момент выдачи."""
+
+    __slots__ = ("read",)
+
+    def __init__(self, read: Callable[[], int]):
+        self.read = read
+
+    @property
+    def value(self) -> int:
+        return self.read()
+
+
+class Histogram:
+    """Распределение значений по фиксированным корзинам."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Последняя корзина - больше всех границ
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self) -> List[Tuple[str, float]]:
+        """Накопленные значения корзин в порядке возрастания границ, затем +Inf."""
+        total = 0
+        samples = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            samples.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return samples
+
+
+class Registry:
+    """Метрики сервера с описаниями для вывода."""
+
+    def __init__(self):
+        self.counters: Dict[str, Tuple[str, Dict[Tuple[Tuple[str, str], ...], Union[Counter, ReadCounter]]]] = {}
+        self.histograms: Dict[str, Tuple[str, Dict[Tuple[Tuple[str, str], ...], Histogram]]] = {}
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def counter(self, name: str, help_text: str, **labels: str) -> Counter:
+        """Возвращает счётчик с метками, создавая его при первом обращении."""
+        family = self.counters.setdefault(name, (help_text, {}))[1]
+        key = tuple(sorted(labels.items()))
+        if key not in family:
+            family[key] = Counter()
+        return family[key]
+
+    def read_counter(self, name: str, help_text: str, read: Callable[[], int], **labels: str):
+        """Монотонное значение, которое читается функцией `read` в момент выдачи, с типом counter."""
+        self.counters.setdefault(name, (help_text, {}))[1][tuple(sorted(labels.items()))] = ReadCounter(read)
+
+    def histogram(self, name: str, help_text: str, bounds: Sequence[float] = LATENCY_BUCKETS,
+                  **labels: str) -> Histogram:
+        """Возвращает гистограмму с метками, создавая её при первом обращении."""
+        family = self.histograms.setdefault(name, (help_text, {}))[1]
+        key = tuple(sorted(labels.items()))
+        if key not in family:
+            family[key] = Histogram(bounds)
+        return family[key]
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Значение, которое читается функцией `read` в момент выдачи."""
+        self.gauges[name] = (help_text, read)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for name, (help_text, family) in self.counters.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, counter in family.items():
+                lines.append(f"{name}{_labels(labels)} {counter.value}")
+        for name, (help_text, read) in self.gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read()}")
+        for name, (help_text, family) in self.histograms.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in family.items():
+                for bound, total in histogram.samples():
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {total}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {sum(histogram.counts)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+registry = Registry()
+
+# Выстрелы по результату; доля попаданий и выстрелы в секунду считаются в Prometheus через rate()
+SHOTS = {result: registry.counter("sea_battle_shots_total", "Shots by result.", result=result)
+         for result in ("miss", "hit", "sunk", "already_shot")}
+GAMES_CREATED = registry.counter("sea_battle_games_created_total", "Games created.")
+GAMES_FINISHED = registry.counter("sea_battle_games_finished_total", "Games played to the end.")
+DB_FLUSH_SECONDS = registry.histogram("sea_battle_db_flush_seconds", "Write-behind flush duration.")
+DB_FLUSH_ROWS = registry.counter("sea_battle_db_flush_rows_total", "Rows written by write-behind flushes.")
+DB_FLUSH_ERRORS = registry.counter("sea_battle_db_flush_errors_total", "Failed write-behind flushes.")
+
+
+class TimingMiddleware:
+    """ASGI-прослойка: задержка каждого HTTP-запроса по шаблону маршрута.
+
+    Гистограмма маршрута создаётся при первом запросе к нему; шаблон берётся
+    из найденного маршрута FastAPI, поэтому /get_game_info/1 и /get_game_info/2
+    попадают в одну гистограмму. Для /events/ время - длительность подписки.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.by_route: Dict[str, Histogram] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            histogram = self.by_route.get(path)
+            if histogram is None:
+                histogram = self.by_route[path] = registry.histogram(
+                    "sea_battle_request_seconds", "HTTP request latency by route.", route=path)
+            histogram.observe(time.perf_counter() - start)
@@ -0,0 +1,56 @@
+"""
+Выборочный профилировщик, который включается и выключается без перезапуска сервера.
+
+Фоновый поток раз в `interval` секунд снимает стек потока цикла событий
+через sys._current_frames() и считает одинаковые стеки. Результат -
+свёрнутые стеки ("функция;функция;функция число"), которые принимают
+flamegraph.pl и speedscope. Пока профилировщик выключен, он ничего не стоит.
+"""
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """Снимает стеки одного потока с заданным периодом."""
+
+    def __init__(self):
+        self.samples = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, thread_id: int, interval: float = 0.005):
+        """Начинает снимать стеки потока `thread_id`; прежние результаты сбрасываются."""
+        if self.running:
+            return
+        self.samples = Counter()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(thread_id, interval), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Останавливает профилировщик и возвращает свёрнутые стеки."""
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def _run(self, thread_id: int, interval: float):
+        while not self._stopped.wait(interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,443 @@
+"""
+Хранение партий в Redis для запуска нескольких рабочих процессов и серверов.
+
+Включается настройкой STORAGE_BACKEND = "redis". Поле каждого игрока хранится
+битовыми картами (корабли и выстрелы), строкой из 100 байт с номером корабля
+в каждой клетке и хэшем с числом целых палуб каждого корабля. Выстрел вместе
+со сменой хода, увеличением версии и публикацией события выполняется одним
+Lua-скриптом, поэтому он атомарен для всех процессов. События партии
+рассылаются через канал pub/sub, на который подписываются /events/ и
+длинный опрос /get_game_info/.
+"""
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+import redis.asyncio as redis
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+
+from common import wire
+from common.fleet import FleetError, check_fleet, ship_cells
+from server.config import REDIS_URL, GAME_IDLE_TTL, LONG_POLL_TIMEOUT, LOBBY_PAGE_SIZE, MAX_LOBBY_PAGE_SIZE
+from server import metrics
+from server.engine import cell_index
+from server.events import KEEPALIVE_INTERVAL, format_event
+from server.schemas import (CreateGameRequest, GameInfoBatchRequest, JoinGameRequest, PlaceShipsRequest,
+                            ShootBatchRequest, ShootRequest)
+
+# Ключи партии в порядке KEYS Lua-скриптов: хэш партии, затем по четыре ключа на поле
+# каждого игрока - корабли (биты), выстрелы (биты), номера кораблей по клеткам, целые палубы,
+# и последним список-журнал ходов "игрок,строка,столбец,результат"
+BOARD_KEYS = ("ships", "shots", "cells", "remaining")
+
+_SCRIPT_HELPERS = r"""
+-- Скриптам передаются только ключи партии, поэтому TTL продлевается ей одной
+local function touch(ttl)
+  for i = 1, #KEYS do redis.call('EXPIRE', KEYS[i], ttl) end
+end
+local function bump_and_publish(channel, event)
+  event['version'] = redis.call('HINCRBY', KEYS[1], 'version', 1)
+  redis.call('PUBLISH', channel, cjson.encode(event))
+  return event['version']
+end
+"""
+
+# ARGV: игрок, номер клетки (-1 вне поля), строка, столбец, TTL, канал событий
+SHOOT_SCRIPT = _SCRIPT_HELPERS + r"""
+local turn = redis.call('HGET', KEYS[1], 'current_turn')
+if not turn then return {'not_found'} end
+if redis.call('HEXISTS', KEYS[1], 'winner') == 1 then return {'game_over'} end
+if turn ~= ARGV[1] then return {'not_your_turn'} end
+local base = ARGV[1] == 'player1' and 6 or 2
+local target = ARGV[1] == 'player1' and 'player2' or 'player1'
+local winner = nil
+local cell = tonumber(ARGV[2])
+local result = 'miss'
+if cell >= 0 then
+  if redis.call('GETBIT', KEYS[base + 1], cell) == 1 then
+    result = 'already_shot'
+  else
+    redis.call('SETBIT', KEYS[base + 1], cell, 1)
+    if redis.call('GETBIT', KEYS[base], cell) == 1 then
+      local ship = string.byte(redis.call('GETRANGE', KEYS[base + 2], cell, cell))
+      if redis.call('HINCRBY', KEYS[base + 3], ship, -1) == 0 then result = 'sunk' else result = 'hit' end
+      if result == 'sunk' and redis.call('HINCRBY', KEYS[1], 'afloat:' .. target, -1) == 0 then
+        winner = ARGV[1]
+        redis.call('HSET', KEYS[1], 'winner', winner)
+      end
+    end
+  end
+end
+if result == 'miss' then
+  turn = ARGV[1] == 'player1' and 'player2' or 'player1'
+  redis.call('HSET', KEYS[1], 'current_turn', turn)
+end
+local seq = nil
+if result ~= 'already_shot' then
+  seq = redis.call('RPUSH', KEYS[10], ARGV[1] .. ',' .. ARGV[3] .. ',' .. ARGV[4] .. ',' .. result) - 1
+end
+touch(ARGV[5])
+local version = bump_and_publish(ARGV[6], {type = 'shot', player = ARGV[1],
+  pos = {tonumber(ARGV[3]), tonumber(ARGV[4])}, result = result, current_turn = turn, winner = winner, seq = seq})
+return {result, turn, version, winner or ''}
+"""
+
+# ARGV: игрок, JSON-список кораблей (списки номеров клеток), TTL, канал событий.
+# Флот проверяется до вызова скрипта; скрипт только отказывает, если корабли уже расставлены
+PLACE_SCRIPT = _SCRIPT_HELPERS + r"""
+if redis.call('EXISTS', KEYS[1]) == 0 then return 'not_found' end
+local player = ARGV[1] == 'player1' and 'player1' or 'player2'
+local base = player == 'player1' and 2 or 6
+if redis.call('EXISTS', KEYS[base]) == 1 then return 'already_placed' end
+local ships = cjson.decode(ARGV[2])
+redis.call('SET', KEYS[base + 2], string.rep('\255', 100))
+local index = 0
+for _, cells in ipairs(ships) do
+  for _, cell in ipairs(cells) do
+    redis.call('SETBIT', KEYS[base], cell, 1)
+    redis.call('SETRANGE', KEYS[base + 2], cell, string.char(index))
+  end
+  redis.call('HSET', KEYS[base + 3], index, #cells)
+  index = index + 1
+end
+-- Счётчик кораблей называется по заполненному полю, а не по аргументу
+redis.call('HSET', KEYS[1], 'afloat:' .. player, index)
+touch(ARGV[3])
+bump_and_publish(ARGV[4], {type = 'ships_placed', player = player})
+return 'ok'
+"""
+
+# ARGV: имя второго игрока, TTL, канал событий. Партия убирается из лобби отдельной командой
+JOIN_SCRIPT = _SCRIPT_HELPERS + r"""
+if redis.call('EXISTS', KEYS[1]) == 0 then return 'not_found' end
+local current = redis.call('HGET', KEYS[1], 'player2_name')
+if current and current ~= '' then return 'full' end
+redis.call('HSET', KEYS[1], 'player2_name', ARGV[1])
+touch(ARGV[2])
+bump_and_publish(ARGV[3], {type = 'joined', player2_name = ARGV[1]})
+return 'ok'
+"""
+
+
+class RedisGameStore:
+    """Состояние партий в Redis. Клиент передаётся снаружи, что позволяет подставить fakeredis."""
+
+    def __init__(self, client: redis.Redis, ttl: float = GAME_IDLE_TTL, prefix: str = "sea_battle"):
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self.lobby_key = f"{prefix}:lobby"
+        self.id_key = f"{prefix}:next_game_id"
+        self._shoot = client.register_script(SHOOT_SCRIPT)
+        self._place = client.register_script(PLACE_SCRIPT)
+        self._join = client.register_script(JOIN_SCRIPT)
+
+    def keys(self, game_id: int) -> List[str]:
+        """Ключи партии; общий хэш-тег {ID} держит их в одном слоте Redis Cluster.
+
+        Лобби и счётчик ID лежат в других слотах, поэтому они изменяются отдельными
+        командами, а не в скриптах и транзакциях партии.
+        """
+        base = f"{self.prefix}:{{{game_id}}}"
+        return [f"{base}:game"] + [f"{base}:{player}:{name}"
+                                   for player in ("player1", "player2") for name in BOARD_KEYS] + [f"{base}:moves"]
+
+    def channel(self, game_id: int) -> str:
+        return f"{self.prefix}:{{{game_id}}}:events"
+
+    async def create_game(self, player1_name: str) -> int:
+        game_id = await self.client.incr(self.id_key) - 1
+        game_key = self.keys(game_id)[0]
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(game_key, mapping={"player1_name": player1_name, "player2_name": "",
+                                         "current_turn": "player1", "version": 0})
+            pipe.expire(game_key, self.ttl)
+            await pipe.execute()
+        await self.client.zadd(self.lobby_key, {str(game_id): game_id})
+        return game_id
+
+    async def join_game(self, game_id: int, player2_name: str) -> str:
+        """Возвращает "ok", "not_found" или "full"."""
+        result = _text(await self._join(keys=self.keys(game_id), args=[player2_name, self.ttl, self.channel(game_id)]))
+        if result == "ok":
+            await self.client.zrem(self.lobby_key, str(game_id))
+        return result
+
+    async def place_ships(self, game_id: int, player: str, ships: List[List[Tuple[int, int]]]) -> str:
+        """Размещает проверенный флот атомарно. Возвращает "ok", "not_found" или "already_placed"."""
+        cells = [[cell_index(row, col) for row, col in positions] for positions in ships]
+        result = await self._place(keys=self.keys(game_id),
+                                   args=[player, json.dumps(cells), self.ttl, self.channel(game_id)])
+        return _text(result)
+
+    async def shoot(self, game_id: int, player: str, pos: Tuple[int, int]) -> tuple:
+        """Возвращает (результат, чей ход, версия, победитель); "not_found", "game_over" и "not_your_turn" - ошибки."""
+        return _shot(await self._shoot(keys=self.keys(game_id), args=self._shoot_args(game_id, player, pos)))
+
+    async def shoot_many(self, shots: List[Tuple[int, str, Tuple[int, int]]]) -> List[tuple]:
+        """Выстрелы (ID партии, игрок, клетка) одним конвейером, результаты - как у `shoot`.
+
+        Каждый выстрел - отдельный вызов скрипта, поэтому выстрелы в одну партию
+        выполняются по порядку и видят результат предыдущих.
+        """
+        async with self.client.pipeline(transaction=False) as pipe:
+            for game_id, player, pos in shots:
+                await self._shoot(keys=self.keys(game_id), args=self._shoot_args(game_id, player, pos), client=pipe)
+            return [_shot(reply) for reply in await pipe.execute()]
+
+    def _shoot_args(self, game_id: int, player: str, pos: Tuple[int, int]) -> list:
+        return [player, cell_index(pos[0], pos[1]), pos[0], pos[1], self.ttl, self.channel(game_id)]
+
+    async def get_state(self, game_id: int) -> Optional[dict]:
+        return _state(await self.client.hgetall(self.keys(game_id)[0]))
+
+    async def moves(self, game_id: int, after_seq: int = -1) -> Tuple[list, int]:
+        """Ходы с номерами больше `after_seq` - (номер, игрок, строка, столбец, результат) - и номер последнего."""
+        key = self.keys(game_id)[-1]
+        start = max(after_seq + 1, 0)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, start, -1)
+            pipe.llen(key)
+            entries, length = await pipe.execute()
+        return _moves(entries, start), length - 1
+
+    async def game_infos(self, queries: List[Tuple[int, int]]) -> List[Optional[dict]]:
+        """Ответы /get_game_info/ для пар (ID партии, after_seq) одной транзакцией; None - партии нет."""
+        async with self.client.pipeline(transaction=True) as pipe:
+            for game_id, after_seq in queries:
+                keys = self.keys(game_id)
+                pipe.hgetall(keys[0])
+                pipe.lrange(keys[-1], max(after_seq + 1, 0), -1)
+                pipe.llen(keys[-1])
+            replies = await pipe.execute()
+        infos = []
+        for index, (_, after_seq) in enumerate(queries):
+            state = _state(replies[3 * index])
+            moves = _moves(replies[3 * index + 1], max(after_seq + 1, 0))
+            infos.append(None if state is None else game_info(state, moves, replies[3 * index + 2] - 1))
+        return infos
+
+    async def lobby(self, offset: int, limit: int) -> Tuple[List[int], int]:
+        """Страница партий, ожидающих второго игрока, и их общее число."""
+        ids = [int(game_id) for game_id in await self.client.zrange(self.lobby_key, offset, offset + limit - 1)]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for game_id in ids:
+                pipe.hget(self.keys(game_id)[0], "player2_name")
+            names = await pipe.execute()
+        open_ids = {game_id for game_id, name in zip(ids, names) if name is not None and _text(name) == ""}
+        waiting = [game_id for game_id in ids if game_id in open_ids]
+        stale = [game_id for game_id in ids if game_id not in open_ids]
+        if stale:
+            # Партии удалены по TTL или к ним присоединились, но процесс не успел убрать их из лобби
+            await self.client.zrem(self.lobby_key, *stale)
+        return waiting, await self.client.zcard(self.lobby_key)
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _state(fields: dict) -> Optional[dict]:
+    if not fields:
+        return None
+    return {_text(key): _text(value) for key, value in fields.items()}
+
+
+def _moves(entries: list, start: int) -> list:
+    moves = []
+    for seq, entry in enumerate(entries, start):
+        player, row, col, result = _text(entry).split(",")
+        moves.append((seq, player, int(row), int(col), result))
+    return moves
+
+
+def _shot(reply: list) -> Tuple[str, Optional[str], int, Optional[str]]:
+    if len(reply) == 1:
+        return _text(reply[0]), None, 0, None
+    return _text(reply[0]), _text(reply[1]), int(reply[2]), _text(reply[3]) or None
+
+
+def _count_shot(result: str, winner: Optional[str]):
+    """Учитывает выстрел в метриках так же, как fire() для партий в памяти."""
+    metrics.SHOTS[result].inc()
+    if winner is not None:
+        metrics.GAMES_FINISHED.inc()
+
+
+# Ответы скрипта выстрела, означающие ошибку: код и текст ответа HTTP
+SHOT_ERRORS = {
+    "not_found": (404, "Game not found."),
+    "game_over": (400, "Game is over."),
+    "not_your_turn": (400, "Not your turn."),
+}
+
+
+def game_info(state: dict, moves: list, last_seq: int) -> dict:
+    """Ответ /get_game_info/ в том же виде, что и для партий в памяти."""
+    return {
+        "player1_name": state["player1_name"],
+        "player2_name": state["player2_name"],
+        "current_turn": state["current_turn"],
+        "moves": moves,
+        "last_seq": last_seq,
+        "winner": state.get("winner"),
+        "version": int(state["version"]),
+    }
+
+
+backend = RedisGameStore(redis.Redis.from_url(REDIS_URL))
+router = APIRouter()
+
+
+@router.post("/create_game/")
+async def create_game(request: CreateGameRequest):
+    """Создает новую игровую сессию и возвращает ID игры и имя первого игрока."""
+    if request.vs_bot:
+        # Бот хранит своё состояние в памяти процесса и с Redis не работает
+        raise HTTPException(status_code=400, detail="Bot games are not supported by this backend.")
+    game_id = await backend.create_game(request.player1_name)
+    metrics.GAMES_CREATED.inc()
+    return {"message": "Game created successfully.", "game_id": game_id, "player": "player1"}
+
+
+@router.post("/join_game/")
+async def join_game(request: JoinGameRequest):
+    """Позволяет второму игроку подключиться к существующей игре."""
+    result = await backend.join_game(request.game_id, request.player2_name)
+    if result == "not_found":
+        raise HTTPException(status_code=404, detail="Game not found.")
+    if result == "full":
+        raise HTTPException(status_code=400, detail="Game already has two players.")
+    return {"message": "Player 2 joined successfully.", "game_id": request.game_id, "player": "player2"}
+
+
+@router.get("/get_games/")
+async def get_games(offset: int = 0, limit: int = LOBBY_PAGE_SIZE):
+    """Получает страницу игровых сессий, ожидающих второго игрока."""
+    offset = max(offset, 0)
+    limit = min(max(limit, 0), MAX_LOBBY_PAGE_SIZE)
+    game_ids, total = await backend.lobby(offset, limit) if limit else ([], 0)
+    return {"games": game_ids, "total": total, "offset": offset}
+
+
+@router.post("/place_ship/")
+async def place_ship(request: PlaceShipsRequest):
+    """Размещает весь флот игрока за один запрос: все корабли сразу или ни одного."""
+    try:
+        fleet = check_fleet(request.ships)
+    except FleetError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    result = await backend.place_ships(request.game_id, request.player, [ship_cells(*ship) for ship in fleet])
+    if result == "not_found":
+        raise HTTPException(status_code=404, detail="Game not found.")
+    if result == "already_placed":
+        raise HTTPException(status_code=400, detail="Ships already placed.")
+    return {"message": "Ship placed successfully."}
+
+
+@router.post("/shoot/")
+async def shoot(request: ShootRequest, accept: Optional[str] = Header(None)):
+    """Выполняет выстрел по указанной позиции и возвращает результат."""
+    result, _, _, winner = await backend.shoot(request.game_id, request.player, request.pos)
+    if result in SHOT_ERRORS:
+        status, detail = SHOT_ERRORS[result]
+        raise HTTPException(status_code=status, detail=detail)
+    _count_shot(result, winner)
+    if wire.accepts(accept):
+        return Response(wire.encode_shot(result), media_type=wire.MEDIA_TYPE)
+    return {"result": result}
+
+
+@router.get("/get_game_info/{game_id}")
+async def get_game_info(game_id: int, since_version: Optional[int] = None, timeout: float = LONG_POLL_TIMEOUT,
+                        after_seq: int = -1, accept: Optional[str] = Header(None)):
+    """Возвращает состояние партии и ходы после `after_seq`; с `since_version` ждёт изменения
+    и отвечает в компактном виде, как и для партий в памяти."""
+    state = await backend.get_state(game_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Game not found.")
+    if since_version is not None and int(state["version"]) == since_version:
+        async with backend.client.pubsub() as pubsub:
+            await pubsub.subscribe(backend.channel(game_id))
+            # Подписка до повторной проверки версии, чтобы не пропустить изменение между ними
+            state = await backend.get_state(game_id)
+            if state is not None and int(state["version"]) == since_version:
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + min(max(timeout, 0.0), LONG_POLL_TIMEOUT)
+                message = None
+                while message is None and loop.time() < deadline:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                       timeout=deadline - loop.time())
+                if message is None:
+                    return Response(status_code=304)
+                state = await backend.get_state(game_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Game not found.")
+    info = game_info(state, *await backend.moves(game_id, after_seq))
+    if wire.accepts(accept):
+        try:
+            return Response(wire.encode_info(info), media_type=wire.MEDIA_TYPE)
+        except wire.WireError:
+            pass  # Имя из старой базы длиннее допустимого: ответ в JSON, клиент различает их по Content-Type
+    return info
+
+
+@router.post("/batch/get_game_info/")
+async def get_games_info(request: GameInfoBatchRequest):
+    """Состояние нескольких партий одной транзакцией Redis; ответ - как для партий в памяти."""
+    infos = await backend.game_infos([(query.game_id, query.after_seq) for query in request.games])
+    results = []
+    for query, info in zip(request.games, infos):
+        if info is None:
+            results.append({"game_id": query.game_id, "status": 404, "detail": "Game not found."})
+        else:
+            results.append({"game_id": query.game_id, "status": 200, **info})
+    return {"games": results}
+
+
+@router.post("/batch/shoot/")
+async def shoot_batch(request: ShootBatchRequest):
+    """Несколько выстрелов одним конвейером Redis; ответ - как для партий в памяти."""
+    items = request.shot_items()
+    valid = [shot for shot in items if not isinstance(shot, dict)]
+    replies = iter(await backend.shoot_many([(shot.game_id, shot.player, shot.pos) for shot in valid]))
+    results = []
+    for shot in items:
+        if isinstance(shot, dict):
+            results.append(shot)
+            continue
+        result, _, _, winner = next(replies)
+        if result in SHOT_ERRORS:
+            status, detail = SHOT_ERRORS[result]
+            results.append({"game_id": shot.game_id, "status": status, "detail": detail})
+        else:
+            _count_shot(result, winner)
+            results.append({"game_id": shot.game_id, "status": 200, "result": result})
+    return {"results": results}
+
+
+@router.get("/events/{game_id}")
+async def game_events(game_id: int):
+    """Поток событий партии (Server-Sent Events) из канала pub/sub."""
+    state = await backend.get_state(game_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Game not found.")
+
+    async def stream():
+        async with backend.client.pubsub() as pubsub:
+            await pubsub.subscribe(backend.channel(game_id))
+            current = await backend.get_state(game_id) or state
+            last_seq = await backend.client.llen(backend.keys(game_id)[-1]) - 1
+            snapshot = {"type": "state", "player1_name": current["player1_name"],
+                        "player2_name": current["player2_name"], "current_turn": current["current_turn"],
+                        "last_seq": last_seq, "winner": current.get("winner"), "version": int(current["version"])}
+            yield format_event(snapshot)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=KEEPALIVE_INTERVAL)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {_text(message['data'])}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
@@ -0,0 +1,130 @@
+import bisect
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from server.engine import Game
+
+
+class GameRegistry:
+    """Партии в памяти сервера с поиском по ID за O(1) и вытеснением неактивных.
+
+    Незавершённые и оконченные партии лежат в двух словарях в порядке
+    последнего изменения (`touch`), поэтому самые давно не менявшиеся всегда
+    в начале своего словаря: проверка TTL просматривает только истёкшие
+    партии, а вытеснение при переполнении - только начало словарей. Отдельный
+    отсортированный список хранит партии, к которым ещё можно подключиться,
+    чтобы страница лобби не перебирала ни все партии, ни предыдущие страницы.
+    """
+
+    def __init__(self, idle_ttl: float = 3600.0, finished_ttl: float = 300.0, max_games: int = 200000,
+                 clock=time.monotonic):
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.max_games = max_games
+        self.clock = clock
+        self._games: Dict[int, Game] = {}
+        self._active: "OrderedDict[int, float]" = OrderedDict()  # ID -> время изменения, незавершённые
+        self._finished: "OrderedDict[int, float]" = OrderedDict()  # То же для оконченных партий
+        self._joinable: List[int] = []  # ID по возрастанию
+        self.evicted_idle = 0
+        self.evicted_finished = 0
+        self.evicted_capacity = 0
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, game_id: int):
+        return game_id in self._games
+
+    def get(self, game_id: int) -> Optional[Game]:
+        """Возвращает партию по ID или None. Чтение не продлевает жизнь партии."""
+        return self._games.get(game_id)
+
+    def add(self, game_id: int, game: Game):
+        """Добавляет партию. При переполнении вытесняет давно не менявшиеся партии."""
+        self._games[game_id] = game
+        (self._finished if game.is_finished() else self._active)[game_id] = self.clock()
+        if not game.player2_name:
+            bisect.insort(self._joinable, game_id)
+        while len(self._games) > self.max_games:
+            self._remove(self._oldest())
+            self.evicted_capacity += 1
+
+    def touch(self, game_id: int):
+        """Отмечает изменение партии и обновляет индекс лобби."""
+        game = self._games.get(game_id)
+        if game is None:
+            return
+        if game.is_finished():
+            self._active.pop(game_id, None)
+            self._finished.pop(game_id, None)
+            self._finished[game_id] = self.clock()
+        else:
+            self._active.move_to_end(game_id)
+            self._active[game_id] = self.clock()
+        if game.player2_name:
+            self._leave_lobby(game_id)
+
+    def lobby(self, offset: int = 0, limit: int = 50) -> List[int]:
+        """Страница ID партий, ожидающих второго игрока."""
+        return self._joinable[offset:offset + limit]
+
+    def lobby_size(self) -> int:
+        return len(self._joinable)
+
+    def evict_expired(self) -> int:
+        """Удаляет партии, которые не менялись дольше TTL. Возвращает число удалённых."""
+        now = self.clock()
+        finished = self._expired(self._finished, now - self.finished_ttl)
+        idle = self._expired(self._active, now - self.idle_ttl)
+        for game_id in finished + idle:
+            self._remove(game_id)
+        self.evicted_finished += len(finished)
+        self.evicted_idle += len(idle)
+        return len(finished) + len(idle)
+
+    @staticmethod
+    def _expired(touched: "OrderedDict[int, float]", deadline: float) -> List[int]:
+        """ID из начала словаря, изменённые раньше `deadline`; дальше только изменённые позже."""
+        expired = []
+        for game_id, touched_at in touched.items():
+            if touched_at > deadline:
+                break
+            expired.append(game_id)
+        return expired
+
+    def _oldest(self) -> int:
+        """ID давнее всех не менявшейся партии."""
+        active = next(iter(self._active.items()), None)
+        finished = next(iter(self._finished.items()), None)
+        if finished is None or (active is not None and active[1] <= finished[1]):
+            return active[0]
+        return finished[0]
+
+    def stats(self) -> dict:
+        """Счётчики для мониторинга."""
+        return {
+            "live_games": len(self._games),
+            "joinable_games": len(self._joinable),
+            "evicted_idle": self.evicted_idle,
+            "evicted_finished": self.evicted_finished,
+            "evicted_capacity": self.evicted_capacity,
+        }
+
+    def clear(self):
+        self._games.clear()
+        self._active.clear()
+        self._finished.clear()
+        self._joinable.clear()
+
+    def _leave_lobby(self, game_id: int):
+        index = bisect.bisect_left(self._joinable, game_id)
+        if index < len(self._joinable) and self._joinable[index] == game_id:
+            del self._joinable[index]
+
+    def _remove(self, game_id: int):
+        del self._games[game_id]
+        if self._active.pop(game_id, None) is None:
+            del self._finished[game_id]
+        self._leave_lobby(game_id)
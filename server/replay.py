@@ -0,0 +1,224 @@
+"""
+Записи оконченных партий (реплеи) и их проверка повторной игрой на движке.
+
+Реплеи дописываются в файлы-сегменты каталога REPLAY_DIR; каждый рабочий
+процесс пишет в свои сегменты. Сегмент начинается с FILE_MAGIC, за ним
+идут записи с префиксом длины (little-endian):
+
+    u32 длина тела | u64 ID партии | u8 победитель (1, 2) | u8 кораблей player1 |
+    u8 кораблей player2 | u16 выстрелов | тело
+
+Тело - числа u16: сначала корабли player1 и player2
+(клетка | ориентация << 7 | размер << 8), затем выстрелы по порядку
+в формате ходов common.wire (клетка | игрок << 7 | результат << 8).
+Партия из 100 выстрелов занимает около 260 байт.
+
+Проверка читает сегменты через mmap, заново играет каждую партию на Board
+и сравнивает результаты выстрелов, очередь ходов и победителя с записанными.
+Сегменты проверяются параллельно в процессах ProcessPoolExecutor.
+
+Запуск из корня проекта:
+    python -m server.replay verify replays/
+    python -m server.replay show replays/ --game-id 42
+"""
+import argparse
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from common.fleet import FleetError, check_fleet, ship_cells
+from common.wire import PLAYERS, pack_move, unpack_move
+from server.engine import COLS, Game, Ship
+
+FILE_MAGIC = b"SBRP\x01"
+SEGMENT_SUFFIX = ".sbr"
+HEADER = struct.Struct("<IQBBBH")
+
+
+class Replay(NamedTuple):
+    game_id: int
+    winner: str
+    fleets: Tuple[list, list]  # Корабли player1 и player2: (размер, ориентация, строка, столбец)
+    shots: List[Tuple[str, int, int, str]]  # (игрок, строка, столбец, результат)
+
+
+def encode(game_id: int, game: Game) -> bytes:
+    """Запись оконченной партии: флоты обоих игроков и журнал ходов."""
+    body = []
+    for board in (game.player1_board, game.player2_board):
+        for ship in board.ships:
+            row, col = ship.positions[0]
+            body.append(row * COLS + col | ship.orientation << 7 | ship.size << 8)
+    body.extend(pack_move(*move) for move in game.log)
+    header = HEADER.pack(len(body) * 2, game_id, PLAYERS.index(game.winner) + 1,
+                         len(game.player1_board.ships), len(game.player2_board.ships), len(game.log))
+    return header + struct.pack(f"<{len(body)}H", *body)
+
+
+def decode(buffer, offset: int = 0) -> Tuple[Replay, int]:
+    """Разбирает запись с позиции `offset`. Возвращает реплей и позицию следующей записи."""
+    length, game_id, winner, ships1, ships2, shots = HEADER.unpack_from(buffer, offset)
+    offset += HEADER.size
+    if length != (ships1 + ships2 + shots) * 2:
+        raise ValueError(f"corrupt record of game {game_id}")
+    body = struct.unpack_from(f"<{length // 2}H", buffer, offset)
+    ships = [(value >> 8, value >> 7 & 1, (value & 0x7F) // COLS, (value & 0x7F) % COLS)
+             for value in body[:ships1 + ships2]]
+    moves = [unpack_move(value) for value in body[ships1 + ships2:]]
+    return Replay(game_id, PLAYERS[winner - 1], (ships[:ships1], ships[ships1:]), moves), offset + length
+
+
+def read_segment(path: str) -> Iterator[Tuple[int, Replay]]:
+    """Реплеи сегмента по порядку вместе с их смещением в файле.
+
+    Недописанная последняя запись (процесс остановился во время записи)
+    пропускается.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size <= len(FILE_MAGIC):
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(FILE_MAGIC)] != FILE_MAGIC:
+                raise ValueError(f"{path}: not a replay segment")
+            offset = len(FILE_MAGIC)
+            size = len(buffer)
+            while offset + HEADER.size <= size:
+                if offset + HEADER.size + HEADER.unpack_from(buffer, offset)[0] > size:
+                    return
+                replay, next_offset = decode(buffer, offset)
+                yield offset, replay
+                offset = next_offset
+
+
+def segments(directory: str) -> List[str]:
+    """Файлы-сегменты каталога по имени, то есть по времени создания."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+
+
+def verify(replay: Replay) -> Optional[str]:
+    """Заново играет партию на движке. Возвращает описание расхождения или None."""
+    game = Game()
+    for board, fleet in zip((game.player1_board, game.player2_board), replay.fleets):
+        try:
+            check_fleet([{"size": size, "orientation": orientation, "start_pos": (row, col)}
+                         for size, orientation, row, col in fleet])
+        except FleetError as error:
+            return f"illegal fleet: {error}"
+        for size, orientation, row, col in fleet:
+            positions = ship_cells(size, orientation, row, col)
+            board.place_ship(Ship(size=size, orientation=orientation, positions=positions))
+    for seq, (player, row, col, result) in enumerate(replay.shots):
+        if game.winner is not None:
+            return f"move {seq} after the end of the game"
+        if player != game.current_turn:
+            return f"move {seq} out of turn"
+        actual = game.shoot(player, (row, col))
+        if actual != result:
+            return f"move {seq} at {(row, col)}: recorded {result}, engine {actual}"
+    if game.winner != replay.winner:
+        return f"recorded winner {replay.winner}, engine {game.winner}"
+    return None
+
+
+class ReplayWriter:
+    """Дописывает реплеи в сегменты каталога; новый сегмент начинается после `segment_bytes`."""
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, records: List[bytes]):
+        """Дописывает записи одним вызовом write и сбрасывает их на диск."""
+        if not records:
+            return
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                self._open_segment()
+            self._file.write(b"".join(records))
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.monotonic_ns()}{SEGMENT_SUFFIX}"
+        self._file = open(os.path.join(self.directory, name), "ab")
+        self._file.write(FILE_MAGIC)
+
+
+def verify_segment(path: str) -> dict:
+    """Проверяет все реплеи сегмента. Возвращает число реплеев и список расхождений."""
+    checked = 0
+    failures = []
+    for offset, replay in read_segment(path):
+        checked += 1
+        problem = verify(replay)
+        if problem is not None:
+            failures.append((path, offset, replay.game_id, problem))
+    return {"replays": checked, "failures": failures}
+
+
+def run_verify(directory: str, workers: int) -> int:
+    """Проверяет все сегменты каталога. Возвращает число расхождений."""
+    paths = segments(directory)
+    start = time.perf_counter()
+    total = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(verify_segment, path) for path in paths]):
+            result = future.result()
+            total += result["replays"]
+            failures.extend(result["failures"])
+    elapsed = time.perf_counter() - start
+    for path, offset, game_id, problem in sorted(failures):
+        print(f"{path}@{offset}: game {game_id}: {problem}")
+    print(f"{total:,} replays in {len(paths)} segments, {len(failures)} mismatches, "
+          f"{elapsed:.1f}s ({total / elapsed * 60 if elapsed else 0:,.0f} replays/min)")
+    return len(failures)
+
+
+def show(directory: str, game_id: int):
+    """Печатает флоты и ходы партии для разбора спорных случаев."""
+    for path in segments(directory):
+        for offset, replay in read_segment(path):
+            if replay.game_id != game_id:
+                continue
+            print(f"game {game_id} ({path}@{offset}), winner {replay.winner}")
+            for player, fleet in zip(PLAYERS, replay.fleets):
+                print(f"  {player} fleet: {fleet}")
+            for seq, (player, row, col, result) in enumerate(replay.shots):
+                print(f"  {seq:>3} {player} ({row}, {col}) {result}")
+            print(f"  engine: {verify(replay) or 'ok'}")
+            return
+    print(f"game {game_id} not found")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("verify", "show"))
+    parser.add_argument("directory")
+    parser.add_argument("--game-id", type=int)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if args.command == "show":
+        if args.game_id is None:
+            parser.error("show needs --game-id")
+        show(args.directory, args.game_id)
+    elif run_verify(args.directory, args.workers):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
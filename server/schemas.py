@@ -0,0 +1,62 @@
+from typing import Annotated, Any, Dict, List, Literal, Tuple, Union
+
+from pydantic import BaseModel, Field, ValidationError
+
+from common.fleet import COLS, ROWS
+from server.config import MAX_BATCH_SIZE, MAX_NAME_LENGTH
+
+# Игрок партии; другие значения сохранились бы в базе и сломали бы загрузку партии
+Player = Literal["player1", "player2"]
+
+# Клетка в пределах поля; выстрел за пределы записался бы в журнал и сломал упаковку ходов
+Cell = Tuple[Annotated[int, Field(ge=0, lt=ROWS)], Annotated[int, Field(ge=0, lt=COLS)]]
+
+# Имя игрока; длина ограничена, чтобы имя помещалось в компактный формат ответов (common/wire.py)
+Name = Annotated[str, Field(max_length=MAX_NAME_LENGTH)]
+
+
+class CreateGameRequest(BaseModel):
+    player1_name: Name
+    vs_bot: bool = False  # Одиночная игра: за второго игрока играет сервер
+
+
+class JoinGameRequest(BaseModel):
+    game_id: int
+    player2_name: Name
+
+
+class PlaceShipsRequest(BaseModel):
+    ships: List[Dict]
+    game_id: int
+    player: Player
+
+
+class ShootRequest(BaseModel):
+    game_id: int
+    pos: Cell
+    player: Player
+
+
+class GameInfoQuery(BaseModel):
+    game_id: int
+    after_seq: int = -1
+
+
+class GameInfoBatchRequest(BaseModel):
+    games: List[GameInfoQuery] = Field(max_length=MAX_BATCH_SIZE)
+
+
+class ShootBatchRequest(BaseModel):
+    # Элементы проверяются по одному (shot_items): неверный выстрел получает свой ответ 422, а не отменяет пакет
+    shots: List[Any] = Field(max_length=MAX_BATCH_SIZE)
+
+    def shot_items(self) -> List[Union[ShootRequest, dict]]:
+        """Выстрелы пакета по порядку: ShootRequest или готовый результат 422 для неверного элемента."""
+        items = []
+        for shot in self.shots:
+            try:
+                items.append(ShootRequest.model_validate(shot))
+            except ValidationError as error:
+                items.append({"game_id": shot.get("game_id") if isinstance(shot, dict) else None, "status": 422,
+                              "detail": error.errors(include_url=False, include_context=False)})
+        return items
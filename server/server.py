@@ -1,181 +1,418 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Tuple, Dict
-
-app = FastAPI()
-
-ROWS, COLS = 10, 10
-
-
-class Ship(BaseModel):
-    size: int
-    orientation: int
-    positions: List[Tuple[int, int]]
-    hits: List[Tuple[int, int]] = []
-
-    def is_sunk(self):
-        """Проверяет, потоплен ли корабль на основе количества попаданий."""
-        return len(self.hits) == self.size
-
-
-class Board(BaseModel):
-    grid: List[List[int]] = [[0 for _ in range(COLS)] for _ in range(ROWS)]
-    ships: List[Ship] = []
-    shots: List[Tuple[int, int]] = []
+import asyncio
+import functools
+import itertools
+import random
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from common import wire
+from common.fleet import FleetError, check_fleet, random_fleet, random_placements, ship_cells
+from server import metrics
+from server.bot import BOT_NAME, Bot
+from server.config import (PERSIST_GAMES, FLUSH_INTERVAL_MS, GAME_IDLE_TTL, FINISHED_GAME_TTL, MAX_GAMES,
+                           EVICT_INTERVAL, LONG_POLL_TIMEOUT, LOBBY_PAGE_SIZE, MAX_LOBBY_PAGE_SIZE,
+                           STORAGE_BACKEND, PROFILER_ENABLED, REPLAY_DIR, SPECTATOR_BUFFER_BYTES)
+from server.engine import ROWS, COLS, Ship, Board, Game
+from server.events import EventHub, SpectatorHub
+from server.profiler import profiler
+from server.registry import GameRegistry
+from server.schemas import (CreateGameRequest, GameInfoBatchRequest, JoinGameRequest, PlaceShipsRequest,
+                            ShootBatchRequest, ShootRequest)
+
+games = GameRegistry(idle_ttl=GAME_IDLE_TTL, finished_ttl=FINISHED_GAME_TTL, max_games=MAX_GAMES)
+events = EventHub()
+spectators = SpectatorHub(SPECTATOR_BUFFER_BYTES)
+
+# ID партий выдаются счётчиком, а не по длине списка: next() не уступает управление
+game_ids = itertools.count()
+
+# Замки партий: партия защищена замком из таблицы по остатку от деления ID.
+# Партии с разными замками обрабатываются независимо, таблица не растёт с числом партий.
+LOCK_SHARDS = 256
+game_locks = [asyncio.Lock() for _ in range(LOCK_SHARDS)]
+
+
+def game_lock(game_id: int) -> asyncio.Lock:
+    """Возвращает замок, под которым изменяется партия."""
+    return game_locks[game_id % LOCK_SHARDS]
+
+
+store = None
+if PERSIST_GAMES and STORAGE_BACKEND == "memory":
+    from server.replay import ReplayWriter
+    from server.storage import WriteBehindStore
+    store = WriteBehindStore(games.get, FLUSH_INTERVAL_MS, ReplayWriter(REPLAY_DIR) if REPLAY_DIR else None)
+
+
+async def evict_games():
+    """Периодически удаляет из памяти завершённые и заброшенные партии."""
+    while True:
+        await asyncio.sleep(EVICT_INTERVAL)
+        games.evict_expired()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Загружает незавершённые партии при старте и сохраняет изменения при остановке."""
+    global game_ids
+    if store is not None:
+        loaded = store.load(GAME_IDLE_TTL)
+        for game_id in sorted(loaded):
+            games.add(game_id, loaded[game_id])
+            # Ответные ходы бота могли не попасть в базу до остановки сервера
+            play_bot(game_id, loaded[game_id])
+        # ID оконченных партий тоже заняты: их итоги и история остаются в базе
+        game_ids = itertools.count(store.next_game_id)
+        store.start()
+    eviction = asyncio.create_task(evict_games())
+    yield
+    eviction.cancel()
+    if store is not None:
+        store.stop()
+
+
+def get_game_or_404(game_id: int) -> Game:
+    """Возвращает партию или отвечает 404, если её нет (или она уже удалена из памяти)."""
+    game = games.get(game_id)
+    if game is None:
+        raise HTTPException(status_code=404, detail="Game not found.")
+    return game
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.TimingMiddleware)
+if STORAGE_BACKEND == "memory":
+    # Реестр партий и зрители есть только у партий в памяти; с Redis они пусты и нули вводили бы в заблуждение
+    metrics.registry.gauge("sea_battle_live_games", "Games held in memory.", lambda: len(games))
+    metrics.registry.gauge("sea_battle_joinable_games", "Games waiting for the second player.", games.lobby_size)
+    for _reason in ("idle", "finished", "capacity"):
+        metrics.registry.read_counter("sea_battle_evicted_games_total", "Games evicted from memory by reason.",
+                                      functools.partial(getattr, games, f"evicted_{_reason}"), reason=_reason)
+    metrics.registry.gauge("sea_battle_spectators", "Connected spectators.", lambda: len(spectators))
+    metrics.registry.read_counter("sea_battle_dropped_spectators_total",
+                                  "Spectators disconnected for reading too slowly.", lambda: spectators.dropped)
+
+if STORAGE_BACKEND == "redis":
+    # Маршруты Redis регистрируются первыми и перекрывают одноимённые маршруты партий в памяти
+    from server.redis_backend import router as redis_router
+    app.include_router(redis_router)
+
+
+def notify(game_id: int, game: Game, event: dict):
+    """Увеличивает версию состояния партии, рассылает событие подписчикам и ставит партию в очередь на запись."""
+    game.version += 1
+    event["version"] = game.version
+    events.publish(game_id, event)
+    if spectators.watching(game_id):
+        spectators.publish(game_id, spectator_event(game, event))
+    games.touch(game_id)
+    if store is not None:
+        store.mark_dirty(game_id)
+
+
+def event_snapshot(game: Game) -> dict:
+    """Первое сообщение потока /events/: текущее состояние партии."""
+    return {
+        "type": "state",
+        "player1_name": game.player1_name,
+        "player2_name": game.player2_name,
+        "current_turn": game.current_turn,
+        "last_seq": game.moves - 1,
+        "winner": game.winner,
+        "version": game.version,
+    }
 
-    def place_ship(self, ship: Ship):
-        """Размещает корабль на поле, отмечая его позиции."""
-        for pos in ship.positions:
-            self.grid[pos[0]][pos[1]] = 1
-        self.ships.append(ship)
 
-    def can_place(self, ship: Ship):
-        """Проверяет, можно ли разместить корабль на указанных позициях."""
-        for pos in ship.positions:
-            if pos[0] >= ROWS or pos[1] >= COLS or self.grid[pos[0]][pos[1]] == 1:
-                return False
-        return True
+def spectator_event(game: Game, event: dict) -> dict:
+    """Событие для зрителей: выстрел, потопивший корабль, дополняется клетками этого корабля."""
+    if event.get("result") != "sunk":
+        return event
+    board = game.player2_board if event["player"] == "player1" else game.player1_board
+    return {**event, "ship": board.ship_at(*event["pos"]).positions}
 
-    def shoot(self, pos: Tuple[int, int]):
-        """Выполняет выстрел по указанной позиции и определяет результат."""
-        if pos in self.shots:
-            return "already_shot"
-        self.shots.append(pos)
-        for ship in self.ships:
-            if pos in ship.positions:
-                ship.hits.append(pos)
-                if ship.is_sunk():
-                    return "sunk"
-                return "hit"
-        return "miss"
 
+def spectator_view(game: Game) -> dict:
+    """Состояние партии для зрителей: только то, что видят оба игрока.
 
-class Game(BaseModel):
-    player1_board: Board = Board()
-    player2_board: Board = Board()
-    player1_name: str = ""
-    player2_name: str = ""
-    current_turn: str = "player1"  # "player1" или "player2"
+    Корабли видны зрителям только потопленные; клетки остальных не
+    передаются, пока партия идёт и после её окончания.
+    """
+    return {
+        "type": "state",
+        "player1_name": game.player1_name,
+        "player2_name": game.player2_name,
+        "current_turn": game.current_turn,
+        "moves": game.moves_after(-1),
+        "last_seq": game.moves - 1,
+        "sunk": {player: [ship.positions for ship in board.ships if ship.is_sunk()]
+                 for player, board in (("player1", game.player1_board), ("player2", game.player2_board))},
+        "winner": game.winner,
+        "version": game.version,
+    }
 
-    def switch_turn(self):
-        """Меняет текущего игрока."""
-        self.current_turn = "player1" if self.current_turn == "player2" else "player2"
 
+def spectator_snapshot(game_id: int, game: Game) -> bytes:
+    return spectators.snapshot(game_id, game.version, functools.partial(spectator_view, game))
+
+
+def fire(game_id: int, game: Game, player: str, pos) -> str:
+    """Выстрел игрока по полю соперника: запись в историю, событие и итог партии, если она окончена."""
+    result = game.shoot(player, pos)
+    metrics.SHOTS[result].inc()
+    event = {"type": "shot", "player": player, "pos": pos, "result": result, "current_turn": game.current_turn}
+    if result != "already_shot":
+        # Номер хода в журнале партии: по нему клиент запрашивает пропущенные ходы
+        event["seq"] = game.moves - 1
+        if store is not None:
+            store.record_shot(game_id, event["seq"], player, pos, result)
+    if game.winner is not None:
+        event["winner"] = game.winner
+        metrics.GAMES_FINISHED.inc()
+        if store is not None:
+            store.record_result(game_id, game)
+    notify(game_id, game, event)
+    return result
+
+
+def play_bot(game_id: int, game: Game):
+    """Ходы бота за второго игрока, пока он не промахнётся или партия не закончится."""
+    while game.bot is not None and game.current_turn == "player2" and not game.is_finished():
+        pos = game.bot.choose()
+        result = fire(game_id, game, "player2", pos)
+        sunk = game.player1_board.ship_at(*pos).positions if result == "sunk" else ()
+        game.bot.observe(pos, result, sunk)
+
+
+async def take_shot(request: ShootRequest) -> str:
+    """Выстрел игрока и ответные ходы бота. Ошибки - HTTPException, как в ответе /shoot/."""
+    game = get_game_or_404(request.game_id)
+    async with game_lock(request.game_id):
+        if game.winner is not None:
+            raise HTTPException(status_code=400, detail="Game is over.")
+        # Очередь хода проверяется под замком, иначе два выстрела могут пройти проверку одновременно
+        if game.current_turn != request.player:
+            raise HTTPException(status_code=400, detail="Not your turn.")
+        result = fire(request.game_id, game, request.player, request.pos)
+        play_bot(request.game_id, game)
+    return result
+
+
+def game_info(game: Game, after_seq: int = -1) -> dict:
+    """Ответ /get_game_info/: состояние партии и ходы с номерами больше `after_seq`."""
+    return {
+        "player1_name": game.player1_name,
+        "player2_name": game.player2_name,
+        "current_turn": game.current_turn,
+        "moves": game.moves_after(after_seq),
+        "last_seq": game.moves - 1,
+        "winner": game.winner,
+        "version": game.version,
+    }
 
-games: List[Game] = []
 
+@app.post("/create_game/")
+async def create_game(request: CreateGameRequest):
+    """Создает новую игровую сессию и возвращает ID игры и имя первого игрока.
+
+    С `vs_bot` за второго игрока сразу садится бот со случайной расстановкой,
+    и партия не попадает в лобби.
+    """
+    game_id = next(game_ids)
+    game = Game(player1_name=request.player1_name)
+    if request.vs_bot:
+        game.player2_name = BOT_NAME
+        game.bot = Bot()
+        for size, orientation, row, col in random_placements():
+            game.player2_board.place_ship(Ship(size=size, orientation=orientation,
+                                               positions=ship_cells(size, orientation, row, col)))
+    games.add(game_id, game)
+    metrics.GAMES_CREATED.inc()
+    if store is not None:
+        if game.bot is not None:
+            store.record_ships(game_id, "player2", game.player2_board.ships)
+        store.mark_dirty(game_id)
+    return {"message": "Game created successfully.", "game_id": game_id, "player": "player1"}
 
-class CreateGameRequest(BaseModel):
-    player1_name: str
 
+@app.post("/join_game/")
+async def join_game(request: JoinGameRequest):
+    """Позволяет второму игроку подключиться к существующей игре."""
+    game = get_game_or_404(request.game_id)
+    async with game_lock(request.game_id):
+        if game.player2_name:
+            raise HTTPException(status_code=400, detail="Game already has two players.")
+        game.player2_name = request.player2_name
+        notify(request.game_id, game, {"type": "joined", "player2_name": game.player2_name})
+    return {"message": "Player 2 joined successfully.", "game_id": request.game_id, "player": "player2"}
 
-class JoinGameRequest(BaseModel):
-    game_id: int
-    player2_name: str
 
+@app.get("/get_games/")
+async def get_games(offset: int = 0, limit: int = LOBBY_PAGE_SIZE):
+    """Получает страницу игровых сессий, ожидающих второго игрока."""
+    offset = max(offset, 0)
+    limit = min(max(limit, 0), MAX_LOBBY_PAGE_SIZE)
+    return {"games": games.lobby(offset, limit), "total": games.lobby_size(), "offset": offset}
 
-class PlaceShipsRequest(BaseModel):
-    ships: List[Dict]
-    game_id: int
-    player: str
 
+if STORAGE_BACKEND == "memory":
+    @app.get("/stats/")
+    async def get_stats():
+        """Счётчики партий в памяти: живые, ожидающие игрока и вытесненные."""
+        return games.stats()
 
-@app.post("/create_game/")
-def create_game(request: CreateGameRequest):
-    """Создает новую игровую сессию и возвращает ID игры и имя первого игрока."""
-    game_id = len(games)
-    games.append(Game(player1_name=request.player1_name))
-    return {"message": "Game created successfully.", "game_id": game_id, "player": "player1"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Метрики сервера в текстовом формате Prometheus."""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
-@app.post("/join_game/")
-def join_game(request: JoinGameRequest):
-    """Позволяет второму игроку подключиться к существующей игре."""
-    if request.game_id >= len(games):
-        raise HTTPException(status_code=404, detail="Game not found.")
-    game = games[request.game_id]
-    if game.player2_name:
-        raise HTTPException(status_code=400, detail="Game already has two players.")
-    game.player2_name = request.player2_name
-    return {"message": "Player 2 joined successfully.", "game_id": request.game_id, "player": "player2"}
 
+if PROFILER_ENABLED:
+    @app.post("/debug/profiler/start")
+    async def start_profiler(interval_ms: float = 5.0):
+        """Включает выборочный профилировщик потока цикла событий."""
+        profiler.start(threading.get_ident(), interval_ms / 1000)
+        return {"running": True}
 
-@app.get("/get_games/")
-def get_games():
-    """Получает список активных игровых сессий."""
-    return {"games": list(range(len(games)))}
+    @app.post("/debug/profiler/stop")
+    async def stop_profiler():
+        """Выключает профилировщик и возвращает свёрнутые стеки для flamegraph."""
+        return Response(profiler.stop(), media_type="text/plain")
 
 
 @app.post("/place_ship/")
-def place_ship(request: PlaceShipsRequest):
-    """Размещает корабли на поле указанного игрока."""
-    if request.game_id >= len(games):
-        raise HTTPException(status_code=404, detail="Game not found.")
-    game = games[request.game_id]
+async def place_ship(request: PlaceShipsRequest):
+    """Размещает весь флот игрока за один запрос: все корабли сразу или ни одного."""
+    game = get_game_or_404(request.game_id)
+    try:
+        fleet = check_fleet(request.ships)
+    except FleetError as error:
+        raise HTTPException(status_code=400, detail=str(error))
     board = game.player1_board if request.player == "player1" else game.player2_board
-    for ship_data in request.ships:
-        ship = Ship(
-            size=ship_data["size"],
-            orientation=ship_data["orientation"],
-            positions=[
-                (ship_data["start_pos"][0] + i if ship_data["orientation"] == 1 else ship_data["start_pos"][0],
-                 ship_data["start_pos"][1] + i if ship_data["orientation"] == 0 else ship_data["start_pos"][1])
-                for i in range(ship_data["size"])
-            ]
-        )
-        if board.can_place(ship):
-            board.place_ship(ship)
-        else:
-            raise HTTPException(status_code=400, detail="Cannot place ship here.")
+    async with game_lock(request.game_id):
+        if board.ships:
+            raise HTTPException(status_code=400, detail="Ships already placed.")
+        for size, orientation, row, col in fleet:
+            board.place_ship(Ship(size=size, orientation=orientation,
+                                  positions=ship_cells(size, orientation, row, col)))
+        if store is not None:
+            store.record_ships(request.game_id, request.player, board.ships, 0)
+        notify(request.game_id, game, {"type": "ships_placed", "player": request.player})
     return {"message": "Ship placed successfully."}
 
 
-class ShootRequest(BaseModel):
-    game_id: int
-    pos: Tuple[int, int]
-    player: str
+@app.get("/random_fleet/")
+async def get_random_fleet(seed: Optional[int] = None):
+    """Случайная правильная расстановка флота для /place_ship/; с `seed` расстановка воспроизводима."""
+    return {"ships": random_fleet(random.Random(seed) if seed is not None else None)}
 
 
 @app.post("/shoot/")
-def shoot(request: ShootRequest):
-    """Выполняет выстрел по указанной позиции и возвращает результат."""
-    if request.game_id >= len(games):
-        raise HTTPException(status_code=404, detail="Game not found.")
-    game = games[request.game_id]
-    if game.current_turn != request.player:
-        raise HTTPException(status_code=400, detail="Not your turn.")
-    board = game.player2_board if request.player == "player1" else game.player1_board
-    result = board.shoot(request.pos)
-
-    # Переключение хода только при промахе
-    if result == "miss":
-        game.switch_turn()
-
+async def shoot(request: ShootRequest, accept: Optional[str] = Header(None)):
+    """Выполняет выстрел по указанной позиции и возвращает результат (в компактном виде, если он указан в Accept)."""
+    result = await take_shot(request)
+    if wire.accepts(accept):
+        return Response(wire.encode_shot(result), media_type=wire.MEDIA_TYPE)
     return {"result": result}
 
 
 @app.get("/get_game_info/{game_id}")
-def get_game_info(game_id: int):
-    if game_id >= len(games):
-        raise HTTPException(status_code=404, detail="Game not found.")
-    game = games[game_id]
-
-    last_shot = None
-    if game.current_turn == "player2" and game.player1_board.shots:
-        last_shot = game.player1_board.shots[-1]
-    elif game.current_turn == "player1" and game.player2_board.shots:
-        last_shot = game.player2_board.shots[-1]
-
-    result = None
-    if last_shot:
-        for ship in (game.player1_board.ships if game.current_turn == "player2" else game.player2_board.ships):
-            if last_shot in ship.positions:
-                result = "hit" if last_shot in ship.hits else "miss"
-                break
-
-    return {
-        "player1_name": game.player1_name,
-        "player2_name": game.player2_name,
-        "current_turn": game.current_turn,
-        "last_shot": (last_shot[0], last_shot[1], result) if last_shot else None
-    }
+async def get_game_info(game_id: int, since_version: Optional[int] = None, timeout: float = LONG_POLL_TIMEOUT,
+                        after_seq: int = -1, accept: Optional[str] = Header(None)):
+    """Возвращает состояние партии и ходы с номерами больше `after_seq`.
+
+    Без `after_seq` возвращается весь журнал ходов; клиент передаёт номер
+    последнего известного ему хода (`last_seq` прошлого ответа) и получает
+    только новые. Если передан `since_version` и состояние с тех пор не
+    менялось, запрос ждёт изменения не дольше `timeout` секунд и по истечении
+    отвечает 304 без тела. Клиент, указавший wire.MEDIA_TYPE в Accept,
+    получает ответ в компактном двоичном виде (common/wire.py).
+    """
+    game = get_game_or_404(game_id)
+
+    if since_version is not None:
+        # Подписка до проверки версии, чтобы не пропустить изменение между ними
+        queue = events.subscribe(game_id)
+        try:
+            if game.version == since_version:
+                try:
+                    await asyncio.wait_for(queue.get(), min(max(timeout, 0.0), LONG_POLL_TIMEOUT))
+                except asyncio.TimeoutError:
+                    return Response(status_code=304)
+        finally:
+            events.unsubscribe(game_id, queue)
+
+    info = game_info(game, after_seq)
+    if wire.accepts(accept):
+        try:
+            return Response(wire.encode_info(info), media_type=wire.MEDIA_TYPE)
+        except wire.WireError:
+            pass  # Имя из старой базы длиннее допустимого: ответ в JSON, клиент различает их по Content-Type
+    return info
+
+
+@app.post("/batch/get_game_info/")
+async def get_games_info(request: GameInfoBatchRequest):
+    """Состояние нескольких партий за один запрос, без ожидания изменений.
+
+    Результаты идут в порядке запроса; для отсутствующей партии вместо
+    состояния возвращаются код и текст ошибки, как в ответе /get_game_info/.
+    """
+    results = []
+    for query in request.games:
+        game = games.get(query.game_id)
+        if game is None:
+            results.append({"game_id": query.game_id, "status": 404, "detail": "Game not found."})
+        else:
+            results.append({"game_id": query.game_id, "status": 200, **game_info(game, query.after_seq)})
+    return {"games": results}
+
+
+@app.post("/batch/shoot/")
+async def shoot_batch(request: ShootBatchRequest):
+    """Несколько выстрелов, в том числе в разных партиях, за один запрос.
+
+    Выстрелы выполняются по порядку, как отдельные запросы /shoot/: ошибка
+    одного (неверный элемент, не его ход, партия окончена) не отменяет остальные
+    и возвращается в его результате кодом и текстом ошибки.
+    """
+    results = []
+    for shot in request.shot_items():
+        if isinstance(shot, dict):
+            results.append(shot)
+            continue
+        try:
+            result = await take_shot(shot)
+        except HTTPException as error:
+            results.append({"game_id": shot.game_id, "status": error.status_code, "detail": error.detail})
+        else:
+            results.append({"game_id": shot.game_id, "status": 200, "result": result})
+    return {"results": results}
+
+
+@app.get("/events/{game_id}")
+async def game_events(game_id: int):
+    """Поток событий партии (Server-Sent Events): подключение соперника, выстрелы и смена хода."""
+    game = get_game_or_404(game_id)
+    return StreamingResponse(events.stream(game_id, functools.partial(event_snapshot, game)),
+                             media_type="text/event-stream")
+
+
+if STORAGE_BACKEND == "memory":
+    # Зрители подключаются к рабочему процессу, в памяти которого идёт партия
+    @app.get("/spectate/{game_id}")
+    async def spectate(game_id: int):
+        """Поток партии для зрителей (Server-Sent Events), только чтение.
+
+        Первое сообщение - состояние партии со всеми ходами и потопленными
+        кораблями (spectator_view), затем события, как в /events/; выстрел,
+        потопивший корабль, содержит его клетки в поле "ship". Зритель,
+        не успевающий читать поток, отключается и должен переподключиться.
+        """
+        game = get_game_or_404(game_id)
+        return StreamingResponse(spectators.stream(game_id, functools.partial(spectator_snapshot, game_id, game)),
+                                 media_type="text/event-stream")
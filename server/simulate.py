@@ -0,0 +1,164 @@
+"""
+Массовая игра ботов друг против друга без HTTP и pygame.
+
+Партии играются на движке сервера (Board, Game) в процессах
+ProcessPoolExecutor. Каждый процесс получает пачку партий со своим зерном
+генератора и возвращает только сводку: победы, сумму и распределение числа
+выстрелов до победы. Сводки складываются по мере готовности, поэтому
+память не зависит от числа партий.
+
+Запуск из корня проекта:
+    python -m server.simulate --games 1000000 --first density --second random
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict
+
+from common.fleet import COLS, ROWS, random_placements, ship_cells
+from server.bot import Bot
+from server.engine import Game, Ship
+
+
+class RandomShooter:
+    """Стреляет в случайные клетки без повторов, не учитывая результаты."""
+
+    __slots__ = ("cells",)
+
+    def __init__(self, rng: random.Random):
+        self.cells = [(row, col) for row in range(ROWS) for col in range(COLS)]
+        rng.shuffle(self.cells)
+
+    def choose(self):
+        return self.cells.pop()
+
+    def observe(self, pos, result, sunk=()):
+        pass
+
+
+# Стратегии по имени: фабрика получает генератор случайных чисел партии
+STRATEGIES = {
+    "density": Bot,
+    "random": RandomShooter,
+}
+
+
+def new_game(rng: random.Random) -> Game:
+    """Партия со случайными расстановками обоих игроков."""
+    game = Game("player1", "player2")
+    for board in (game.player1_board, game.player2_board):
+        for size, orientation, row, col in random_placements(rng):
+            board.place_ship(Ship(size=size, orientation=orientation,
+                                  positions=ship_cells(size, orientation, row, col)))
+    return game
+
+
+def play_game(game: Game, players: Dict[str, object]):
+    """Играет партию до конца по правилам сервера. Возвращает победителя и число его выстрелов."""
+    shots = {"player1": 0, "player2": 0}
+    sunk = {"player1": 0, "player2": 0}
+    while game.winner is None:
+        player = game.current_turn
+        board = game.player2_board if player == "player1" else game.player1_board
+        strategy = players[player]
+        pos = strategy.choose()
+        result = game.shoot(player, pos)
+        if result == "already_shot":
+            raise RuntimeError(f"{player} fired twice at {pos}")
+        shots[player] += 1
+        if result == "sunk":
+            sunk[player] += 1
+            strategy.observe(pos, result, board.ship_at(*pos).positions)
+        else:
+            strategy.observe(pos, result)
+    # Проверка движка: победитель потопил все корабли, и все клетки кораблей поражены
+    board = game.player2_board if game.winner == "player1" else game.player1_board
+    if sunk[game.winner] != len(board.ships) or board.hit_mask != board.ship_mask:
+        raise RuntimeError("engine disagrees about the finished game")
+    return game.winner, shots[game.winner]
+
+
+def play_batch(first: str, second: str, games: int, seed: int) -> dict:
+    """Пачка партий в одном процессе. Первым ходит то один, то другой игрок."""
+    rng = random.Random(seed)
+    # При игре стратегии против самой себя игроки различаются местом: player1 ходит первым
+    keys = (first, second) if first != second else ("player1", "player2")
+    wins = dict.fromkeys(keys, 0)
+    shots_to_win = {key: Counter() for key in keys}
+    for index in range(games):
+        names = (first, second) if index % 2 == 0 else (second, first)
+        game = new_game(rng)
+        players = {"player1": STRATEGIES[names[0]](rng), "player2": STRATEGIES[names[1]](rng)}
+        winner, shots = play_game(game, players)
+        key = (names[0] if winner == "player1" else names[1]) if first != second else winner
+        wins[key] += 1
+        shots_to_win[key][shots] += 1
+    return {"games": games, "wins": wins,
+            "shots_to_win": {key: dict(counter) for key, counter in shots_to_win.items()}}
+
+
+def merge(total: dict, batch: dict):
+    """Добавляет сводку пачки к общей."""
+    total["games"] += batch["games"]
+    for key, count in batch["wins"].items():
+        total["wins"][key] = total["wins"].get(key, 0) + count
+    for key, histogram in batch["shots_to_win"].items():
+        target = total["shots_to_win"].setdefault(key, Counter())
+        for shots, count in histogram.items():
+            target[int(shots)] += count
+
+
+def report(total: dict, elapsed: float) -> str:
+    lines = [f"{total['games']:,} games in {elapsed:.1f}s ({total['games'] / elapsed:,.0f} games/s)"]
+    for key, histogram in sorted(total["shots_to_win"].items()):
+        wins = total["wins"].get(key, 0)
+        line = f"  {key:<10} win rate {wins / total['games']:6.1%}"
+        if wins:
+            mean = sum(shots * count for shots, count in histogram.items()) / wins
+            line += f"   shots to win: mean {mean:5.1f}, min {min(histogram)}, max {max(histogram)}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run(first: str, second: str, games: int, workers: int, batch_size: int, seed: int) -> dict:
+    total = {"games": 0, "wins": {}, "shots_to_win": {}}
+    start = time.perf_counter()
+    batches = [min(batch_size, games - offset) for offset in range(0, games, batch_size)]
+    last_report = start
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_batch, first, second, count, seed + index)
+                   for index, count in enumerate(batches)]
+        for future in as_completed(futures):
+            merge(total, future.result())
+            now = time.perf_counter()
+            if now - last_report >= 5.0:
+                print(report(total, now - start), flush=True)
+                last_report = now
+    elapsed = time.perf_counter() - start
+    print(report(total, elapsed))
+    total["elapsed"] = elapsed
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--first", choices=sorted(STRATEGIES), default="density")
+    parser.add_argument("--second", choices=sorted(STRATEGIES), default="random")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="записать сводку в JSON-файл")
+    args = parser.parse_args()
+    total = run(args.first, args.second, args.games, args.workers, args.batch_size, args.seed)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(total, file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
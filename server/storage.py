@@ -0,0 +1,187 @@
+import logging
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from common.fleet import ship_cells
+from server import database, metrics, replay
+from server.bot import Bot
+from server.engine import Ship, Game
+
+log = logging.getLogger(__name__)
+
+
+def game_from_row(row: dict) -> Game:
+    """Восстанавливает партию из сохранённой сессии, повторяя выстрелы по порядку.
+
+    Очередь хода берётся из повтора: строка сессии могла быть сохранена вместе с
+    выстрелами, которые не успели попасть в базу. Сохранённая очередь нужна только
+    партиям, перенесённым из TEXT-столбцов: там порядок ходов между игроками не
+    хранился, и выстрелы идут не по очереди.
+    """
+    game = Game(player1_name=row["player1_name"] or "", player2_name=row["player2_name"] or "")
+    boards = {"player1": game.player1_board, "player2": game.player2_board}
+    for player, size, orientation, start_row, start_col in row["ships"]:
+        boards[player].place_ship(Ship(size=size, orientation=orientation,
+                                       positions=ship_cells(size, orientation, start_row, start_col)))
+    if row.get("bot"):
+        game.bot = Bot()
+    in_turn = True
+    for player, seq, shot_row, shot_col, result in row["shots"]:
+        pos = (shot_row, shot_col)
+        in_turn = in_turn and player == game.current_turn
+        result = game.shoot(player, pos)
+        if game.bot is not None and player == "player2":
+            sunk = game.player1_board.ship_at(*pos).positions if result == "sunk" else ()
+            game.bot.observe(pos, result, sunk)
+    if not in_turn:
+        game.current_turn = row["current_turn"] or "player1"
+    return game
+
+
+class WriteBehindStore:
+    """Отложенная запись партий в базу.
+
+    Обработчики только помечают партию изменённой (`mark_dirty`) и добавляют
+    новые корабли и выстрелы в очередь (`record_ships`, `record_shot`), а
+    фоновый поток раз в `flush_interval_ms` сохраняет всё накопленное одной
+    транзакцией, поэтому горячий путь `/shoot/` не ждёт SQLite. Выстрел
+    сохраняется одной строкой в таблице shots, без перезаписи истории партии.
+    Реплеи оконченных партий дописываются в `replays` после сохранения в базу.
+    """
+
+    def __init__(self, get_game: Callable[[int], Optional[Game]], flush_interval_ms: int = 200,
+                 replays: Optional[replay.ReplayWriter] = None):
+        self.get_game = get_game
+        self.flush_interval = flush_interval_ms / 1000
+        self.replays = replays
+        self._dirty = set()
+        self._ships = []
+        self._shots = []
+        self._results = []
+        self._replays = []
+        self.next_game_id = 0  # Больше ID всех партий в базе, включая оконченные
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def mark_dirty(self, game_id: int):
+        """Помечает партию для сохранения при следующем сбросе."""
+        with self._lock:
+            self._dirty.add(game_id)
+
+    def record_ships(self, game_id: int, player: str, ships: List[Ship], first_index: int = 0):
+        """Ставит в очередь корабли игрока; `first_index` - номер первого из них на поле."""
+        rows = [(str(game_id), player, first_index + i, ship.size, ship.orientation,
+                 ship.positions[0][0], ship.positions[0][1]) for i, ship in enumerate(ships)]
+        with self._lock:
+            self._ships.extend(rows)
+            self._dirty.add(game_id)
+
+    def record_shot(self, game_id: int, seq: int, player: str, pos: Tuple[int, int], result: str):
+        """Ставит в очередь выстрел игрока; `seq` - номер хода в журнале партии (Game.log)."""
+        with self._lock:
+            self._shots.append((str(game_id), player, seq, pos[0], pos[1], result))
+            self._dirty.add(game_id)
+
+    def record_result(self, game_id: int, game: Game):
+        """Ставит в очередь итог оконченной партии: победитель, число ходов и длительность."""
+        row = (str(game_id), game.winner, game.player1_name, game.player2_name, game.moves,
+               game.finished_at - game.created_at, game.finished_at)
+        record = None
+        if self.replays is not None:
+            try:
+                record = replay.encode(game_id, game)
+            except (struct.error, ValueError, KeyError):
+                # Итог партии важнее реплея: без реплея игроки всё равно узнают о конце партии
+                log.exception("Failed to encode the replay of game %s.", game_id)
+        with self._lock:
+            self._results.append(row)
+            if record is not None:
+                self._replays.append(record)
+            self._dirty.add(game_id)
+
+    def flush(self):
+        """Сохраняет все накопленные изменения одной транзакцией."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            ships, self._ships = self._ships, []
+            shots, self._shots = self._shots, []
+            results, self._results = self._results, []
+            replays, self._replays = self._replays, []
+        if not dirty:
+            return
+        sessions = []
+        now = time.time()
+        for game_id in sorted(dirty):
+            game = self.get_game(game_id)
+            if game is not None:
+                sessions.append((str(game_id), game.player1_name, game.player2_name, game.current_turn,
+                                 int(game.bot is not None), now))
+        start = time.perf_counter()
+        try:
+            database.save_changes(sessions, ships, shots, results)
+        except Exception:
+            metrics.DB_FLUSH_ERRORS.inc()
+            # Не потерять изменения: вернуть их в очередь до следующей попытки
+            with self._lock:
+                self._dirty |= dirty
+                self._ships[:0] = ships
+                self._shots[:0] = shots
+                self._results[:0] = results
+                self._replays[:0] = replays
+            raise
+        metrics.DB_FLUSH_SECONDS.observe(time.perf_counter() - start)
+        metrics.DB_FLUSH_ROWS.inc(len(sessions) + len(ships) + len(shots) + len(results))
+        if self.replays is not None:
+            self.replays.write(replays)
+
+    def load(self, idle_ttl: Optional[float] = None) -> Dict[int, Game]:
+        """Загружает незавершённые партии из базы. Возвращает словарь ID -> партия.
+
+        Партии без изменений дольше `idle_ttl` секунд реестр всё равно вытеснил бы,
+        поэтому они не загружаются. Сессии первых версий сервера хранились под UUID;
+        по числовым ID API до них не добраться, поэтому они пропускаются, а в журнал
+        пишется их число.
+        """
+        self.next_game_id = database.max_game_id() + 1
+        active_since = time.time() - idle_ttl if idle_ttl is not None else 0.0
+        loaded = {}
+        legacy = 0
+        for row in database.load_sessions(active_since):
+            if not row["game_id"].isdigit():
+                legacy += 1
+                continue
+            game_id = int(row["game_id"])
+            game = game_from_row(row)
+            if not game.is_finished():
+                loaded[game_id] = game
+        if legacy:
+            log.warning("Skipped %d sessions with non-numeric game IDs from an old database format.", legacy)
+        return loaded
+
+    def start(self):
+        """Запускает фоновый поток сброса."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает фоновый поток, сохраняет оставшиеся изменения и закрывает соединения с базой."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        database.close_connections()
+        if self.replays is not None:
+            self.replays.close()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # Изменения возвращены в очередь; повторим при следующем сбросе
+                log.exception("Write-behind flush failed.")